@@ -0,0 +1,67 @@
+"""
+Benchmark: overview analysis of many habits within the process (analyze.request_analysis) compared to worker
+processes reading the check-offs from shared memory (habittracker.sharedmatrix), and the bytes a process pool would
+have to pickle per habit (habit data as dataframe) compared to the bytes sent to the shared-memory workers.
+Habit files are kept in memory (storage.MemoryBackend).
+
+Run from the root directory of the project: python benchmarks/bench_analysis.py
+"""
+import os
+import sys
+import time
+import pickle
+import random
+from datetime import datetime
+import pytz
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from habittracker import analyze
+from habittracker import codec
+from habittracker import habits
+from habittracker import history
+from habittracker import sharedmatrix
+from habittracker import storage
+from bench_history import create_random_history
+
+
+def measure(function):
+    # best of three runs (seconds)
+    list_times = []
+    for _ in range(3):
+        start = time.perf_counter()
+        function()
+        list_times.append(time.perf_counter() - start)
+    return min(list_times)
+
+
+def main():
+    random.seed(1)
+    storage.backend = storage.MemoryBackend()
+    habits.list_habit_instances = []
+    number_of_periods = 365
+    print(f"{'Habits':>7} | {'in process (s)':>14} | {'shared 1 (s)':>12} | {'shared 2 (s)':>12} | "
+          f"{'shared 4 (s)':>12} | {'pickled (bytes/habit)':>21} | {'shared (bytes/habit)':>20}")
+    for number_of_habits in [50, 200]:
+        habits.list_habit_instances = []
+        df_habit = create_random_history(number_of_periods, "D")
+        for number in range(number_of_habits):
+            codec.write_habit_file(f"bench_analysis_{number}.json", df_habit)
+            habits.Habit(f"Habit {number}", "Specification", "D", f"bench_analysis_{number}.json",
+                         datetime(2020, 1, 1, tzinfo=pytz.utc)).get_history_index()
+
+        seconds_process = measure(lambda: analyze.request_analysis(habits.list_habit_instances))
+        list_seconds_shared = [measure(lambda: sharedmatrix.request_analysis(habits.list_habit_instances,
+                                                                             processes=processes))
+                               for processes in [1, 2, 4]]
+        # a process pool without shared memory sends the habit data of every habit to the workers
+        bytes_pickled = len(pickle.dumps(history.load_history("bench_analysis_0.json", "D").to_dataframe()))
+        with sharedmatrix.SharedHabitMatrix(habits.list_habit_instances) as habit_matrix:
+            bytes_shared = len(pickle.dumps((habit_matrix.name, number_of_habits, 0, number_of_habits,
+                                             [(0, 0)] * 5))) / number_of_habits
+        print(f"{number_of_habits:>7} | {seconds_process:>14.3f} | {list_seconds_shared[0]:>12.3f} | "
+              f"{list_seconds_shared[1]:>12.3f} | {list_seconds_shared[2]:>12.3f} | {bytes_pickled:>21} | "
+              f"{bytes_shared:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: reading and writing habit files and the habit overview with pandas (pd.read_json / to_json)
+compared to the schema-aware codec (habittracker.codec), and reading / writing habit files through the storage
+backends (files on disk compared to the in-memory backend, i.e. the share of the disk I/O).
+
+Run from the root directory of the project: python benchmarks/bench_codec.py
+"""
+import os
+import sys
+import timeit
+import random
+import tempfile
+from datetime import datetime, timedelta
+import pandas as pd
+import pytz
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from habittracker import codec
+from habittracker import storage
+from bench_history import create_random_history
+
+
+def create_random_overview(number_of_habits):
+    # random habit overview in the layout of the overview file
+    created = datetime(2020, 1, 1, tzinfo=pytz.utc)
+    return pd.DataFrame({"Name": [f"Habit {n}" for n in range(number_of_habits)],
+                         "Specification": ["Specification"] * number_of_habits,
+                         "Periodicity": [random.choice(["D", "7d"]) for _ in range(number_of_habits)],
+                         "Created on": [created + timedelta(hours=n) for n in range(number_of_habits)],
+                         "File Directory": [f"habit_{n}.json" for n in range(number_of_habits)]})
+
+
+def measure(function, number=20):
+    # best of three runs (milliseconds per call)
+    return min(timeit.repeat(function, number=number, repeat=3)) / number * 1000
+
+
+def main():
+    random.seed(1)
+    print(f"{'Habit file (periods)':>20} | {'pandas read (ms)':>16} | {'codec read (ms)':>15} | "
+          f"{'pandas write (ms)':>17} | {'pandas write, UTC (ms)':>22} | {'codec write (ms)':>16}")
+    for number_of_periods in [30, 365, 3650]:
+        df_habit = create_random_history(number_of_periods, "D")
+        content = df_habit.to_json(date_format='iso')
+        # every path writes the dataframe it has read itself (pandas keeps the check-off dates as strings),
+        # 'pandas write, UTC' writes the dataframe of the codec (UTC timestamps as held by the app)
+        df_read = pd.read_json(content)
+        df_decoded = codec.decode_habit_file(content)
+        print(f"{number_of_periods:>20} | "
+              f"{measure(lambda: pd.read_json(content)):>16.2f} | "
+              f"{measure(lambda: codec.decode_habit_file(content)):>15.2f} | "
+              f"{measure(lambda: df_read.to_json(date_format='iso')):>17.2f} | "
+              f"{measure(lambda: df_decoded.to_json(date_format='iso')):>22.2f} | "
+              f"{measure(lambda: codec.encode_habit_file(df_decoded)):>16.2f}")
+
+    print()
+    print(f"{'Overview (habits)':>20} | {'pandas read (ms)':>16} | {'codec read (ms)':>15} | "
+          f"{'pandas write (ms)':>17} | {'pandas write, UTC (ms)':>22} | {'codec write (ms)':>16}")
+    for number_of_habits in [10, 100, 1000]:
+        df_overview = create_random_overview(number_of_habits)
+        content = df_overview.to_json(date_format='iso')
+        df_read = pd.read_json(content)
+        df_decoded = codec.decode_overview(content)
+        print(f"{number_of_habits:>20} | "
+              f"{measure(lambda: pd.read_json(content)):>16.2f} | "
+              f"{measure(lambda: codec.decode_overview(content)):>15.2f} | "
+              f"{measure(lambda: df_read.to_json(date_format='iso')):>17.2f} | "
+              f"{measure(lambda: df_decoded.to_json(date_format='iso')):>22.2f} | "
+              f"{measure(lambda: codec.encode_overview(df_decoded)):>16.2f}")
+
+    print()
+    print(f"{'Habit file (periods)':>20} | {'disk read (ms)':>14} | {'memory read (ms)':>16} | "
+          f"{'disk write (ms)':>15} | {'memory write (ms)':>17}")
+    with tempfile.TemporaryDirectory() as directory:
+        for number_of_periods in [30, 365, 3650]:
+            df_habit = create_random_history(number_of_periods, "D")
+            list_results = []
+            for backend, file in [(storage.FileBackend(), os.path.join(directory, "habit.json")),
+                                  (storage.MemoryBackend(), "habit.json")]:
+                storage.backend = backend
+                codec.write_habit_file(file, df_habit)
+                list_results.append((measure(lambda: codec.read_habit_file(file)),
+                                     measure(lambda: codec.write_habit_file(file, df_habit))))
+            storage.backend = storage.FileBackend()
+            print(f"{number_of_periods:>20} | {list_results[0][0]:>14.2f} | {list_results[1][0]:>16.2f} | "
+                  f"{list_results[0][1]:>15.2f} | {list_results[1][1]:>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark: memory per habit kept in memory (e.g. daemon mode) - habit instances with a per-instance __dict__ and
+one periodicity string per habit (layout before) compared to the compact habits.Habit (__slots__, interned periodicity).
+The habits are re-instantiated from a habit overview as at the start of the app, the memory still allocated after the
+overview has been dropped is counted (tracemalloc). Habit files are kept in memory (storage.MemoryBackend).
+
+Run from the root directory of the project: python benchmarks/bench_habits.py
+"""
+import os
+import sys
+import random
+import tracemalloc
+import pandas as pd
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from habittracker import codec
+from habittracker import habits
+from habittracker import storage
+from bench_codec import create_random_overview
+
+
+class DictHabit:
+    # layout of habits.Habit before: attributes in a per-instance __dict__, periodicity as read from the overview
+    def __init__(self, name, spec, period, file, created):
+        self.name = name
+        self.spec = spec
+        self.period = period
+        self.file = file
+        self.created = created
+        self.history_index = None
+
+
+def measure(habit_class, number_of_habits):
+    # bytes per habit still allocated after re-instantiating the habits from the habit overview
+    habits.list_habit_instances = []
+    tracemalloc.start()
+    df_habit_overview = codec.read_overview("bench_habits_overview.json")
+    df_habit_overview["Created on"] = pd.to_datetime(df_habit_overview["Created on"])
+    list_habits = [habit_class(name, spec, period, file, created)
+                   for name, spec, period, created, file in df_habit_overview.values.tolist()]
+    del df_habit_overview
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del list_habits
+    habits.list_habit_instances = []
+    return size / number_of_habits
+
+
+def main():
+    random.seed(1)
+    storage.backend = storage.MemoryBackend()
+    print(f"{'Habits':>8} | {'__dict__ (bytes/habit)':>22} | {'__slots__ (bytes/habit)':>23} | {'Saved':>6}")
+    for number_of_habits in [1000, 10000, 100000]:
+        df_habit_overview = create_random_overview(number_of_habits)
+        codec.write_overview("bench_habits_overview.json", df_habit_overview)
+        # habit files and their locks exist already (not part of the measured memory)
+        for file in df_habit_overview["File Directory"]:
+            storage.backend.write_bytes(file, b"")
+            storage.backend.lock(file)
+
+        bytes_dict = measure(DictHabit, number_of_habits)
+        bytes_slots = measure(habits.Habit, number_of_habits)
+        print(f"{number_of_habits:>8} | {bytes_dict:>22.0f} | {bytes_slots:>23.0f} | "
+              f"{1 - bytes_slots / bytes_dict:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Benchmark: memory and file size of a habit history in the dataframe layout of the habit file
+compared to the bit-packed history (habittracker.history.BitHistory).
+
+Run from the root directory of the project: python benchmarks/bench_history.py
+"""
+import os
+import sys
+import random
+import tempfile
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from habittracker.history import BitHistory
+
+
+def create_random_history(number_of_periods, period):
+    # random habit data in the layout of the habit file (about every second period checked-off)
+    index = pd.date_range(date(2020, 1, 1), periods=number_of_periods, freq=period)
+    values = [["Yes", day + timedelta(hours=random.randint(0, 23))] if random.getrandbits(1) else ["No", np.nan]
+              for day in index]
+    return pd.DataFrame(values, columns=["Checked-off", "Check-off date"], index=index)
+
+
+def main():
+    random.seed(1)
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'Periods':>8} | {'DataFrame (bytes)':>17} | {'BitHistory (bytes)':>18} | "
+              f"{'.json (bytes)':>13} | {'bits .json (bytes)':>18}")
+        for number_of_periods in [30, 365, 730, 3650]:
+            df_habit = create_random_history(number_of_periods, "D")
+            file_json = os.path.join(directory, "habit.json")
+            file_bits = os.path.join(directory, "habit_bits.json")
+            df_habit.to_json(file_json, date_format='iso')
+
+            bit_history = BitHistory.from_dataframe(pd.read_json(file_json), "D")
+            bit_history.write(file_bits)
+
+            print(f"{number_of_periods:>8} | {df_habit.memory_usage(deep=True).sum():>17} | "
+                  f"{bit_history.nbytes:>18} | {os.path.getsize(file_json):>13} | {os.path.getsize(file_bits):>18}")
+
+
+if __name__ == "__main__":
+    main()
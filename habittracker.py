@@ -1,4 +1,8 @@
+import sys
 from habittracker import main
 
 if __name__ == '__main__':
+    if sys.argv[1:] == ["--auto-update"]:
+        # non-interactive auto-update of the due habits (e.g. cron entry)
+        sys.exit(main.auto_update_routine())
     main.main()
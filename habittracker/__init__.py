@@ -1 +1,3 @@
-__all__ = ["analyze", "display", "habits", "rand_habits"]
+__all__ = ["analyze", "binstore", "codec", "display", "habits", "history", "matrix", "periods", "prefetch",
+           "rand_habits", "rollups", "scheduler", "segments", "sharedmatrix", "snapshot", "storage", "tenants",
+           "tombstones", "wal", "watcher"]
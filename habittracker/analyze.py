@@ -1,7 +1,18 @@
+import numpy as np
 import pandas as pd
 from datetime import timedelta, datetime
+import pytz
 
 import habittracker.habits
+import habittracker.history
+import habittracker.periods
+
+
+# number of worker processes of request_analysis() reading the check-offs from shared memory (see sharedmatrix.py)
+# - None: habits are analyzed within the process
+analysis_processes = None
+# rows of a table converted to strings, padded and written at once by render_table()
+render_chunk_rows = 10000
 
 
 def create_num_list_habits(habit_instances):
@@ -22,14 +33,79 @@ def create_num_list_habits(habit_instances):
     return list_habits
 
 
-def request_analysis(habit_instances):
+def create_windows(current_day=None):
     """
-    Creating a pandas dataframe for analysis on basis of existing habits
+    Creating the default date windows (first and last day) for windowed analysis:
+    last 7 / 30 / 90 days (including today), this month and last month
 
-    :param habit_instances: List of existing habit instances
-    :return: pandas dataframe for analyzing existing habits
+    :param current_day: reference day (default: today in UTC, like the periods of the habits)
+    :return: dictionary with name of the window as key and tuple (start, end) as value
+    """
+    if current_day is None:
+        current_day = datetime.now(pytz.utc).date()
+
+    first_day_this_month = current_day.replace(day=1)
+    last_day_last_month = first_day_this_month - timedelta(1)
+
+    return {"Last 7 days": (current_day - timedelta(6), current_day),
+            "Last 30 days": (current_day - timedelta(29), current_day),
+            "Last 90 days": (current_day - timedelta(89), current_day),
+            "This month": (first_day_this_month, current_day),
+            "Last month": (last_day_last_month.replace(day=1), last_day_last_month)}
+
+
+def analyze_window(habit, start, end):
+    """
+    Windowed analysis of a habit: completion rate of the periods starting within the given date range.
+    Answered in constant time from the cumulative count index of the habit.
+
+    :param habit: habit instance to be analyzed
+    :param start: first day of the date range (included)
+    :param end: last day of the date range (included)
+    :return: dictionary with number of periods, checked-off periods and completion rate ('-' if there's no period)
+    """
+    if not isinstance(habit, habittracker.habits.Habit):
+        raise TypeError("Parameter is not of class Habit!")
+    if end < start:
+        raise ValueError("End date is before start date!")
+
+    number_of_periods, count_checked_off = habit.get_history_index().count(start, end)
+    completion_rate = "-" if number_of_periods == 0 else \
+        f"{round(count_checked_off / number_of_periods * 100, 2)}%"
+
+    return {"Name": habit.name,
+            "Start": start,
+            "End": end,
+            "Number of periods": number_of_periods,
+            "Checked-off periods": count_checked_off,
+            "Completion rate": completion_rate}
+
+
+def analyze_row(habit, windows, current_day=None):
+    """
+    Results of one habit for the analysis (one row of the dataframe created by request_analysis())
+
+    :param habit: habit instance to be analyzed
+    :param windows: date windows (see create_windows())
+    :param current_day: reference day for the current streak (default: today)
+    :return: dictionary with the results of the habit
     """
+    # generating dictionary with analyze_habit() (class method)
+    results_habit = habit.analyze_habit()
+    # adding the maintained current streak
+    results_habit["Current Streak"] = habit.running_streak(current_day)[0]
+    # adding the completion rates of the date windows
+    for window, (start, end) in windows.items():
+        results_habit[window] = analyze_window(habit, start, end)["Completion rate"]
+    return results_habit
+
 
+def create_analysis_dataframe(list_results, windows):
+    """
+    :param list_results: list of dictionaries with the results of the habits (see analyze_row())
+    :param windows: date windows (see create_windows())
+    :return: pandas dataframe for analyzing existing habits
+    """
     # creating an empty pandas dataframe with defined columns (ATTENTION: MUST FIT DICTIONARY RETURN FROM HABIT METHOD)
     df_analysis = pd.DataFrame(
         columns=["Name",
@@ -40,19 +116,153 @@ def request_analysis(habit_instances):
                  "Checked-off periods",
                  "Percentage checked-off periods",
                  "Longest Streak",
-                 "Period Longest Streak"])
+                 "Period Longest Streak",
+                 "Current Streak"] + list(windows))
 
-    # for every existing habit instance
-    for habit in habit_instances:
-        # generating dataframe with analyze_habit() (class method)
-        results_habit = habit.analyze_habit()
-        # insert results from class method into new dataframe scheme for analysis
+    # insert results of the habits into new dataframe scheme for analysis
+    for results_habit in list_results:
         df_analysis = df_analysis.append(results_habit, ignore_index=True)
 
     return df_analysis
 
 
-def create_analysis(df_analysis, intro_analysis, analysis_sort_by, analysis_periodicity):
+def request_analysis(habit_instances, current_day=None, processes=None):
+    """
+    Creating a pandas dataframe for analysis on basis of existing habits
+    (including the completion rates of the default date windows, see create_windows())
+
+    :param habit_instances: List of existing habit instances
+    :param current_day: reference day for the date windows (default: today)
+    :param processes: number of worker processes reading the check-offs from shared memory
+                      (default: analysis_processes)
+    :return: pandas dataframe for analyzing existing habits
+    """
+    if processes is None:
+        processes = analysis_processes
+    if processes is not None and len(habit_instances) > 0:
+        # imported here: sharedmatrix builds on this module (date windows, dataframe of the analysis)
+        import habittracker.sharedmatrix
+        return habittracker.sharedmatrix.request_analysis(habit_instances, current_day, processes)
+    windows = create_windows(current_day)
+    # for every existing habit instance
+    list_results = [analyze_row(habit, windows, current_day) for habit in habit_instances]
+    return create_analysis_dataframe(list_results, windows)
+
+
+def request_habits_at_risk(habit_instances, current_day=None, days_left=2):
+    """
+    Creating a pandas dataframe of all habits with a running streak that hasn't been continued in the current
+    period yet and whose current period ends soon (answered from the maintained streak state of the habits).
+    Cost: the habit file of every habit whose history index isn't built yet is read once (e.g. the first request after
+    a start without snapshot: the habits are loaded lazily, see scheduler.py). The indexes are kept, so further requests
+    don't read any file. Run-length encoded habit files are answered from their last run instead of building an index,
+    so they are read once per request.
+
+    :param habit_instances: List of existing habit instances
+    :param current_day: reference day (default: today)
+    :param days_left: habits are at risk if their period ends within the next days_left days (1: ends today)
+    :return: pandas dataframe with name, periodicity, current streak and end of the running period
+    """
+    if current_day is None:
+        current_day = datetime.now(pytz.utc).date()
+    if not isinstance(days_left, int) or days_left < 1:
+        raise ValueError("Days left must be a positive integer!")
+
+    list_at_risk = []
+    for habit in habit_instances:
+        streak, end_running_period = habit.running_streak(current_day)
+        if streak == 0:
+            continue
+        # only habits that have not been checked-off in the current period (start of the period has been reached)
+        start_running_period = end_running_period - timedelta(habittracker.periods.period_step(habit.period) - 1)
+        if start_running_period <= current_day and (end_running_period - current_day).days < days_left:
+            list_at_risk.append({"Name": habit.name,
+                                 "Periodicity": "daily" if habit.period == "D" else "weekly",
+                                 "Current Streak": streak,
+                                 "Period ends": f"{end_running_period}"})
+
+    df_at_risk = pd.DataFrame(list_at_risk, columns=["Name", "Periodicity", "Current Streak", "Period ends"])
+
+    return df_at_risk.sort_values(by=["Period ends", "Current Streak"], ascending=[True, False])
+
+
+def render_table(df_table, stream=None, max_len_spec=None):
+    """
+    Rendering a pandas dataframe as fixed-width (markdown pipe) table without going through tabulate.
+    The cells are converted to strings chunk by chunk (render_chunk_rows rows): the column widths are calculated
+    column-wise in a first pass, afterwards the rows of every chunk are padded and joined vectorized.
+    If a stream is given, every chunk is written to it as soon as it's rendered, so the whole table is never held
+    as strings.
+
+    :param df_table: pandas dataframe to be rendered (index is not displayed)
+    :param stream: file-like object (e.g. sys.stdout) the rows are written to - None returns the table as string
+    :param max_len_spec: maximum number of characters in column 'Specification' (longer values are truncated)
+    :return: table as string (if no stream is given) or None (if table has been written to stream)
+    """
+    if not isinstance(df_table, pd.DataFrame):
+        raise TypeError("Table to be rendered must be a pandas dataframe!")
+    if max_len_spec is not None and (not isinstance(max_len_spec, int) or max_len_spec < 4):
+        raise ValueError("Maximum length of specification must be an integer of at least 4!")
+
+    # numeric columns are right-aligned like in markdown
+    # (frames built with DataFrame.append() hold object columns: their numeric dtype is inferred first)
+    df_types = df_table.infer_objects()
+    right_aligned = [pd.api.types.is_numeric_dtype(df_types[column]) for column in df_table.columns]
+    del df_types
+    list_bounds = [(start, min(start + render_chunk_rows, len(df_table)))
+                   for start in range(0, len(df_table), render_chunk_rows)]
+
+    # calculating the column widths (maximum of header and cell lengths) column-wise, chunk by chunk
+    headers = [str(column) for column in df_table.columns]
+    widths = np.array([len(header) for header in headers], dtype=int)
+    for start, end in list_bounds:
+        df_cells = table_cells(df_table.iloc[start:end], max_len_spec)
+        widths = np.maximum(widths, df_cells.apply(lambda column: column.str.len().max()).to_numpy(dtype=int))
+
+    # header and separator line
+    line_header = "| " + " | ".join(header.rjust(width) if right else header.ljust(width)
+                                    for header, width, right in zip(headers, widths, right_aligned)) + " |"
+    line_separator = "|" + "|".join(("-" * (width + 1) + ":") if right else (":" + "-" * (width + 1))
+                                    for width, right in zip(widths, right_aligned)) + "|"
+    # rendered chunks are only collected if the table is returned as string
+    list_chunks = [f"{line_header}\n{line_separator}"]
+    if stream is not None:
+        stream.write(f"{line_header}\n{line_separator}\n")
+
+    # padded rows of every chunk (padding and joining done column-wise)
+    for start, end in list_bounds:
+        df_cells = table_cells(df_table.iloc[start:end], max_len_spec)
+        rows = pd.Series("| ", index=df_cells.index)
+        for n, column in enumerate(df_cells.columns):
+            rows = rows + df_cells[column].str.pad(int(widths[n]), side="left" if right_aligned[n] else "right") + \
+                   (" | " if n < len(df_cells.columns) - 1 else " |")
+        if stream is not None:
+            stream.write("\n".join(rows.tolist()) + "\n")
+        else:
+            list_chunks.append("\n".join(rows.tolist()))
+
+    return "\n".join(list_chunks) if stream is None else None
+
+
+def table_cells(df_chunk, max_len_spec=None):
+    """
+    Converting the cells of rows of a table to strings (see render_table())
+
+    :param df_chunk: pandas dataframe with the rows to be rendered
+    :param max_len_spec: maximum number of characters in column 'Specification' (longer values are truncated)
+    :return: pandas dataframe with every cell as string
+    """
+    df_cells = df_chunk.astype(str)
+    # truncating long specifications
+    if max_len_spec is not None and "Specification" in df_cells.columns:
+        too_long = df_cells["Specification"].str.len() > max_len_spec
+        df_cells.loc[too_long, "Specification"] = df_cells.loc[too_long, "Specification"].str.slice(
+            0, max_len_spec - 3) + "..."
+    return df_cells
+
+
+def create_analysis(df_analysis, intro_analysis, analysis_sort_by, analysis_periodicity, stream=None,
+                    max_len_spec=None):
     """
     Creating analysis output for all existing habits
 
@@ -60,7 +270,9 @@ def create_analysis(df_analysis, intro_analysis, analysis_sort_by, analysis_peri
     :param analysis_sort_by: parameter according to the habits are to be sorted ('name', 'created on' or 'streaks')
     :param intro_analysis: name of the analysis that is displayed at the top of the analysis
     :param df_analysis: pandas dataframe for analyzing existing habits
-    :return: string with intro, main analysis and outro
+    :param stream: file-like object (e.g. sys.stdout) the analysis is written to - None returns the analysis as string
+    :param max_len_spec: maximum number of characters displayed for the specification (None: no truncation)
+    :return: string with intro, main analysis and outro (None if analysis has been written to stream)
     """
     # to use 'isin'-functionality, 'analysis_periodicity' needs to be a list
     if not isinstance(df_analysis, pd.DataFrame):
@@ -81,6 +293,9 @@ def create_analysis(df_analysis, intro_analysis, analysis_sort_by, analysis_peri
     # text at the end of the displayed analysis (number of analyzed habits) according to (non-) empty dataframe
     if df_analysis_output.empty:
         outro_analysis = f"There are no habits to be analyzed!"
+        if stream is not None:
+            stream.write(f"{intro_analysis}\n{outro_analysis}\n")
+            return None
         return f"{intro_analysis}\n{outro_analysis}"
     else:
         outro_analysis = f"\nNumber of analyzed habits: {len(df_analysis_output)}\n"
@@ -100,9 +315,20 @@ def create_analysis(df_analysis, intro_analysis, analysis_sort_by, analysis_peri
                                                                 "Percentage checked-off periods",
                                                                 "Longest Streak",
                                                                 "Period Longest Streak",
-                                                                "Created on"]]
+                                                                "Current Streak",
+                                                                "Created on"] +
+                                                         [column for column in create_windows()
+                                                          if column in df_analysis_output.columns]]
 
-        return f"{intro_analysis}\n{output_analysis_all_habits.to_markdown(index=False)}\n{outro_analysis}"
+        if stream is not None:
+            # writing intro, table (row by row) and outro directly to the stream
+            stream.write(f"{intro_analysis}\n")
+            render_table(output_analysis_all_habits, stream, max_len_spec)
+            stream.write(f"{outro_analysis}\n")
+            return None
+
+        return f"{intro_analysis}\n{render_table(output_analysis_all_habits, max_len_spec=max_len_spec)}\n" \
+               f"{outro_analysis}"
 
 
 def details_habit(habit):
@@ -117,7 +343,7 @@ def details_habit(habit):
         raise TypeError("Parameter is not of class Habit!")
 
     # reading stored habit data
-    df_habit_details = pd.read_json(habit.file)
+    df_habit_details = habittracker.history.read_habit_file(habit.file, habit.period)
     if df_habit_details.empty:
         intro_analysis = f"No detailed analysis for '{habit.name}'!"
         return intro_analysis
@@ -133,6 +359,7 @@ def details_habit(habit):
                                      f"{df_habit_overview_data['Percentage checked-off periods']}\n" \
                                      f"Longest Streak: {df_habit_overview_data['Longest Streak']}\n" \
                                      f"Period Longest Streak: {df_habit_overview_data['Period Longest Streak']}\n" \
+                                     f"Current Streak: {habit.running_streak()[0]}\n" \
                                      f"Created on: {df_habit_overview_data['Created on']}\n"
 
         # converting date-values from pandas default type to datetime
@@ -143,12 +370,15 @@ def details_habit(habit):
         df_habit_details["Check-off date"] = \
             df_habit_details["Check-off date"].apply(lambda x: datetime.strftime(x, "%Y-%m-%d %H:%M:%S") if x != "-" else x)
         # creating new column 'period' on basis of the index for better readability
-        df_habit_details["Period"] = df_habit_details.index
-        # depending on periodicity (daily / weekly) the column 'period' is calculated
-        df_habit_details["Period"] = df_habit_details["Period"].apply(
-            lambda x: f"{x.date()}" if habit.period == "D" else f"{x.date()} - {x.date() + timedelta(6)}")
+        days = habittracker.periods.to_days(df_habit_details.index)
+        # depending on periodicity (daily / weekly) the column 'period' is calculated from the day numbers
+        if habit.period == "D":
+            df_habit_details["Period"] = habittracker.periods.to_strings(days)
+        else:
+            df_habit_details["Period"] = np.char.add(np.char.add(habittracker.periods.to_strings(days), " - "),
+                                                     habittracker.periods.to_strings(days + 6))
 
         # defining the columns for output
         df_habit_details = df_habit_details[["Period", "Checked-off", "Check-off date"]].sort_index(ascending=False)
 
-        return f"{intro_analysis}\n{output_habit_overview_data}\n{df_habit_details.to_markdown(index=False)}"
+        return f"{intro_analysis}\n{output_habit_overview_data}\n{render_table(df_habit_details)}"
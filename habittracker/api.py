@@ -0,0 +1,305 @@
+"""
+asyncio API layer of the habit tracker: the operations of habits and analyze as coroutines, so a service can handle
+many requests at the same time. Blocking work (storage, pandas) runs in an executor, writes are serialized per habit
+(writers of different habits and analyses of other habits don't wait for each other).
+Before every request the habits whose deadline has passed are auto-updated (while holding their locks), like the daemon
+does. Operations that need several habits take their locks in the order of the names, so they can't deadlock.
+
+Start as service (from the root directory of the project): python -m habittracker.api
+(same protocol and client as the daemon, see client.py)
+"""
+import os
+import sys
+import asyncio
+import functools
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import numpy as np
+import pytz
+
+from habittracker import analyze
+from habittracker import client
+from habittracker import habits
+from habittracker import main
+from habittracker import periods
+
+
+class HabitAPI:
+    """
+    Asynchronous operations on the habits kept in memory (habits.list_habit_instances)
+    """
+
+    def __init__(self, absolute_path_habit_overview, absolute_directory_habit_files, max_workers=4):
+        self.path_habit_overview = absolute_path_habit_overview
+        self.directory_habit_files = absolute_directory_habit_files
+        # executor for blocking storage and pandas work
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="habittracker-api")
+        # name of the habit -> asyncio.Lock serializing the operations on the habit
+        self.dict_locks = {}
+        # lock for changes of the list of habits and of the auto-update scheduler (create, delete, auto-update)
+        self.lock_habits = asyncio.Lock()
+        # set as soon as the service has been asked to shut down (see serve())
+        self.stopped = asyncio.Event()
+        # operation of a request -> coroutine function handling it
+        self.dict_operations = {"list": self.list_habits,
+                                "create": self.create_habit,
+                                "check_off": self.check_off_habit,
+                                "delete": self.delete_habit,
+                                "analysis": self.analysis,
+                                "at_risk": self.habits_at_risk,
+                                "details": self.details_habit,
+                                "shutdown": self.shutdown}
+
+    async def run_blocking(self, function, *args):
+        """
+        Running blocking work in the executor (the event loop keeps serving other requests meanwhile)
+
+        :param function: function to be called
+        :param args: arguments of the function
+        :return: return value of the function
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(function, *args))
+
+    def lock(self, name):
+        """
+        :param name: name of the habit
+        :return: asyncio.Lock of the habit
+        """
+        if name not in self.dict_locks:
+            self.dict_locks[name] = asyncio.Lock()
+        return self.dict_locks[name]
+
+    @contextlib.asynccontextmanager
+    async def locks(self, list_habits):
+        """
+        Holding the locks of several habits (acquired in the order of the names)
+
+        :param list_habits: list of habit instances
+        :return:
+        """
+        async with contextlib.AsyncExitStack() as stack:
+            for name in sorted({habit.name for habit in list_habits}):
+                await stack.enter_async_context(self.lock(name))
+            yield
+
+    async def run_due_auto_updates(self):
+        """
+        Auto-updating the habits whose deadline has passed (see scheduler.py) while holding their locks.
+        As long as no habit is due, only the earliest deadline is looked at.
+
+        :return: list of the status of every auto-updated habit
+        """
+        current_day = periods.to_day(datetime.now(pytz.utc))
+        if not habits.auto_update_scheduler.is_due(current_day):
+            return []
+        async with self.lock_habits:
+            async with self.locks(habits.auto_update_scheduler.due_habits(current_day)):
+                return await self.run_blocking(habits.run_due_auto_updates, current_day)
+
+    def find_habit(self, name):
+        """
+        :param name: name of the habit
+        :return: habit instance (ValueError if there's no habit with this name)
+        """
+        for habit in habits.list_habit_instances:
+            if habit.name == name:
+                return habit
+        raise ValueError(f"Habit '{name}' doesn't exist!")
+
+    async def list_habits(self):
+        """
+        :return: list of dictionaries (name, specification, periodicity) of all habits
+        """
+        return [{"Name": habit.name, "Specification": habit.spec, "Periodicity": habit.period}
+                for habit in habits.list_habit_instances]
+
+    async def create_habit(self, name, spec, period):
+        """
+        :return: Status (string)
+        """
+        if period not in ["D", "7d"]:
+            raise ValueError("Periodicity must be 'D' (daily) or '7d' (weekly)!")
+        async with self.lock_habits:
+            if any(habit.name == name for habit in habits.list_habit_instances):
+                raise ValueError(f"Habit '{name}' already exists!")
+            async with self.lock(name):
+                return await self.run_blocking(habits.create_habit, (name, spec, period), self.path_habit_overview,
+                                               self.directory_habit_files)
+
+    async def check_off_habit(self, name):
+        """
+        :return: Status (string)
+        """
+        async with self.lock(name):
+            return await self.run_blocking(self.find_habit(name).check_off_habit)
+
+    async def delete_habit(self, name):
+        """
+        :return: Status (string)
+        """
+        async with self.lock_habits:
+            async with self.lock(name):
+                status = await self.run_blocking(self.find_habit(name).remove_habit, self.path_habit_overview)
+            self.dict_locks.pop(name, None)
+            return status
+
+    async def analyze_habit(self, habit, windows):
+        """
+        :param habit: habit instance
+        :param windows: date windows (see analyze.create_windows())
+        :return: dictionary with the results of the habit (see analyze.analyze_row())
+        """
+        async with self.lock(habit.name):
+            return await self.run_blocking(analyze.analyze_row, habit, windows)
+
+    async def analysis(self):
+        """
+        Overview analysis of all habits: the habits are analyzed concurrently, each one while holding its lock
+
+        :return: overview analysis of all habits (table as string)
+        """
+        windows = analyze.create_windows()
+        list_results = await asyncio.gather(*[self.analyze_habit(habit, windows)
+                                              for habit in list(habits.list_habit_instances)])
+        if not list_results:
+            return "ERROR: No habits existing for analysis!"
+        df_analysis = await self.run_blocking(analyze.create_analysis_dataframe, list_results, windows)
+        return await self.run_blocking(functools.partial(analyze.render_table, df_analysis, max_len_spec=40))
+
+    async def habits_at_risk(self):
+        """
+        :return: running streaks whose period ends soon (table as string)
+        """
+        list_habits = list(habits.list_habit_instances)
+        async with self.locks(list_habits):
+            df_at_risk = await self.run_blocking(analyze.request_habits_at_risk, list_habits)
+        if df_at_risk.empty:
+            return "No running streaks at risk. Well done!"
+        return await self.run_blocking(analyze.render_table, df_at_risk)
+
+    async def shutdown(self):
+        """
+        Saving the state of the habits (closing routine) and stopping the service
+
+        :return: Status of the closing routine (string)
+        """
+        async with self.lock_habits:
+            async with self.locks(habits.list_habit_instances):
+                status = await self.run_blocking(main.closing_routine, self.path_habit_overview)
+        self.stopped.set()
+        return status
+
+    async def details_habit(self, name):
+        """
+        :return: detailed analysis of a habit (string)
+        """
+        async with self.lock(name):
+            return await self.run_blocking(analyze.details_habit, self.find_habit(name))
+
+    async def handle(self, message):
+        """
+        Handling one request (same protocol as the daemon)
+
+        :param message: request (dictionary with 'op' and the parameters of the operation)
+        :return: response (dictionary with 'status' ('ok' or 'error') and 'result' or 'message')
+        """
+        # valid .json, but not a request (e.g. a list or a string)
+        if not isinstance(message, dict):
+            return {"status": "error", "message": "Request must be a .json object!"}
+        operation = message.pop("op", None)
+        if operation not in self.dict_operations:
+            return {"status": "error", "message": f"Unknown operation '{operation}'!"}
+        try:
+            # filling periods missed since the last request (only habits whose deadline has passed)
+            await self.run_due_auto_updates()
+            result = await self.dict_operations[operation](**message)
+        except (TypeError, ValueError) as error:
+            return {"status": "error", "message": str(error)}
+        if isinstance(result, str) and result.split(" ")[0] == "ERROR:":
+            return {"status": "error", "message": result[len("ERROR: "):]}
+        return {"status": "ok", "result": result}
+
+    async def handle_connection(self, reader, writer):
+        """
+        Reading the requests of a connection (one .json per line) and answering each of them with one line
+
+        :param reader: asyncio.StreamReader
+        :param writer: asyncio.StreamWriter
+        :return:
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = client.decode_message(line)
+                except ValueError:
+                    response = {"status": "error", "message": "Request is not valid .json!"}
+                else:
+                    response = await self.handle(message)
+                writer.write(client.encode_message(response))
+                await writer.drain()
+                if self.stopped.is_set():
+                    break
+        finally:
+            writer.close()
+
+
+def latency_percentiles(list_latencies, list_percentiles=(50, 95, 99)):
+    """
+    :param list_latencies: latencies of requests (seconds)
+    :param list_percentiles: percentiles to be calculated
+    :return: dictionary percentile (e.g. 'p95') -> latency in milliseconds
+    """
+    values = np.percentile(np.asarray(list_latencies, dtype=float) * 1000, list_percentiles)
+    return {f"p{percentile}": round(float(value), 2) for percentile, value in zip(list_percentiles, values)}
+
+
+async def serve(api, socket_path=client.DEFAULT_SOCKET):
+    """
+    Serving requests of any number of clients concurrently until the service is shut down (or cancelled)
+
+    :param api: HabitAPI with the loaded habits
+    :param socket_path: path to unix domain socket
+    :return:
+    """
+    server = await asyncio.start_unix_server(api.handle_connection, path=socket_path)
+    try:
+        async with server:
+            await api.stopped.wait()
+    finally:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def run(socket_path=client.DEFAULT_SOCKET):
+    """
+    Loading the habits once (starting routine of the app) and serving requests asynchronously
+
+    :param socket_path: path to unix domain socket
+    :return: exit code
+    """
+    config_data = main.read_config_data()
+    if config_data["Status config-file"].split(" ")[0] == "ERROR:":
+        print(config_data["Status config-file"])
+        return 1
+    absolute_path_habit_overview, relative_path_habit_files, absolute_directory_habit_files = \
+        main.apply_config_data(config_data)
+    print(main.starting_routine(absolute_path_habit_overview, relative_path_habit_files))
+
+    async def run_api():
+        api = HabitAPI(absolute_path_habit_overview, absolute_directory_habit_files)
+        print(f"Serving {len(habits.list_habit_instances)} habits on '{socket_path}' ...")
+        await serve(api, socket_path)
+
+    try:
+        asyncio.run(run_api())
+    except KeyboardInterrupt:
+        print(main.closing_routine(absolute_path_habit_overview))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,234 @@
+import os
+import struct
+import numpy as np
+import pandas as pd
+
+from habittracker import periods
+from habittracker import storage
+
+
+# binary habit file: fixed-size header followed by the packed period arrays
+# header: magic, version, step (days between two periods), day number of the first period,
+#         number of periods, capacity (number of periods the arrays have room for)
+MAGIC = b"HBIN"
+VERSION = 1
+HEADER = struct.Struct("<4sHHqqq")
+# check-off date of periods that haven't been checked-off
+NO_CHECK_OFF = np.iinfo(np.int64).min
+# minimum capacity of a new binary habit file (doubled whenever the arrays are full)
+MIN_CAPACITY = 64
+
+
+def offsets(capacity):
+    """
+    Byte offsets of the packed period arrays within a binary habit file
+
+    :param capacity: number of periods the arrays have room for
+    :return: tuple (offset of the check-offs (one byte per period), offset of the check-off dates (int64 per period),
+             size of the file)
+    """
+    offset_checked_off = HEADER.size
+    # check-off dates are aligned to eight bytes
+    offset_dates = offset_checked_off + (capacity + 7) // 8 * 8
+    return offset_checked_off, offset_dates, offset_dates + 8 * capacity
+
+
+class BinaryHistory:
+    """
+    Check-off history of a habit stored in a binary habit file: a fixed-size header plus packed period arrays
+    (one byte per period: 1 checked-off / 0 missed, one int64 per period: check-off date in milliseconds
+    since 1970-01-01 UTC). Histories read from a file are zero-copy numpy views of the memory-mapped file,
+    so no text has to be parsed and the page cache of the operating system keeps the data in memory.
+    """
+
+    def __init__(self, period, start=None, checked_off=(), check_off_dates=()):
+        self.period = period
+        self.step_days = periods.period_step(period)
+        # day number of the first period (None as long as there is no period)
+        self.start_day = periods.as_day(start)
+        self.array_checked_off = np.asarray(checked_off, dtype=bool)
+        # check-off dates in milliseconds since epoch (UTC), NO_CHECK_OFF for missed periods
+        self.array_dates = np.asarray(check_off_dates, dtype=np.int64)
+        if len(self.array_checked_off) != len(self.array_dates):
+            raise ValueError("Number of check-off dates doesn't fit the number of periods!")
+        # file the history has been read from, number of periods and capacity of that file
+        self.file = None
+        self.stored_length = 0
+        self.capacity = 0
+
+    def __len__(self):
+        return len(self.array_checked_off)
+
+    def step(self):
+        """
+        :return: days between two periods (daily: 1, weekly: 7)
+        """
+        return self.step_days
+
+    @property
+    def start(self):
+        """
+        :return: date of the first period (None if there is no period)
+        """
+        return None if self.start_day is None else periods.to_date(self.start_day)
+
+    def last_day(self):
+        """
+        :return: day number of the last period (None if there is no period)
+        """
+        if len(self) == 0:
+            return None
+        return self.start_day + self.step_days * (len(self) - 1)
+
+    def last_date(self):
+        """
+        :return: date of the last period (None if there is no period)
+        """
+        return None if len(self) == 0 else periods.to_date(self.last_day())
+
+    def checked_off(self):
+        """
+        :return: numpy boolean array with one entry per period (zero-copy view if read from a file)
+        """
+        return self.array_checked_off
+
+    def count_checked_off(self):
+        """
+        :return: number of checked-off periods
+        """
+        return int(np.count_nonzero(self.array_checked_off))
+
+    def longest_streak(self):
+        """
+        Longest streak (first one if there are several), calculated vectorized from the check-offs
+
+        :return: tuple (length of the streak, date of its first period, date of its last period)
+                 - (0, None, None) if no period has been checked-off
+        """
+        max_streak, position = periods.longest_run(self.array_checked_off)
+        if max_streak == 0:
+            return 0, None, None
+        start_streak = self.start_day + self.step_days * position
+        return max_streak, periods.to_date(start_streak), periods.to_date(start_streak + self.step_days * (max_streak - 1))
+
+    def extend(self, df_appended):
+        """
+        Appending periods given in the dataframe layout of the habit file
+
+        :param df_appended: pandas dataframe with the appended periods
+        :return:
+        """
+        if df_appended.empty:
+            return
+        if len(self) == 0:
+            self.start_day = int(periods.to_days(df_appended.index[:1])[0])
+        checked_off = (df_appended["Checked-off"] == "Yes").to_numpy()
+        check_off_dates = pd.to_datetime(df_appended["Check-off date"].where(checked_off), utc=True)
+        dates = check_off_dates.dt.tz_localize(None).to_numpy(dtype="datetime64[ms]").astype(np.int64)
+        dates[~checked_off] = NO_CHECK_OFF
+        # new arrays in memory (the mapping of the file is released as soon as nothing refers to it anymore)
+        self.array_checked_off = np.concatenate((self.array_checked_off, checked_off))
+        self.array_dates = np.concatenate((self.array_dates, dates))
+
+    @classmethod
+    def from_dataframe(cls, df_habit, period):
+        """
+        :param df_habit: pandas dataframe with columns 'Checked-off' and 'Check-off date' and a date index
+        :param period: periodicity of the habit ('D' or '7d')
+        :return: BinaryHistory
+        """
+        binary_history = cls(period)
+        binary_history.extend(df_habit)
+        return binary_history
+
+    def to_dataframe(self):
+        """
+        :return: pandas dataframe with columns 'Checked-off' and 'Check-off date' and a date index
+        """
+        if len(self) == 0:
+            return pd.DataFrame(columns=["Checked-off", "Check-off date"])
+
+        check_off_dates = self.array_dates.astype("datetime64[ms]")
+        check_off_dates[~self.array_checked_off] = np.datetime64("NaT")
+        return pd.DataFrame({"Checked-off": np.where(self.array_checked_off, "Yes", "No").astype(object),
+                             "Check-off date": check_off_dates},
+                            index=periods.to_date_index(self.start_day + self.step_days * np.arange(len(self))))
+
+    @classmethod
+    def read(cls, file, period=None):
+        """
+        Reading a binary habit file through a read-only memory mapping (the arrays are views of the mapping)
+
+        :param file: path to binary habit file
+        :param period: periodicity of the habit (optional, taken from the header)
+        :return: BinaryHistory
+        """
+        buffer = storage.backend.map(file)
+
+        magic, version, step, start_day, length, capacity = HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("File is not a binary habit file!")
+        offset_checked_off, offset_dates, size = offsets(capacity)
+        if len(buffer) < size:
+            raise ValueError("Binary habit file is truncated!")
+
+        binary_history = cls("D" if step == 1 else "7d",
+                             start_day if length > 0 else None,
+                             np.frombuffer(buffer, dtype=bool, count=length, offset=offset_checked_off),
+                             np.frombuffer(buffer, dtype=np.int64, count=length, offset=offset_dates))
+        if period is not None and binary_history.period != period:
+            raise ValueError("Periodicity of the binary habit file doesn't fit the habit!")
+        binary_history.file = os.path.abspath(file)
+        binary_history.stored_length = length
+        binary_history.capacity = capacity
+        return binary_history
+
+    def write(self, file):
+        """
+        Saving the history to a binary habit file. If the history has been read from this file and the arrays
+        of the file have room for the appended periods, only the appended periods and the header are written
+        (in place), otherwise the file is rewritten with doubled capacity (temporary file replacing the habit file).
+
+        :param file: path to file
+        :return:
+        """
+        length = len(self)
+        header = HEADER.pack(MAGIC, VERSION, self.step_days, self.start_day or 0, length,
+                             max(self.capacity, length))
+
+        if self.file == os.path.abspath(file) and self.stored_length <= length <= self.capacity \
+                and storage.backend.exists(file):
+            offset_checked_off, offset_dates, size = offsets(self.capacity)
+            start, end = self.stored_length, length
+            # the appended periods lie behind the stored length: they are flushed to disk before the header with the
+            # new length is written (the header lies within the first sector of the file), so a crash in between
+            # leaves the previous history - never a length covering periods that haven't been written
+            storage.backend.write_ranges(file, [
+                (offset_checked_off + start, self.array_checked_off[start:end].tobytes()),
+                (offset_dates + 8 * start, self.array_dates[start:end].tobytes())])
+            storage.backend.write_ranges(file, [(0, header)])
+        else:
+            self.capacity = max(MIN_CAPACITY, self.capacity)
+            while self.capacity < length:
+                self.capacity *= 2
+            header = HEADER.pack(MAGIC, VERSION, self.step_days, self.start_day or 0, length, self.capacity)
+            offset_checked_off, offset_dates, size = offsets(self.capacity)
+            content = bytearray(size)
+            content[:HEADER.size] = header
+            content[offset_checked_off:offset_checked_off + length] = self.array_checked_off.tobytes()
+            content[offset_dates:offset_dates + 8 * length] = self.array_dates.tobytes()
+            storage.backend.write_bytes(file, content)
+
+        self.file = os.path.abspath(file)
+        self.stored_length = length
+
+
+def is_binary_file(file):
+    """
+    Binary habit files keep the name of the habit file (.json, stored in the habit overview), so they are recognized
+    by the magic bytes at the start of the file (MAGIC), never by the extension.
+
+    :param file: path to habit file
+    :return: True if the file is a binary habit file (checked by the magic bytes)
+    """
+    return storage.backend.read_prefix(file, len(MAGIC)) == MAGIC
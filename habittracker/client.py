@@ -0,0 +1,110 @@
+"""
+Thin client for the habit tracker daemon (see daemon.py).
+Only the standard library is imported (no pandas), so a request is answered within milliseconds.
+
+Usage (from the root directory of the project, while the daemon is running):
+    python -m habittracker.client list
+    python -m habittracker.client check-off "<name of the habit>"
+    python -m habittracker.client create "<name>" "<specification>" <D|7d>
+    python -m habittracker.client delete "<name of the habit>"
+    python -m habittracker.client analysis | at-risk | details "<name of the habit>"
+    python -m habittracker.client shutdown
+"""
+import sys
+import json
+import socket
+
+
+# default path of the unix domain socket of the daemon (relative to the root directory of the project)
+DEFAULT_SOCKET = "habittracker.sock"
+# maximum time to wait for a response (seconds)
+TIMEOUT = 30
+
+
+def encode_message(message):
+    """
+    Encoding a request / response as one line .json
+
+    :param message: dictionary
+    :return: bytes
+    """
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def decode_message(line):
+    """
+    :param line: one line .json (bytes)
+    :return: dictionary
+    """
+    return json.loads(line.decode("utf-8"))
+
+
+def request(operation, socket_path=DEFAULT_SOCKET, **parameters):
+    """
+    Sending one request to the daemon and waiting for its response
+
+    :param operation: name of the operation (see daemon.HabitDaemon.dict_operations)
+    :param socket_path: path to unix domain socket of the daemon
+    :param parameters: parameters of the operation (e.g. name='Reading')
+    :return: response (dictionary with 'status' ('ok' or 'error') and 'result' or 'message')
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(TIMEOUT)
+        connection.connect(socket_path)
+        connection.sendall(encode_message(dict(parameters, op=operation)))
+        with connection.makefile("rb") as stream:
+            return decode_message(stream.readline())
+
+
+def parse_arguments(arguments):
+    """
+    Converting command line arguments into operation and parameters of a request
+
+    :param arguments: list of strings (sys.argv[1:])
+    :return: tuple (operation, dictionary of parameters)
+    """
+    if not arguments:
+        raise ValueError("Operation is missing! See usage.")
+    operation = arguments[0].replace("-", "_")
+    if operation == "create":
+        if len(arguments) != 4:
+            raise ValueError("Name, specification and periodicity are needed!")
+        return operation, {"name": arguments[1], "spec": arguments[2], "period": arguments[3]}
+    if operation in ["check_off", "delete", "details"]:
+        if len(arguments) != 2:
+            raise ValueError("Name of the habit is needed!")
+        return operation, {"name": arguments[1]}
+    return operation, {}
+
+
+def main(arguments=None):
+    """
+    Command line interface of the client
+
+    :param arguments: list of strings (default: sys.argv[1:])
+    :return: exit code (0: success, 1: error)
+    """
+    try:
+        operation, parameters = parse_arguments(sys.argv[1:] if arguments is None else arguments)
+        response = request(operation, **parameters)
+    except ValueError as error:
+        print(f"ERROR: {error}\n{__doc__}")
+        return 1
+    except OSError:
+        print("ERROR: Daemon is not running! Start it with 'python -m habittracker.daemon'.")
+        return 1
+
+    if response["status"] != "ok":
+        print(f"ERROR: {response['message']}")
+        return 1
+    result = response["result"]
+    if isinstance(result, list):
+        for habit in result:
+            print(f"{habit['Name']} ({habit['Periodicity']}): {habit['Specification']}")
+    else:
+        print(result)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
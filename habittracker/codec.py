@@ -0,0 +1,273 @@
+import json
+import numpy as np
+import pandas as pd
+
+from habittracker import storage
+
+
+# schema of the habit file (dataframe layout): date index and these columns
+list_habit_columns = ["Checked-off", "Check-off date"]
+# schema of the habit overview file: integer index and these columns
+list_overview_columns = ["Name", "Specification", "Periodicity", "Created on", "File Directory"]
+# columns of the habit overview file holding timestamps
+list_overview_date_columns = ["Created on"]
+
+# day (days since 1970-01-01) -> key of the period in a habit file (ISO string), see format_period_keys()
+dict_period_keys = {}
+
+
+def parse_keys(keys):
+    """
+    Parsing the keys of a column object of a pandas .json-file to a date index.
+    Keys are either ISO strings (date_format='iso') or milliseconds since 1970-01-01 (older files).
+
+    :param keys: list of strings
+    :return: numpy datetime64[ms] array
+    """
+    if keys and keys[0].isdigit():
+        return np.array(keys, dtype=np.int64).astype("datetime64[ms]")
+    if keys and keys[0].endswith("Z"):
+        # keys of a tz-aware index
+        keys = [key[:-1] if key.endswith("Z") else key for key in keys]
+    return np.array(keys, dtype="datetime64[ms]")
+
+
+def parse_timestamps(values):
+    """
+    Parsing timestamp values of a pandas .json-file (ISO strings, milliseconds since 1970-01-01 or null).
+    Naive timestamps are regarded as UTC.
+
+    :param values: list of strings, integers or None
+    :return: pandas DatetimeIndex (UTC, NaT for null)
+    """
+    first_value = next((value for value in values if value is not None), None)
+    if isinstance(first_value, (int, float)):
+        return pd.DatetimeIndex(pd.to_datetime(pd.Series(values, dtype="float64"), unit="ms", utc=True))
+    # only the non-null values are parsed (not checked-off periods stay NaT)
+    positions = [position for position, value in enumerate(values) if value is not None]
+    try:
+        # fast path: ISO strings in UTC as written by pandas and the codec (parsed by numpy)
+        parsed = np.array([values[position][:-1] if values[position].endswith("Z") else values[position]
+                           for position in positions], dtype="datetime64[ms]")
+    except ValueError:
+        # any other timezone information
+        return pd.DatetimeIndex(pd.to_datetime(pd.Series(values, dtype="object"), utc=True))
+    timestamps = np.full(len(values), np.datetime64("NaT"), dtype="datetime64[ns]")
+    timestamps[positions] = parsed
+    return pd.DatetimeIndex(timestamps).tz_localize("UTC")
+
+
+def format_timestamps(values):
+    """
+    Formatting timestamps as ISO strings in UTC (like pandas with date_format='iso'), null values as None
+
+    :param values: pandas series of datetimes, pandas timestamps, ISO strings or null values
+    :return: list of strings or None
+    """
+    if not pd.api.types.is_datetime64_any_dtype(values):
+        # mixed column (e.g. appended check-offs): converted to UTC timestamps first
+        values = pd.to_datetime(values.astype(object), utc=True)
+    timestamps = pd.DatetimeIndex(values)
+    if timestamps.tz is not None:
+        timestamps = timestamps.tz_convert("UTC").tz_localize(None)
+    timestamps = timestamps.to_numpy().astype("datetime64[ms]")
+    strings = np.full(len(timestamps), None, dtype=object)
+    # only the non-null values are formatted (most periods of a habit aren't checked-off)
+    not_null = ~np.isnat(timestamps)
+    strings[not_null] = [string + "Z" for string in np.datetime_as_string(timestamps[not_null], unit="ms").tolist()]
+    return strings.tolist()
+
+
+def format_period_keys(index):
+    """
+    Formatting the date index of a habit file as ISO strings (keys of the column objects).
+    The periods start at midnight, so the keys are formatted per day and cached: all habits share the same days.
+
+    :param index: date index (pandas DatetimeIndex or numpy datetime64 array)
+    :return: list of strings
+    """
+    timestamps = pd.DatetimeIndex(index).values.astype("datetime64[ms]")
+    days = timestamps.astype("datetime64[D]")
+    if not (days == timestamps).all():
+        # periods not starting at midnight (e.g. edited by hand)
+        return np.datetime_as_string(timestamps, unit="ms").tolist()
+    list_days = days.astype(np.int64).tolist()
+    missing = [day for day in set(list_days) if day not in dict_period_keys]
+    if missing:
+        strings = np.datetime_as_string(np.array(missing, dtype="datetime64[D]"), unit="D").tolist()
+        dict_period_keys.update(zip(missing, [f"{string}T00:00:00.000" for string in strings]))
+    return [dict_period_keys[day] for day in list_days]
+
+
+def encode_json_object(keys, encoded_values):
+    """
+    Joining a column object of a pandas .json-file (the ISO keys need no escaping)
+
+    :param keys: list of strings (ISO dates)
+    :param encoded_values: list of JSON-encoded values (strings)
+    :return: JSON object (string)
+    """
+    return "{" + ",".join([f'"{key}":{value}' for key, value in zip(keys, encoded_values)]) + "}"
+
+
+def encode_values(values):
+    """
+    JSON-encoding the values of a column with few distinct values (e.g. 'Yes' / 'No'): every value is encoded once
+
+    :param values: list of values
+    :return: list of JSON-encoded values (strings)
+    """
+    dict_encoded = {value: json.dumps(value) for value in set(values)}
+    return [dict_encoded[value] for value in values]
+
+
+def encode_timestamps(strings):
+    """
+    JSON-encoding ISO strings of format_timestamps() (no escaping needed) and null values
+
+    :param strings: list of strings or None
+    :return: list of JSON-encoded values (strings)
+    """
+    return ["null" if string is None else f'"{string}"' for string in strings]
+
+
+def decode_habit_arrays(content):
+    """
+    Decoding the content of a habit file (dataframe layout) straight into typed arrays
+
+    :param content: content of the habit file (string)
+    :return: tuple (numpy datetime64[ms] array with the periods, numpy boolean array (True: checked-off),
+             pandas DatetimeIndex (UTC) with the check-off dates - NaT if not checked-off)
+    """
+    data = json.loads(content)
+    if sorted(data) != sorted(list_habit_columns):
+        raise ValueError("Content is not a habit file in the dataframe layout!")
+
+    column_checked_off = data["Checked-off"]
+    keys = list(column_checked_off)
+    column_date = data["Check-off date"]
+    checked_off = np.array(list(column_checked_off.values()), dtype=object) == "Yes"
+    # both columns are written with the same keys in the same order (otherwise matched by key)
+    values_date = list(column_date.values()) if list(column_date) == keys else [column_date.get(key) for key in keys]
+    check_off_dates = parse_timestamps(values_date)
+
+    return parse_keys(keys), checked_off, check_off_dates
+
+
+def decode_habit_file(content):
+    """
+    Decoding the content of a habit file (dataframe layout) into the pandas dataframe of the habit data
+    (replacement of pd.read_json() which has to guess orientation and dtypes)
+
+    :param content: content of the habit file (string)
+    :return: pandas dataframe with columns 'Checked-off' and 'Check-off date' (UTC) and a date index
+    """
+    index, checked_off, check_off_dates = decode_habit_arrays(content)
+    return pd.DataFrame({"Checked-off": np.where(checked_off, "Yes", "No").astype(object),
+                         "Check-off date": check_off_dates},
+                        index=pd.DatetimeIndex(index.astype("datetime64[ns]")))
+
+
+def encode_habit_file(df_habit):
+    """
+    Encoding the habit data in the dataframe layout of the habit file
+    (replacement of df_habit.to_json(date_format='iso'), readable by pd.read_json() as well)
+
+    :param df_habit: pandas dataframe with columns 'Checked-off' and 'Check-off date' and a date index
+    :return: content of the habit file (string)
+    """
+    keys = format_period_keys(df_habit.index)
+    checked_off = encode_json_object(keys, encode_values(df_habit["Checked-off"].tolist()))
+    check_off_dates = encode_json_object(keys, encode_timestamps(format_timestamps(df_habit["Check-off date"])))
+    # same content as json.dumps() of both column objects without whitespace
+    return f'{{"Checked-off":{checked_off},"Check-off date":{check_off_dates}}}'
+
+
+def decode_overview(content):
+    """
+    Decoding the content of the habit overview file into a pandas dataframe ('Created on' as UTC timestamps).
+    Files that don't match the schema of the habit overview are read with pandas.
+
+    :param content: content of the habit overview file (string)
+    :return: pandas dataframe
+    """
+    data = json.loads(content)
+    if sorted(data) != sorted(list_overview_columns):
+        return pd.read_json(json.dumps(data))
+
+    keys = list(data["Name"])
+    dict_columns = {}
+    for column in list_overview_columns:
+        # columns are written with the same keys in the same order (otherwise matched by key)
+        values = list(data[column].values()) if list(data[column]) == keys else [data[column].get(key) for key in keys]
+        if column in list_overview_date_columns:
+            # DatetimeArray: kept as UTC timestamps instead of being converted to objects
+            dict_columns[column] = parse_timestamps(values).array
+        else:
+            dict_columns[column] = np.array(values, dtype=object)
+
+    df_overview = pd.DataFrame(dict_columns)
+    # the index is set afterwards: columns passed together with an index (or the column names) are converted to
+    # objects by pandas
+    df_overview.index = np.array(keys, dtype=np.int64)
+    return df_overview
+
+
+def encode_overview(df_overview):
+    """
+    Encoding the habit overview (replacement of df_overview.to_json(date_format='iso'))
+
+    :param df_overview: pandas dataframe with the columns of the habit overview
+    :return: content of the habit overview file (string)
+    """
+    keys = [str(key) for key in df_overview.index]
+    data = {}
+    for column in df_overview.columns:
+        if column in list_overview_date_columns:
+            values = format_timestamps(df_overview[column])
+        else:
+            values = df_overview[column].tolist()
+        data[column] = dict(zip(keys, values))
+    return json.dumps(data, separators=(",", ":"))
+
+
+def read_habit_file(file):
+    """
+    Reading a habit file in the dataframe layout
+
+    :param file: path to habit file (.json)
+    :return: pandas dataframe (see decode_habit_file())
+    """
+    return decode_habit_file(storage.backend.read_text(file))
+
+
+def write_habit_file(file, df_habit):
+    """
+    Saving habit data in the dataframe layout to the habit file
+
+    :param file: path to habit file (.json)
+    :param df_habit: pandas dataframe with columns 'Checked-off' and 'Check-off date' and a date index
+    :return:
+    """
+    storage.backend.write_text(file, encode_habit_file(df_habit))
+
+
+def read_overview(path_habit_overview):
+    """
+    Reading the habit overview file
+
+    :param path_habit_overview: path to .json-habit-overview-file
+    :return: pandas dataframe (see decode_overview())
+    """
+    return decode_overview(storage.backend.read_text(path_habit_overview))
+
+
+def write_overview(path_habit_overview, df_overview):
+    """
+    Saving the habit overview file
+
+    :param path_habit_overview: path to .json-habit-overview-file
+    :param df_overview: pandas dataframe with the columns of the habit overview
+    :return:
+    """
+    storage.backend.write_text(path_habit_overview, encode_overview(df_overview))
@@ -0,0 +1,220 @@
+"""
+Daemon mode of the habit tracker: the habits are loaded once and kept in memory, requests of the client
+(see client.py) are served over a unix domain socket. Check-offs and analyses are answered from memory, so neither
+the start of python / pandas nor re-reading the habit files is paid for each of them.
+
+Start (from the root directory of the project): python -m habittracker.daemon
+"""
+import os
+import sys
+import socket
+import socketserver
+
+from habittracker import analyze
+from habittracker import client
+from habittracker import habits
+from habittracker import main
+from habittracker import watcher
+
+
+class HabitDaemon:
+    """
+    Habits kept in memory and the operations the client can request.
+    Requests are handled one after another, so the habits are never changed by two requests at the same time.
+    """
+
+    def __init__(self, absolute_path_habit_overview, absolute_directory_habit_files):
+        self.path_habit_overview = absolute_path_habit_overview
+        self.directory_habit_files = absolute_directory_habit_files
+        # True as soon as the daemon has been asked to shut down
+        self.stopped = False
+        # habit files changed by other programs are read again (the habits are kept in memory for a long time)
+        self.habit_watcher = watcher.HabitWatcher(absolute_path_habit_overview)
+        # operation of a request -> method handling it
+        self.dict_operations = {"list": self.list_habits,
+                                "create": self.create_habit,
+                                "check_off": self.check_off_habit,
+                                "delete": self.delete_habit,
+                                "analysis": self.analysis,
+                                "at_risk": self.habits_at_risk,
+                                "details": self.details_habit,
+                                "shutdown": self.shutdown}
+
+    def find_habit(self, name):
+        """
+        :param name: name of the habit
+        :return: habit instance (ValueError if there's no habit with this name)
+        """
+        for habit in habits.list_habit_instances:
+            if habit.name == name:
+                return habit
+        raise ValueError(f"Habit '{name}' doesn't exist!")
+
+    def handle(self, message):
+        """
+        Handling one request
+
+        :param message: request (dictionary with 'op' and the parameters of the operation)
+        :return: response (dictionary with 'status' ('ok' or 'error') and 'result' or 'message')
+        """
+        # valid .json, but not a request (e.g. a list or a string)
+        if not isinstance(message, dict):
+            return {"status": "error", "message": "Request must be a .json object!"}
+        operation = message.pop("op", None)
+        if operation not in self.dict_operations:
+            return {"status": "error", "message": f"Unknown operation '{operation}'!"}
+        try:
+            # dropping the cached state of habits changed by other programs since the last request
+            self.habit_watcher.check()
+            # filling periods missed since the last request (only habits whose deadline has passed)
+            habits.run_due_auto_updates()
+            result = self.dict_operations[operation](**message)
+        except (TypeError, ValueError) as error:
+            return {"status": "error", "message": str(error)}
+        if isinstance(result, str) and result.split(" ")[0] == "ERROR:":
+            return {"status": "error", "message": result[len("ERROR: "):]}
+        return {"status": "ok", "result": result}
+
+    def list_habits(self):
+        """
+        :return: list of dictionaries (name, specification, periodicity) of all habits
+        """
+        return [{"Name": habit.name, "Specification": habit.spec, "Periodicity": habit.period}
+                for habit in habits.list_habit_instances]
+
+    def create_habit(self, name, spec, period):
+        """
+        :return: Status (string)
+        """
+        if period not in ["D", "7d"]:
+            raise ValueError("Periodicity must be 'D' (daily) or '7d' (weekly)!")
+        if any(habit.name == name for habit in habits.list_habit_instances):
+            raise ValueError(f"Habit '{name}' already exists!")
+        return habits.create_habit((name, spec, period), self.path_habit_overview, self.directory_habit_files)
+
+    def check_off_habit(self, name):
+        """
+        :return: Status (string)
+        """
+        return self.find_habit(name).check_off_habit()
+
+    def delete_habit(self, name):
+        """
+        :return: Status (string)
+        """
+        return self.find_habit(name).remove_habit(self.path_habit_overview)
+
+    def analysis(self):
+        """
+        :return: overview analysis of all habits (table as string)
+        """
+        df_analysis = analyze.request_analysis(habits.list_habit_instances)
+        if df_analysis.empty:
+            return "ERROR: No habits existing for analysis!"
+        return analyze.render_table(df_analysis, max_len_spec=40)
+
+    def habits_at_risk(self):
+        """
+        :return: running streaks whose period ends soon (table as string)
+        """
+        df_at_risk = analyze.request_habits_at_risk(habits.list_habit_instances)
+        if df_at_risk.empty:
+            return "No running streaks at risk. Well done!"
+        return analyze.render_table(df_at_risk)
+
+    def details_habit(self, name):
+        """
+        :return: detailed analysis of a habit (string)
+        """
+        return analyze.details_habit(self.find_habit(name))
+
+    def shutdown(self):
+        """
+        :return: Status of the closing routine (string)
+        """
+        self.stopped = True
+        self.habit_watcher.close()
+        return main.closing_routine(self.path_habit_overview)
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """
+    Reading the requests of a connection (one .json per line) and answering each of them with one line
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                message = client.decode_message(line)
+            except ValueError:
+                response = {"status": "error", "message": "Request is not valid .json!"}
+            else:
+                response = self.server.habit_daemon.handle(message)
+            self.wfile.write(client.encode_message(response))
+            if self.server.habit_daemon.stopped:
+                break
+
+
+def is_running(socket_path):
+    """
+    :param socket_path: path to unix domain socket
+    :return: True if a daemon answers on the socket
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        try:
+            connection.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+
+def serve(daemon, socket_path=client.DEFAULT_SOCKET):
+    """
+    Serving the requests until the daemon is shut down
+
+    :param daemon: HabitDaemon with the loaded habits
+    :param socket_path: path to unix domain socket
+    :return:
+    """
+    if is_running(socket_path):
+        raise OSError(f"Daemon is already running on '{socket_path}'!")
+    if os.path.exists(socket_path):
+        # socket of a daemon that hasn't been shut down properly
+        os.remove(socket_path)
+
+    with socketserver.UnixStreamServer(socket_path, RequestHandler) as server:
+        server.habit_daemon = daemon
+        try:
+            while not daemon.stopped:
+                server.handle_request()
+        finally:
+            os.remove(socket_path)
+
+
+def run(socket_path=client.DEFAULT_SOCKET):
+    """
+    Loading the habits once (starting routine of the app) and serving requests
+
+    :param socket_path: path to unix domain socket
+    :return: exit code
+    """
+    config_data = main.read_config_data()
+    if config_data["Status config-file"].split(" ")[0] == "ERROR:":
+        print(config_data["Status config-file"])
+        return 1
+    absolute_path_habit_overview, relative_path_habit_files, absolute_directory_habit_files = \
+        main.apply_config_data(config_data)
+    print(main.starting_routine(absolute_path_habit_overview, relative_path_habit_files))
+
+    daemon = HabitDaemon(absolute_path_habit_overview, absolute_directory_habit_files)
+    print(f"Serving {len(habits.list_habit_instances)} habits on '{socket_path}' ...")
+    try:
+        serve(daemon, socket_path)
+    except KeyboardInterrupt:
+        daemon.habit_watcher.close()
+        print(main.closing_routine(absolute_path_habit_overview))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
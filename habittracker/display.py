@@ -1,6 +1,9 @@
 import os
 import questionary
 
+from habittracker import history
+from habittracker import storage
+
 
 def clear():
     """
@@ -111,8 +114,10 @@ def check_available_functions(list_of_habits):
             "Quit"
         ]
 
-    elif not os.listdir(f"{os.path.normpath(os.getcwd() + os.sep)}\docs\habits"):
+    elif not any(storage.backend.exists(habit.file) or habit.file in history.dict_unsaved_histories
+                 for habit in list_of_habits):
         # if habits exist but no detailed habit data is available existing habits can be checked-off
+        # (no habit file written yet - neither saved nor logged, see storage.py and wal.py)
         return [
             "Create new habit",
             "Check-off habit",
@@ -182,6 +187,9 @@ def user_input_step_analysis():
                  "Overview weekly habits (sorted by name)",
                  "Overview weekly habits (sorted by date of creation)",
                  "Overview weekly habits (sorted by streak)",
+                 "Habits at risk today",
+                 "Completion per month (all habits)",
+                 "Cross-habit analysis (daily habits)",
                  "Detailed analysis of a habit (choice in next step)",
                  "Return to main"]).ask()
 
@@ -198,6 +206,7 @@ def user_input_step_options():
         "What do you want to do?",
         choices=["Create random example data (daily habit)",
                  "Create random example data (weekly habit)",
+                 "Delete all demo data",
                  "Return to main"]).ask()
 
     return step_options
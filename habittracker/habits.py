@@ -1,12 +1,35 @@
-import os
+import sys
+from contextlib import nullcontext
 from datetime import datetime, timedelta, timezone
+import numpy as np
 import pandas as pd
-from os.path import exists
 import pytz
 
+from habittracker import binstore
+from habittracker import codec
+from habittracker import history
+from habittracker import periods
+from habittracker import rollups
+from habittracker import scheduler
+from habittracker import segments
+from habittracker import storage
+from habittracker import tenants
+from habittracker import tombstones
+
 
 global list_habit_instances
 
+# format of new habit files ('json': pandas layout, 'bits': bit-packed, 'rle': run-length encoded,
+# 'sparse': check-offs only, 'binary': memory-mapped binary arrays, 'segmented': hot segment of the running year
+# plus compressed archives of previous years)
+habit_file_format = "json"
+
+# write-ahead log for the mutations of habits (wal.WriteAheadLog) - None: habit files and overview are written directly
+write_ahead_log = None
+
+# min-heap of the habits ordered by the deadline of their next auto-update (scheduler.AutoUpdateScheduler)
+auto_update_scheduler = scheduler.AutoUpdateScheduler()
+
 
 def create_habit_overview(path_habit_overview):
     """
@@ -36,7 +59,7 @@ def create_habit_overview(path_habit_overview):
                 raise ValueError("Non-valid characters found in path / filename!")
 
     try:
-        df_habit_overview.to_json(path_habit_overview, date_format='iso')
+        codec.write_overview(path_habit_overview, df_habit_overview)
     except OSError:
         print(f"Problems with your operating system! Make sure this app can write to '{path_habit_overview}!")
         return False
@@ -51,13 +74,15 @@ def read_habit_overview(path_habit_overview):
     :param path_habit_overview: Path where .json-habit-overview-file should be saved according to config.txt
     :return: pandas dataframe
     """
-    if not os.path.exists(path_habit_overview):
+    if not storage.backend.exists(path_habit_overview):
         raise FileNotFoundError("File cannot be found!")
     elif path_habit_overview[-5:] != ".json":
         raise ValueError("File is not a .json file!")
     else:
         try:
-            df_habit_overview = pd.read_json(path_habit_overview)
+            df_habit_overview = codec.read_overview(path_habit_overview)
+            # deleted habits (tombstones not compacted yet) are skipped
+            df_habit_overview = tombstones.skip_tombstones(path_habit_overview, df_habit_overview)
         except ValueError:
             raise ValueError("Unexpected character found in file. Could not load habit overview!")
         else:
@@ -83,8 +108,10 @@ def create_habit(habit_attributes, path_habit_overview, absolute_directory_habit
     name = habit_attributes[0]
     spec = habit_attributes[1]
     period = habit_attributes[2]
-    file = f"{absolute_directory_habit_files}\\{name.replace(' ', '_').lower()}.json"
+    file = tenants.habit_file(absolute_directory_habit_files, name)
 
+    # the files of a deleted habit with the same name must be gone before the new habit file is created
+    release_habit_file(path_habit_overview, file)
     # instantiate habit
     habit = Habit(name, spec, period, file)
     # adding habit to habit overview
@@ -95,10 +122,78 @@ def create_habit(habit_attributes, path_habit_overview, absolute_directory_habit
         status = "ERROR: Could not create new habit!"
         return status
     else:
+        # the first period of the new habit is auto-updated as soon as it has been missed
+        auto_update_scheduler.schedule(habit)
+        # number of habits of the tenant (registry)
+        tenants.update_habit_count(1)
         status = "Successfully created a new habit. Good luck!"
         return status
 
 
+def release_habit_file(path_habit_overview, habit_file):
+    """
+    If a deleted habit (not compacted yet) used the habit file, the compaction is done at once,
+    so the habit file can be used by a new habit
+
+    :param path_habit_overview: Path where .json-habit-overview-file should be saved according to config.txt
+    :param habit_file: path to habit file of the new habit
+    :return:
+    """
+    if tombstones.is_tombstoned(path_habit_overview, habit_file):
+        tombstones.compact(path_habit_overview, [habit.file for habit in list_habit_instances])
+
+
+def remove_habits(list_habits, path_habit_overview):
+    """
+    Removing habits by tombstones: the deletions are written as tombstone records (one write for all habits) and
+    skipped when reading the habit overview. The habit overview is rewritten and the orphaned habit files are removed
+    by the compaction running in the background.
+
+    :param list_habits: list of habit instances to be removed
+    :param path_habit_overview: Path where .json-habit-overview-file should be saved according to config.txt
+    :return: Status (ERROR-Message or Success)
+    """
+    try:
+        tombstones.add_tombstones(path_habit_overview, [(habit.name, habit.file) for habit in list_habits])
+    except OSError:
+        status = "ERROR: Tombstones could not be written! Habits not deleted!"
+        return status
+
+    # removals are committed together (if the write-ahead log is active)
+    with write_ahead_log.batch() if write_ahead_log is not None else nullcontext():
+        for habit in list_habits:
+            if write_ahead_log is not None:
+                # logging the removal - logged creations of the habit are undone by the next checkpoint
+                write_ahead_log.log_remove(habit.name, habit.file)
+            # remove instance from current and global habit list
+            list_habit_instances.remove(habit)
+            auto_update_scheduler.unschedule(habit)
+
+    tombstones.start_compaction(path_habit_overview, [habit.file for habit in list_habit_instances])
+    # number of habits of the tenant (registry)
+    tenants.update_habit_count(-len(list_habits))
+    status = f"{len(list_habits)} habits deleted"
+    return status
+
+
+def remove_demo_habits(path_habit_overview):
+    """
+    Removing all habits with random example data (specification '! DEMO ! DATA !')
+
+    :param path_habit_overview: Path where .json-habit-overview-file should be saved according to config.txt
+    :return: Status (ERROR-Message or Success)
+    """
+    list_demo_habits = [habit for habit in list_habit_instances if habit.spec == "! DEMO ! DATA !"]
+    if not list_demo_habits:
+        status = "No demo data existing"
+        return status
+    status = remove_habits(list_demo_habits, path_habit_overview)
+    if status.split(" ")[0] == "ERROR:":
+        return status
+    status = f"Demo data of {len(list_demo_habits)} habits successfully deleted"
+    return status
+
+
 def re_instantiate_habits(df_habit_overview):
     """
     Re-instantiating the habits according to pandas dataframe based on the .json-habit-overview-file
@@ -123,33 +218,208 @@ def re_instantiate_habits(df_habit_overview):
         globals()[f"habit_{current_num_habit}"] = Habit(name, spec, period, file, created)
         current_num_habit += 1
 
-    for habit in list_habit_instances:
-        # updates missed check-off dates in habit file
-        status_called_function = habit.auto_update_file()
+    # scheduling the auto-updates: only the habits whose next deadline has passed are auto-updated
+    global auto_update_scheduler
+    auto_update_scheduler = scheduler.AutoUpdateScheduler(list_habit_instances)
+    for status_called_function in run_due_auto_updates():
         print(status_called_function)
 
     status = f"Re-instantiated {len(habit_list)} habits."
 
     return status
 
+
+def run_due_auto_updates(current_day=None):
+    """
+    Auto-updating the habits whose next deadline has passed (see scheduler.py).
+    As long as no habit is due, only the earliest deadline is looked at - cheap enough for every request / menu step
+    of a long-running process.
+
+    :param current_day: day number (default: today)
+    :return: list of the status of every auto-updated habit
+    """
+    if not auto_update_scheduler.is_due(current_day):
+        return []
+    # auto-updates of the due habits are committed together (if the write-ahead log is active)
+    with write_ahead_log.batch() if write_ahead_log is not None else nullcontext():
+        return auto_update_scheduler.run_due(current_day)
+
+
+def reload_merged_habits():
+    """
+    Habits whose habit file got periods of other processes by a checkpoint of the write-ahead log (see wal.py):
+    the history index is rebuilt from the habit file when needed and the next auto-update is scheduled again
+
+    :return: list of the habit instances concerned
+    """
+    if write_ahead_log is None:
+        return []
+    set_merged_files = write_ahead_log.pop_merged_files()
+    list_merged_habits = [habit for habit in list_habit_instances if habit.file in set_merged_files]
+    for habit in list_merged_habits:
+        habit.history_index = None
+        auto_update_scheduler.schedule(habit)
+    return list_merged_habits
+
+
+class HistoryIndex:
+    """
+    Cumulative count index (prefix sums) of the checked-off periods of a habit.
+    Built once from the habit data and extended whenever periods are appended, so the number of
+    checked-off periods within any date range is the difference of two prefix sums.
+    Periods are addressed by integer day numbers (see periods.py), dates are only accepted/returned at the edges.
+    The current streak (checked-off periods at the end of the history) is kept up to date while extending.
+    """
+
+    __slots__ = ("step", "first_day", "cumsum", "length", "current_streak")
+
+    def __init__(self, period, first_day=None, checked_off=()):
+        # step between two periods in days (daily: 1, weekly: 7)
+        self.step = periods.period_step(period)
+        # day number of the first period (None as long as there is no period)
+        self.first_day = periods.as_day(first_day)
+        # prefix sums: cumsum[n] = number of checked-off periods within the first n periods
+        self.cumsum = np.zeros(max(16, len(checked_off) + 1), dtype=np.int64)
+        self.length = 0
+        # number of checked-off periods in a row at the end of the history
+        self.current_streak = 0
+        self.extend(self.first_day, checked_off)
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def first_date(self):
+        """
+        :return: date of the first period in the index (None if the index is empty)
+        """
+        return None if self.first_day is None else periods.to_date(self.first_day)
+
+    @classmethod
+    def from_dataframe(cls, df_habit, period):
+        """
+        Building the index from habit data as stored in the habit file
+
+        :param df_habit: pandas dataframe with columns 'Checked-off' and 'Check-off date' and a date index
+        :param period: periodicity of the habit ('D' or '7d')
+        :return: HistoryIndex
+        """
+        if df_habit.empty:
+            return cls(period)
+        return cls(period, periods.to_days(df_habit.index[:1])[0], (df_habit["Checked-off"] == "Yes").to_numpy())
+
+    def last_day(self):
+        """
+        :return: day number of the last period in the index (None if the index is empty)
+        """
+        if self.length == 0:
+            return None
+        return self.first_day + self.step * (self.length - 1)
+
+    def last_date(self):
+        """
+        :return: date of the last period in the index (None if the index is empty)
+        """
+        return None if self.length == 0 else periods.to_date(self.last_day())
+
+    def checked_off(self):
+        """
+        :return: numpy boolean array with one entry per period (True: period has been checked-off)
+        """
+        return np.diff(self.cumsum[:self.length + 1]) > 0
+
+    def extend(self, first_day, checked_off):
+        """
+        Appending periods to the index (amortized constant time per period)
+
+        :param first_day: day number or date of the first appended period (only needed if the index is empty)
+        :param checked_off: iterable of booleans (True: period has been checked-off)
+        :return:
+        """
+        checked_off = np.asarray(checked_off, dtype=np.int64)
+        if len(checked_off) == 0:
+            return
+        if self.length == 0:
+            self.first_day = periods.as_day(first_day)
+
+        # enlarging the buffer by doubling its size if needed
+        needed = self.length + len(checked_off) + 1
+        if needed > len(self.cumsum):
+            new_cumsum = np.zeros(max(needed, 2 * len(self.cumsum)), dtype=np.int64)
+            new_cumsum[:self.length + 1] = self.cumsum[:self.length + 1]
+            self.cumsum = new_cumsum
+
+        self.cumsum[self.length + 1:needed] = self.cumsum[self.length] + np.cumsum(checked_off)
+        self.length += len(checked_off)
+
+        # updating the current streak: continued if every appended period has been checked-off,
+        # otherwise the streak consists of the checked-off periods after the last missed one
+        missed = np.flatnonzero(checked_off == 0)
+        if len(missed) == 0:
+            self.current_streak += len(checked_off)
+        else:
+            self.current_streak = len(checked_off) - int(missed[-1]) - 1
+
+    def fill_missed(self, until_day):
+        """
+        Appending missed periods from the last period in the index until (excluding) the given day
+
+        :param until_day: day number or date of the next period that will be appended
+        :return:
+        """
+        if self.length == 0:
+            return
+        number_missed = (periods.as_day(until_day) - self.last_day()) // self.step - 1
+        if number_missed > 0:
+            self.extend(None, np.zeros(number_missed, dtype=bool))
+
+    def count(self, start, end):
+        """
+        Counting periods and checked-off periods whose start date lies within the given date range
+
+        :param start: first day (day number or date) of the range (included)
+        :param end: last day (day number or date) of the range (included)
+        :return: tuple (number of periods, number of checked-off periods)
+        """
+        start, end = periods.as_day(start), periods.as_day(end)
+        if self.length == 0 or end < start:
+            return 0, 0
+        # positions of the first and the (exclusive) last period within the range
+        position_start = min(max(-((self.first_day - start) // self.step), 0), self.length)
+        position_end = min(max((end - self.first_day) // self.step + 1, 0), self.length)
+        if position_end <= position_start:
+            return 0, 0
+        return int(position_end - position_start), int(self.cumsum[position_end] - self.cumsum[position_start])
+
+
 class Habit:
     """
     Provides
     - adding to overview
     ...
+    Instances are kept compact (no per-instance __dict__), so hundreds of thousands of habits can stay in memory
+    (e.g. daemon mode).
     """
 
-    def __init__(self, name, spec, period, file, created=datetime.now(pytz.utc)):
+    __slots__ = ("name", "spec", "period", "file", "created", "history_index")
+
+    def __init__(self, name, spec, period, file, created=None):
         # attributes
         self.name = name
         self.spec = spec
-        self.period = period
+        # periodicity codes ('D', '7d') are interned: all habits share the same two string objects
+        self.period = sys.intern(period)
         self.file = file
-        self.created = created
+        # start of the habit (default: now - evaluated per habit, not once at import)
+        self.created = datetime.now(pytz.utc) if created is None else created
+        # cumulative count index of the habit data (built on first use)
+        self.history_index = None
 
-        if not exists(self.file):
-            empty_df_habit = self.create_dataframe()
-            empty_df_habit.to_json(self.file, date_format='iso')
+        with storage.backend.lock(self.file):
+            if not storage.backend.exists(self.file):
+                # creating an empty habit file in the configured format
+                history.create_history(self.period, habit_file_format, pd.Timestamp(self.created).date()) \
+                    .write(self.file)
 
         # updating running habit list
         list_habit_instances.append(self)
@@ -165,12 +435,19 @@ class Habit:
                      "Created on": self.created, "File Directory": f"{self.file}"}
 
         try:
-            # load existing habit overview file
-            df_overview = pd.read_json(path_habit_overview)
-            # add dictionary to habit overview
-            df_overview = df_overview.append(new_habit, ignore_index=True)
-            # save habit overview
-            df_overview.to_json(path_habit_overview, date_format='iso')
+            if write_ahead_log is not None:
+                # logging the new habit - the habit overview is updated by the next checkpoint
+                write_ahead_log.log_create(new_habit)
+                status = "Added habit to overview"
+                return status
+            # the habit overview is locked from reading to saving (other processes / threads)
+            with storage.backend.lock(path_habit_overview):
+                # load existing habit overview file
+                df_overview = codec.read_overview(path_habit_overview)
+                # add dictionary to habit overview
+                df_overview = df_overview.append(new_habit, ignore_index=True)
+                # save habit overview
+                codec.write_overview(path_habit_overview, df_overview)
             # return status
             status = "Added habit to overview"
             return status
@@ -192,16 +469,15 @@ class Habit:
         if end < start:
             raise ValueError("End date is before start date!")
 
-        """EMPTY LIST FOR FALSE VALUES"""
-        df_values = []
         if start == "init" and end == "init":
-            df_index = []
+            days = periods.period_range(0, -1, self.period)
         else:
-            df_index = pd.date_range(start, end, freq=self.period)
-            for i in df_index:
-                df_values.append(["No", pd.np.nan])
+            # all periods as day numbers, converted to dates only for the index of the habit data
+            days = periods.period_range(periods.as_day(start), periods.as_day(end), self.period)
 
-        df_habit = pd.DataFrame(df_values, columns=["Checked-off", "Check-off date"], index=df_index)
+        df_habit = pd.DataFrame({"Checked-off": np.full(len(days), "No", dtype=object),
+                                 "Check-off date": np.full(len(days), np.nan)},
+                                index=periods.to_date_index(days))
 
         return df_habit
 
@@ -216,60 +492,71 @@ class Habit:
 
         :return: Status (ERROR-Message or Success)
         """
-        # save current day for the need for auto-updating
-        current_day = datetime.now(pytz.utc)
-
-        # read existing habit data
-        df_habit = pd.read_json(self.file)
-        if df_habit.empty:
-            # if no data is in file set the last date to:
-            # for daily habits: one day before start date
-            # for weekly habits: seven days (1 week) before start date
-            df_last_date = self.created.date() - timedelta(1) if self.period == "D" else \
-                self.created.date() - timedelta(7)
-        else:
-            # else read last date from dataframe
-            df_last_date = df_habit.index[-1].date()
-
-        # if habit belongs to demo data
-        if self.spec == "! DEMO ! DATA !":
-            # return appropriate status
-            status = f"Habit {self.name}: No auto-update for demo data"
-            return status
-
-        # if check-off for the period still possible!
-        # for daily habits: last date entry is more than two days ago
-        # for weekly habits: last date entry is more than two weeks (14 days) ago
-        elif (current_day.date() - df_last_date < timedelta(2) and self.period == "D") or \
-                (current_day.date() - df_last_date < timedelta(14) and self.period == "7d"):
-            # return appropriate status
-            status = f"Habit {self.name}: No auto-update needed - already checked-off or " \
-                     f"check-off for only running period still possible!"
-            return status
-        else:
-            # start auto update preparation
-            # set start date of missed periods
-            # for daily habits: one day after the last date
-            # for weekly habits: seven days after the last date
-            start_date = df_last_date + timedelta(1) \
-                if self.period == "D" else df_last_date + timedelta(7)
-
-            # set end date of missed periods
-            # for daily habits: one day before today
-            # for weekly habits: seven days before today
-            end_date = current_day.date() - timedelta(1) \
-                if self.period == "D" else current_day.date() - timedelta(7)
-
-            # create dataframe which will be added to the existing one
-            add_df_habit = self.create_dataframe(start_date, end_date)
-            # append existing dataframe
-            df_habit = df_habit.append(add_df_habit)
-            # save new dataframe
-            df_habit.to_json(self.file, date_format='iso')
-
-            # return appropriate status
-            status = f"Habit {self.name}: Auto-Update for {start_date} - {end_date} successfully completed."
-            return status
+        # save current day (day number) for the need for auto-updating
+        current_day = periods.to_day(datetime.now(pytz.utc))
+        step = periods.period_step(self.period)
+
+        # the habit file is locked from reading to saving (other processes / threads)
+        with storage.backend.lock(self.file):
+            # read existing habit data
+            history_habit = history.load_history(self.file, self.period)
+            # build index and streak state from existing data (if not done yet)
+            self.get_history_index(history_habit)
+            if len(history_habit) == 0:
+                # if no data is in file set the last date to:
+                # for daily habits: one day before start date
+                # for weekly habits: seven days (1 week) before start date
+                last_day = periods.to_day(self.created) - step
+            else:
+                # else read last day from habit data
+                last_day = history_habit.last_day()
+
+            # if habit belongs to demo data
+            if self.spec == "! DEMO ! DATA !":
+                # return appropriate status
+                status = f"Habit {self.name}: No auto-update for demo data"
+                return status
+
+            # if habit file is sparse: missed periods are derived when reading the habit file
+            elif isinstance(history_habit, history.SparseHistory):
+                status = f"Habit {self.name}: No auto-update needed - missed periods are derived from the check-offs"
+                return status
+
+            # if check-off for the period still possible!
+            # for daily habits: last date entry is more than two days ago
+            # for weekly habits: last date entry is more than two weeks (14 days) ago
+            elif current_day - last_day < 2 * step:
+                # return appropriate status
+                status = f"Habit {self.name}: No auto-update needed - already checked-off or " \
+                         f"check-off for only running period still possible!"
+                return status
+            else:
+                # start auto update preparation
+                # set start date of missed periods
+                # for daily habits: one day after the last date
+                # for weekly habits: seven days after the last date
+                start_day = last_day + step
+
+                # set end date of missed periods
+                # for daily habits: one day before today
+                # for weekly habits: seven days before today
+                end_day = current_day - step
+
+                # create dataframe which will be added to the existing one
+                add_df_habit = self.create_dataframe(start_day, end_day)
+                # append existing habit data (run-length encoded data: extends or adds one run)
+                history_habit.extend(add_df_habit)
+                # save habit data
+                self.save_history(history_habit, add_df_habit)
+                # extend index with missed periods (resets the current streak)
+                self.history_index.extend(start_day, np.zeros(len(add_df_habit), dtype=bool))
+                # update materialized rollups with missed periods
+                rollups.update_rollups(self.file, add_df_habit, self.period)
+
+                # return appropriate status
+                status = f"Habit {self.name}: Auto-Update for {periods.to_date(start_day)} - " \
+                         f"{periods.to_date(end_day)} successfully completed."
+                return status
 
     def check_off_habit(self):
         """
@@ -283,53 +570,128 @@ class Habit:
         """
 
         current_day = datetime.now(pytz.utc)
+        step = periods.period_step(self.period)
+
+        # the habit file is locked from reading to saving (other processes / threads)
+        with storage.backend.lock(self.file):
+            # read existing habit data
+            history_habit = history.load_history(self.file, self.period)
+
+            if len(history_habit) == 0:
+                # if no data is in file set the last date to:
+                # for daily habits: one day before start date
+                # for weekly habits: seven days (1 week) before start date
+                # (sparse habit files: the periods are anchored at the date of creation, its period is still running)
+                first_day = history_habit.created_day if isinstance(history_habit, history.SparseHistory) else \
+                    periods.to_day(current_day)
+                last_day = first_day - step
+            else:
+                # else read last day from habit data
+                last_day = history_habit.last_day()
+
+            # if habit belongs to demo data
+            if self.spec == "! DEMO ! DATA !":
+                # create error message
+                status = "ERROR: Can't check-off demo data! For further information read the instructions."
+                return status
+            # if habit already has been checked-off in running period
+            # for daily habits: the same day
+            # for weekly habits: within the last six
+            elif periods.to_day(current_day) - last_day < step:
+                # create error message
+                status = "ERROR: Can't check-off twice a habit!"
+                return status
 
-        # read existing habit data
-        df_habit = pd.read_json(self.file)
+            else:
+                # create dictionary with check-off data for dataframe
+                check_off = {"Checked-off": "Yes", "Check-off date": current_day}
+                # create new date-index-list depending on periodicity and last date in dataframe
+                # for daily habits: the next day
+                # for weekly habits: the next week (+7 days)
+                new_day = last_day + step
+                # create new dataframe with calculated data
+                df_check = pd.DataFrame(check_off, index=periods.to_date_index([new_day]))
+                # build index from existing data (if not done yet) before appending
+                self.get_history_index(history_habit)
+                # append new dataframe to existing habit data (run-length encoded data: extends or adds one run)
+                history_habit.extend(df_check)
+                self.save_history(history_habit, df_check)
+                # extend index with periods missed meanwhile (sparse habit files) and checked-off period
+                self.history_index.fill_missed(new_day)
+                self.history_index.extend(new_day, [True])
+                # update materialized rollups with checked-off period
+                rollups.update_rollups(self.file, df_check, self.period)
+
+                # return appropriate status
+                status = "Successfully checked-off your habit!"
+                return status
+
+    def save_history(self, history_habit, df_appended):
+        """
+        Saving the habit data after periods have been appended: directly to the habit file or - if the
+        write-ahead log is active - by logging the appended periods (the habit file is written by the next checkpoint)
 
-        if df_habit.empty:
-            # if no data is in file set the last date to:
-            # for daily habits: one day before start date
-            # for weekly habits: seven days (1 week) before start date
-            df_last_date = current_day.date() - timedelta(1) \
-                if self.period == "D" else current_day.date() - timedelta(7)
+        :param history_habit: history object of the habit including the appended periods
+        :param df_appended: pandas dataframe with the appended periods
+        :return:
+        """
+        if write_ahead_log is None:
+            history_habit.write(self.file)
         else:
-            # else read last date from dataframe
-            # df_habit.index = pd.to_datetime(df_habit.index)
-            df_last_date = df_habit.index[-1].date()
-            # df_last_date = df_last_date.to_pydatetime()
-
-        # if habit belongs to demo data
-        if self.spec == "! DEMO ! DATA !":
-            # create error message
-            status = "ERROR: Can't check-off demo data! For further information read the instructions."
-            return status
-        # if habit already has been checked-off in running period
-        # for daily habits: the same day
-        # for weekly habits: within the last six
-        elif (df_last_date == current_day.date() and self.period == "D") or \
-                (current_day.date() - df_last_date <= timedelta(6) and self.period == "7d"):
-            # create error message
-            status = "ERROR: Can't check-off twice a habit!"
-            return status
+            write_ahead_log.log_append(self.file, self.period, df_appended, history_habit)
+
+    def get_history_index(self, history_habit=None):
+        """
+        Returns the cumulative count index of the habit data. The index is built only once
+        (from the given habit data or the habit file) and extended afterwards whenever periods are appended.
+        If the given habit data is longer than the index (periods appended by another process), the index is rebuilt.
+        Sparse habit data grows by the periods elapsed meanwhile (derived as missed unless checked-off): the index is
+        extended by them whenever the habit data is loaded (check-off, auto-update - scheduled daily for sparse habits).
+
+        :param history_habit: already loaded habit data (optional, avoids reading the habit file again)
+        :return: HistoryIndex
+        """
+        if self.history_index is None or (history_habit is not None and len(self.history_index) < len(history_habit)):
+            if history_habit is None:
+                history_habit = history.load_history(self.file, self.period)
+            if isinstance(history_habit, history.SparseHistory) and self.history_index is not None and \
+                    self.history_index.first_day == history_habit.created_day:
+                # periods elapsed since the index has been built
+                self.history_index.extend(None, history_habit.checked_off()[len(self.history_index):])
+                return self.history_index
+            self.history_index = HistoryIndex(self.period, None if len(history_habit) == 0 else
+                                              periods.as_day(history_habit.start), history_habit.checked_off())
+        return self.history_index
+
+    def running_streak(self, current_day=None):
+        """
+        Returns the current streak of the habit as long as it's still running, i.e. the period after the last
+        checked-off period has not ended yet. Answered from the maintained index (no need to read the habit file
+        once the index is available). As long as there is no index, run-length encoded habit data is answered from
+        its last run (without expanding the runs into an index).
+
+        :param current_day: reference day (default: today)
+        :return: tuple (current streak, last day of the running period) - (0, None) if there's no running streak
+        """
+        if current_day is None:
+            current_day = datetime.now(pytz.utc).date()
 
+        history_habit = None if self.history_index is not None else history.load_history(self.file, self.period)
+        if isinstance(history_habit, history.RunLengthHistory):
+            current_streak, last_day, step = history_habit.current_streak(), history_habit.last_day(), \
+                history_habit.step()
         else:
-            # create dictionary with check-off data for dataframe
-            check_off = {"Checked-off": "Yes", "Check-off date": current_day}
-            # create new date-index-list depending on periodicity and last date in dataframe
-            # for daily habits: the next day
-            # for weekly habits: the next week (+7 days)
-            df_new_date = [df_last_date + timedelta(1) if self.period == "D" else
-                           df_last_date + timedelta(7)]
-            # create new dataframe with calculated data
-            df_check = pd.DataFrame(check_off, index=df_new_date)
-            # append new dataframe to existing dataframe
-            df_habit = df_habit.append(df_check)
-            df_habit.to_json(self.file, date_format='iso')
-
-            # return appropriate status
-            status = "Successfully checked-off your habit!"
-            return status
+            history_index = self.get_history_index(history_habit)
+            current_streak, last_day, step = history_index.current_streak, history_index.last_day(), \
+                history_index.step
+        if current_streak == 0:
+            return 0, None
+
+        # the streak is running until the end of the period after the last checked-off period
+        end_running_period = periods.to_date(last_day + 2 * step - 1)
+        if current_day > end_running_period:
+            return 0, None
+        return current_streak, end_running_period
 
     def analyze_habit(self):
         """
@@ -348,16 +710,30 @@ class Habit:
         created_on = self.created.strftime("%Y-%m-%d")
 
         # read existing habit data
-        df_habit = pd.read_json(self.file)
+        history_habit = history.load_history(self.file, self.period)
 
         # if habit file is empty
-        if df_habit.empty:
+        if len(history_habit) == 0:
             count_checked_off_true = 0
             percentage_checked_off_periods = "0%"
             number_of_periods = 0
 
+        # if habit data is run-length encoded: answer directly from the runs (without expanding them)
+        # if habit data is binary: answer vectorized from the memory-mapped arrays (without parsing any text)
+        # if habit data is segmented: count from the archive list, archives are only read for the streak
+        elif isinstance(history_habit, (history.RunLengthHistory, binstore.BinaryHistory,
+                                        segments.SegmentedHistory)):
+            count_checked_off_true = history_habit.count_checked_off()
+            max_streak, start_streak, end_streak = history_habit.longest_streak()
+            if max_streak > 0:
+                period_longest_streak = f"{start_streak} - " \
+                                        f"{end_streak if self.period == 'D' else end_streak + timedelta(6)}"
+            number_of_periods = len(history_habit)
+            percentage_checked_off_periods = f"{round(count_checked_off_true / number_of_periods * 100, 2)}%"
+
         # if habit data is available
         else:
+            df_habit = history_habit.to_dataframe()
             # count the number of checked-off (column 'checked-off' = 'Yes') entries
             count_checked_off_true = df_habit[df_habit["Checked-off"] == "Yes"]["Checked-off"].count()
 
@@ -420,23 +796,12 @@ class Habit:
         :return: Status (ERROR-Message or Success)
         """
 
-        # ERROR-Handling habit file
-        try:
-            os.remove(self.file)
-        except OSError:
-            status = "Habit file could not be removed! Habit not deleted!"
+        # the habit is deleted by a tombstone, the files are removed by the background compaction
+        status = remove_habits([self], path_habit_overview)
+        if status.split(" ")[0] == "ERROR:":
+            status = "Tombstone could not be written! Habit not deleted!"
             return status
 
-        # load existing habit overview file
-        df_overview = pd.read_json(path_habit_overview)
-        # remove habit from overview
-        df_overview = df_overview.drop(df_overview[df_overview.Name == self.name].index)
-        # save updated habit overview file
-        df_overview.to_json(path_habit_overview, date_format='iso')
-
-        # remove instance from current and global habit list
-        list_habit_instances.remove(self)
-
         del self
         status = "Habit successfully deleted"
         return status
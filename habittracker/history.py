@@ -0,0 +1,772 @@
+import json
+import base64
+from array import array
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytz
+
+from habittracker import binstore
+from habittracker import codec
+from habittracker import periods
+from habittracker import segments
+from habittracker import storage
+
+
+class BitHistory:
+    """
+    Compact (bit-packed) representation of the check-off history of a habit.
+    As the periods are contiguous from the first date with a fixed periodicity, the history consists of
+    - the date of the first period and the periodicity
+    - one bit per period (1: checked-off, 0: missed), packed eight periods per byte
+    - the check-off dates (milliseconds since 1970-01-01, UTC) of the checked-off periods only
+    """
+
+    def __init__(self, period, start=None, bits=b"", length=0, check_off_dates=()):
+        if period not in ["D", "7d"]:
+            raise ValueError("Periodicity must be 'D' (daily) or '7d' (weekly)!")
+        if len(bits) != (length + 7) // 8:
+            raise ValueError("Number of bytes doesn't fit the number of periods!")
+
+        self.period = period
+        # day number of the first period (None as long as there is no period)
+        self.start_day = periods.as_day(start)
+        # packed bits (most significant bit first, like numpy.packbits)
+        self.bits = bytearray(bits)
+        self.length = length
+        # check-off dates of the checked-off periods in milliseconds since epoch (UTC)
+        self.check_off_dates = array("q", check_off_dates)
+
+    def __len__(self):
+        return self.length
+
+    def step(self):
+        """
+        :return: days between two periods (daily: 1, weekly: 7)
+        """
+        return periods.period_step(self.period)
+
+    @property
+    def start(self):
+        """
+        :return: date of the first period (None if there is no period)
+        """
+        return None if self.start_day is None else periods.to_date(self.start_day)
+
+    def last_day(self):
+        """
+        :return: day number of the last period (None if there is no period)
+        """
+        if self.length == 0:
+            return None
+        return self.start_day + self.step() * (self.length - 1)
+
+    def last_date(self):
+        """
+        :return: date of the last period (None if there is no period)
+        """
+        return None if self.length == 0 else periods.to_date(self.last_day())
+
+    def checked_off(self):
+        """
+        :return: numpy boolean array with one entry per period (True: period has been checked-off)
+        """
+        packed = np.frombuffer(bytes(self.bits), dtype=np.uint8)
+        return np.unpackbits(packed, count=self.length).astype(bool)
+
+    def append(self, checked_off, check_off_date=None, period_date=None):
+        """
+        Appending the next period (amortized constant time)
+
+        :param checked_off: True if the period has been checked-off
+        :param check_off_date: datetime of the check-off (only for checked-off periods)
+        :param period_date: date of the period (only needed for the first period)
+        :return:
+        """
+        if self.length == 0:
+            if period_date is None:
+                raise ValueError("Date of the first period is needed!")
+            self.start_day = periods.as_day(period_date)
+        if self.length % 8 == 0:
+            self.bits.append(0)
+        if checked_off:
+            if check_off_date is None:
+                raise ValueError("Check-off date is needed for checked-off periods!")
+            self.bits[self.length // 8] |= 0x80 >> (self.length % 8)
+            self.check_off_dates.append(to_milliseconds(check_off_date))
+        self.length += 1
+
+    def append_missed(self, number_of_periods, period_date=None):
+        """
+        Appending missed periods ('No') at once
+
+        :param number_of_periods: number of missed periods
+        :param period_date: date of the first missed period (only needed if history is empty)
+        :return:
+        """
+        if number_of_periods <= 0:
+            return
+        if self.length == 0:
+            if period_date is None:
+                raise ValueError("Date of the first period is needed!")
+            self.start_day = periods.as_day(period_date)
+        self.length += number_of_periods
+        # missed periods are zero bits - only the bytes for the new periods need to be added
+        self.bits.extend(bytes((self.length + 7) // 8 - len(self.bits)))
+
+    def extend(self, df_appended):
+        """
+        Appending periods given in the dataframe layout of the habit file
+
+        :param df_appended: pandas dataframe with the appended periods
+        :return:
+        """
+        for period_day, checked_off, check_off_date in zip(periods.to_days(df_appended.index),
+                                                           df_appended["Checked-off"], df_appended["Check-off date"]):
+            self.append(checked_off == "Yes", check_off_date, int(period_day))
+
+    @property
+    def nbytes(self):
+        """
+        :return: memory (bytes) of the packed bits and the check-off dates
+        """
+        return len(self.bits) + self.check_off_dates.itemsize * len(self.check_off_dates)
+
+    @classmethod
+    def from_dataframe(cls, df_habit, period):
+        """
+        Converting habit data in the dataframe layout of the habit file to a bit-packed history
+
+        :param df_habit: pandas dataframe with columns 'Checked-off' and 'Check-off date' and a date index
+        :param period: periodicity of the habit ('D' or '7d')
+        :return: BitHistory
+        """
+        if df_habit.empty:
+            return cls(period)
+
+        checked_off = (df_habit["Checked-off"] == "Yes").to_numpy()
+        check_off_dates = pd.to_datetime(df_habit["Check-off date"][checked_off], utc=True)
+        return cls(period,
+                   int(periods.to_days(df_habit.index[:1])[0]),
+                   np.packbits(checked_off).tobytes(),
+                   len(checked_off),
+                   check_off_dates.dt.tz_localize(None).to_numpy(dtype="datetime64[ms]").astype(np.int64))
+
+    def to_dataframe(self):
+        """
+        Converting the bit-packed history to the dataframe layout of the habit file
+
+        :return: pandas dataframe with columns 'Checked-off' and 'Check-off date' and a date index
+        """
+        if self.length == 0:
+            return pd.DataFrame(columns=["Checked-off", "Check-off date"])
+
+        checked_off = self.checked_off()
+        check_off_dates = np.full(self.length, np.datetime64("NaT"), dtype="datetime64[ms]")
+        check_off_dates[checked_off] = np.asarray(self.check_off_dates, dtype=np.int64).astype("datetime64[ms]")
+
+        return pd.DataFrame({"Checked-off": np.where(checked_off, "Yes", "No").astype(object),
+                             "Check-off date": check_off_dates},
+                            index=periods.to_date_index(self.start_day + self.step() * np.arange(self.length)))
+
+    def to_dict(self):
+        """
+        :return: dictionary for serializing the history (bits base64-encoded)
+        """
+        return {"format": "bits",
+                "period": self.period,
+                "start_day": self.start_day,
+                "length": self.length,
+                "bits": base64.b64encode(bytes(self.bits)).decode("ascii"),
+                "check_off_dates": self.check_off_dates.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        :param data: dictionary created by to_dict()
+        :return: BitHistory
+        """
+        if data.get("format") != "bits":
+            raise ValueError("Data is not a bit-packed habit history!")
+        return cls(data["period"],
+                   read_day(data, "start"),
+                   base64.b64decode(data["bits"]),
+                   data["length"],
+                   data["check_off_dates"])
+
+    def write(self, file):
+        """
+        Saving the history to a .json-file
+
+        :param file: path to file
+        :return:
+        """
+        storage.backend.write_text(file, json.dumps(self.to_dict(), separators=(",", ":")))
+
+    @classmethod
+    def read(cls, file):
+        """
+        Reading a history saved with write()
+
+        :param file: path to file
+        :return: BitHistory
+        """
+        return cls.from_dict(json.loads(storage.backend.read_text(file)))
+
+
+class RunLengthHistory:
+    """
+    Run-length encoded check-off history of a habit: the history consists of alternating runs of checked-off
+    and missed periods, so it is stored as date of the first period, periodicity and a list of runs
+    [value (1: checked-off, 0: missed), number of periods]. The check-off dates are stored for checked-off
+    periods only. Streaks and counts are answered directly from the runs without expanding them.
+    """
+
+    def __init__(self, period, start=None, runs=(), check_off_dates=()):
+        if period not in ["D", "7d"]:
+            raise ValueError("Periodicity must be 'D' (daily) or '7d' (weekly)!")
+
+        self.period = period
+        # day number of the first period (None as long as there is no period)
+        self.start_day = periods.as_day(start)
+        # list of runs [value, number of periods]
+        self.runs = [[int(value), int(length)] for value, length in runs]
+        self.length = sum(length for value, length in self.runs)
+        # check-off dates of the checked-off periods in milliseconds since epoch (UTC)
+        self.check_off_dates = array("q", check_off_dates)
+
+    def __len__(self):
+        return self.length
+
+    def step(self):
+        """
+        :return: days between two periods (daily: 1, weekly: 7)
+        """
+        return periods.period_step(self.period)
+
+    @property
+    def start(self):
+        """
+        :return: date of the first period (None if there is no period)
+        """
+        return None if self.start_day is None else periods.to_date(self.start_day)
+
+    def last_day(self):
+        """
+        :return: day number of the last period (None if there is no period)
+        """
+        if self.length == 0:
+            return None
+        return self.start_day + self.step() * (self.length - 1)
+
+    def last_date(self):
+        """
+        :return: date of the last period (None if there is no period)
+        """
+        return None if self.length == 0 else periods.to_date(self.last_day())
+
+    def append_run(self, value, length, period_date=None):
+        """
+        Appending periods with the same value: the last run is extended or one new run is added
+
+        :param value: 1 (checked-off) or 0 (missed)
+        :param length: number of periods
+        :param period_date: date of the first appended period (only needed if history is empty)
+        :return:
+        """
+        if length <= 0:
+            return
+        if self.length == 0:
+            if period_date is None:
+                raise ValueError("Date of the first period is needed!")
+            self.start_day = periods.as_day(period_date)
+        if self.runs and self.runs[-1][0] == value:
+            self.runs[-1][1] += length
+        else:
+            self.runs.append([int(value), int(length)])
+        self.length += length
+
+    def append(self, checked_off, check_off_date=None, period_date=None):
+        """
+        Appending the next period
+
+        :param checked_off: True if the period has been checked-off
+        :param check_off_date: datetime of the check-off (only for checked-off periods)
+        :param period_date: date of the period (only needed for the first period)
+        :return:
+        """
+        if checked_off:
+            if check_off_date is None:
+                raise ValueError("Check-off date is needed for checked-off periods!")
+            self.check_off_dates.append(to_milliseconds(check_off_date))
+        self.append_run(1 if checked_off else 0, 1, period_date)
+
+    def append_missed(self, number_of_periods, period_date=None):
+        """
+        Appending missed periods ('No') at once (extends or adds one run)
+
+        :param number_of_periods: number of missed periods
+        :param period_date: date of the first missed period (only needed if history is empty)
+        :return:
+        """
+        self.append_run(0, number_of_periods, period_date)
+
+    def extend(self, df_appended):
+        """
+        Appending periods given in the dataframe layout of the habit file
+
+        :param df_appended: pandas dataframe with the appended periods
+        :return:
+        """
+        if df_appended.empty:
+            return
+        checked_off = (df_appended["Checked-off"] == "Yes").to_numpy()
+        # runs of the appended periods: positions where the value changes
+        starts_runs = np.concatenate(([0], np.flatnonzero(np.diff(checked_off.astype(np.int8))) + 1))
+        lengths_runs = np.diff(np.concatenate((starts_runs, [len(checked_off)])))
+        for n, (start_run, length_run) in enumerate(zip(starts_runs, lengths_runs)):
+            self.append_run(int(checked_off[start_run]), int(length_run),
+                            int(periods.to_days(df_appended.index[:1])[0]) if n == 0 else None)
+        if checked_off.any():
+            check_off_dates = pd.to_datetime(df_appended["Check-off date"][checked_off], utc=True)
+            self.check_off_dates.extend(
+                check_off_dates.dt.tz_localize(None).to_numpy(dtype="datetime64[ms]").astype(np.int64).tolist())
+
+    def checked_off(self):
+        """
+        :return: numpy boolean array with one entry per period (True: period has been checked-off)
+        """
+        if not self.runs:
+            return np.zeros(0, dtype=bool)
+        runs = np.array(self.runs, dtype=np.int64)
+        return np.repeat(runs[:, 0].astype(bool), runs[:, 1])
+
+    def count_checked_off(self):
+        """
+        :return: number of checked-off periods
+        """
+        return sum(length for value, length in self.runs if value == 1)
+
+    def longest_streak(self):
+        """
+        Longest streak (first one if there are several) answered from the runs
+
+        :return: tuple (length of the streak, date of its first period, date of its last period)
+                 - (0, None, None) if no period has been checked-off
+        """
+        max_streak, position_max_streak, position = 0, 0, 0
+        for value, length in self.runs:
+            if value == 1 and length > max_streak:
+                max_streak, position_max_streak = length, position
+            position += length
+        if max_streak == 0:
+            return 0, None, None
+        start_streak = self.start_day + self.step() * position_max_streak
+        return max_streak, periods.to_date(start_streak), periods.to_date(start_streak + self.step() * (max_streak - 1))
+
+    def current_streak(self):
+        """
+        :return: number of checked-off periods at the end of the history (length of the last run if checked-off)
+        """
+        if self.runs and self.runs[-1][0] == 1:
+            return self.runs[-1][1]
+        return 0
+
+    def to_dataframe(self):
+        """
+        Converting the run-length encoded history to the dataframe layout of the habit file
+
+        :return: pandas dataframe with columns 'Checked-off' and 'Check-off date' and a date index
+        """
+        return BitHistory(self.period, self.start_day, np.packbits(self.checked_off()).tobytes(), self.length,
+                          self.check_off_dates).to_dataframe()
+
+    def to_dict(self):
+        """
+        :return: dictionary for serializing the history
+        """
+        return {"format": "rle",
+                "period": self.period,
+                "start_day": self.start_day,
+                "runs": self.runs,
+                "check_off_dates": self.check_off_dates.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        :param data: dictionary created by to_dict()
+        :return: RunLengthHistory
+        """
+        if data.get("format") != "rle":
+            raise ValueError("Data is not a run-length encoded habit history!")
+        return cls(data["period"],
+                   read_day(data, "start"),
+                   data["runs"],
+                   data["check_off_dates"])
+
+    @classmethod
+    def from_dataframe(cls, df_habit, period):
+        """
+        Converting habit data in the dataframe layout of the habit file to a run-length encoded history
+
+        :param df_habit: pandas dataframe with columns 'Checked-off' and 'Check-off date' and a date index
+        :param period: periodicity of the habit ('D' or '7d')
+        :return: RunLengthHistory
+        """
+        history = cls(period)
+        history.extend(df_habit)
+        return history
+
+    def write(self, file):
+        """
+        Saving the history to a .json-file
+
+        :param file: path to file
+        :return:
+        """
+        storage.backend.write_text(file, json.dumps(self.to_dict(), separators=(",", ":")))
+
+
+class SparseHistory:
+    """
+    Sparse check-off history of a habit: only the check-off events and the date of creation are stored.
+    The periods are anchored at the date of creation (daily: every day, weekly: every seven days) and every
+    elapsed period without check-off is regarded as missed, so missed periods are derived when the history is
+    read instead of being written. Auto-updating the habit file is not necessary.
+    """
+
+    def __init__(self, period, created, check_offs=(), current_day=None):
+        if period not in ["D", "7d"]:
+            raise ValueError("Periodicity must be 'D' (daily) or '7d' (weekly)!")
+
+        self.period = period
+        # day number of the creation = day number of the first period
+        self.created_day = periods.as_day(created)
+        # check-off events: number of the period (0: period starting at the date of creation) and
+        # check-off date in milliseconds since epoch (UTC)
+        self.positions = array("l", [position for position, check_off_date in check_offs])
+        self.check_off_dates = array("q", [check_off_date for position, check_off_date in check_offs])
+        # reference day for deriving the elapsed periods (None: today)
+        self.current_day = current_day
+
+    def step(self):
+        """
+        :return: days between two periods (daily: 1, weekly: 7)
+        """
+        return periods.period_step(self.period)
+
+    @property
+    def start(self):
+        """
+        :return: date of the first period
+        """
+        return periods.to_date(self.created_day)
+
+    def __len__(self):
+        # number of periods: every elapsed period (missed or not) and the running period if already checked-off
+        current_day = periods.to_day(self.current_day if self.current_day is not None else datetime.now(pytz.utc))
+        number_elapsed_periods = max((current_day - self.created_day) // self.step(), 0)
+        if self.positions:
+            return max(number_elapsed_periods, self.positions[-1] + 1)
+        return number_elapsed_periods
+
+    def last_day(self):
+        """
+        :return: day number of the last period (None if there is no period)
+        """
+        length = len(self)
+        if length == 0:
+            return None
+        return self.created_day + self.step() * (length - 1)
+
+    def last_date(self):
+        """
+        :return: date of the last period (None if there is no period)
+        """
+        last_day = self.last_day()
+        return None if last_day is None else periods.to_date(last_day)
+
+    def checked_off(self):
+        """
+        :return: numpy boolean array with one entry per period (missed periods derived)
+        """
+        checked_off = np.zeros(len(self), dtype=bool)
+        checked_off[np.asarray(self.positions, dtype=np.int64)] = True
+        return checked_off
+
+    def append(self, checked_off, check_off_date=None, period_date=None):
+        """
+        Registering a check-off event (missed periods are not stored)
+
+        :param checked_off: True if the period has been checked-off
+        :param check_off_date: datetime of the check-off (only for checked-off periods)
+        :param period_date: date of the period (default: the running period)
+        :return:
+        """
+        if not checked_off:
+            return
+        if check_off_date is None:
+            raise ValueError("Check-off date is needed for checked-off periods!")
+        if period_date is None:
+            position = len(self)
+        else:
+            position = (periods.as_day(period_date) - self.created_day) // self.step()
+        if position < 0 or (self.positions and position <= self.positions[-1]):
+            raise ValueError("Check-off must be later than the last check-off and not before the creation!")
+        self.positions.append(position)
+        self.check_off_dates.append(to_milliseconds(check_off_date))
+
+    def append_missed(self, number_of_periods, period_date=None):
+        """
+        Missed periods are derived - nothing to be stored
+
+        :return:
+        """
+        return
+
+    def extend(self, df_appended):
+        """
+        Registering the check-offs of periods given in the dataframe layout of the habit file
+
+        :param df_appended: pandas dataframe with the appended periods
+        :return:
+        """
+        for period_day, checked_off, check_off_date in zip(periods.to_days(df_appended.index),
+                                                           df_appended["Checked-off"], df_appended["Check-off date"]):
+            self.append(checked_off == "Yes", check_off_date, int(period_day))
+
+    def to_dataframe(self, start=None, end=None):
+        """
+        Deriving the dataframe layout of the habit file (optionally for a date range only)
+
+        :param start: first date of the range (default: date of creation)
+        :param end: last date of the range (default: last period)
+        :return: pandas dataframe with columns 'Checked-off' and 'Check-off date' and a date index
+        """
+        length = len(self)
+        position_start = 0 if start is None else max(-((self.created_day - periods.as_day(start)) // self.step()), 0)
+        position_end = length if end is None else \
+            min((periods.as_day(end) - self.created_day) // self.step() + 1, length)
+        if position_end <= position_start:
+            return pd.DataFrame(columns=["Checked-off", "Check-off date"])
+
+        checked_off = self.checked_off()[position_start:position_end]
+        check_off_dates = np.full(length, np.datetime64("NaT"), dtype="datetime64[ms]")
+        check_off_dates[np.asarray(self.positions, dtype=np.int64)] = \
+            np.asarray(self.check_off_dates, dtype=np.int64).astype("datetime64[ms]")
+
+        return pd.DataFrame({"Checked-off": np.where(checked_off, "Yes", "No").astype(object),
+                             "Check-off date": check_off_dates[position_start:position_end]},
+                            index=periods.to_date_index(
+                                self.created_day + self.step() * np.arange(position_start, position_end)))
+
+    def to_dict(self):
+        """
+        :return: dictionary for serializing the history
+        """
+        return {"format": "sparse",
+                "period": self.period,
+                "created_day": self.created_day,
+                "check_offs": [[position, check_off_date] for position, check_off_date in
+                               zip(self.positions, self.check_off_dates)]}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        :param data: dictionary created by to_dict()
+        :return: SparseHistory
+        """
+        if data.get("format") != "sparse":
+            raise ValueError("Data is not a sparse habit history!")
+        return cls(data["period"], read_day(data, "created"), data["check_offs"])
+
+    def write(self, file):
+        """
+        Saving the history to a .json-file
+
+        :param file: path to file
+        :return:
+        """
+        storage.backend.write_text(file, json.dumps(self.to_dict(), separators=(",", ":")))
+
+
+class DataFrameHistory:
+    """
+    Check-off history of a habit in the (default) dataframe layout of the habit file:
+    one row per period (date index) with columns 'Checked-off' ('Yes' / 'No') and 'Check-off date'.
+    Provides the same interface as the compact history formats.
+    """
+
+    def __init__(self, df_habit, period):
+        self.period = period
+        self.df_habit = df_habit
+
+    def __len__(self):
+        return len(self.df_habit)
+
+    @property
+    def start(self):
+        """
+        :return: date of the first period (None if there is no period)
+        """
+        return None if self.df_habit.empty else pd.Timestamp(self.df_habit.index[0]).date()
+
+    def last_date(self):
+        """
+        :return: date of the last period (None if there is no period)
+        """
+        return None if self.df_habit.empty else pd.Timestamp(self.df_habit.index[-1]).date()
+
+    def last_day(self):
+        """
+        :return: day number of the last period (None if there is no period)
+        """
+        return None if self.df_habit.empty else int(periods.to_days(self.df_habit.index[-1:])[0])
+
+    def checked_off(self):
+        """
+        :return: numpy boolean array with one entry per period (True: period has been checked-off)
+        """
+        if self.df_habit.empty:
+            return np.zeros(0, dtype=bool)
+        return (self.df_habit["Checked-off"] == "Yes").to_numpy()
+
+    def extend(self, df_appended):
+        """
+        Appending periods given in the dataframe layout of the habit file
+
+        :param df_appended: pandas dataframe with the appended periods
+        :return:
+        """
+        self.df_habit = self.df_habit.append(df_appended)
+
+    def to_dataframe(self):
+        """
+        :return: pandas dataframe with columns 'Checked-off' and 'Check-off date' and a date index
+        """
+        return self.df_habit
+
+    def write(self, file):
+        """
+        Saving the history to a .json-file (pandas layout)
+
+        :param file: path to file
+        :return:
+        """
+        codec.write_habit_file(file, self.df_habit)
+
+
+# available formats of the habit files
+dict_habit_file_formats = {"json": DataFrameHistory,
+                           "bits": BitHistory,
+                           "rle": RunLengthHistory,
+                           "sparse": SparseHistory,
+                           "binary": binstore.BinaryHistory,
+                           "segmented": segments.SegmentedHistory}
+
+
+def create_history(period, file_format="json", created=None):
+    """
+    Creating an empty history of a habit in the given file format
+
+    :param period: periodicity of the habit ('D' or '7d')
+    :param file_format: format of the habit file ('json', 'bits', 'rle', 'sparse', 'binary' or 'segmented')
+    :param created: date of creation of the habit (needed for 'sparse')
+    :return: history object
+    """
+    if file_format not in dict_habit_file_formats:
+        raise ValueError(f"Unknown habit file format! Available: {', '.join(dict_habit_file_formats)}")
+    if file_format == "json":
+        return DataFrameHistory(pd.DataFrame(columns=["Checked-off", "Check-off date"], index=[]), period)
+    if file_format == "sparse":
+        if created is None:
+            raise ValueError("Date of creation is needed for sparse habit files!")
+        return SparseHistory(period, created)
+    return dict_habit_file_formats[file_format](period)
+
+
+# histories whose changes are only logged so far (write-ahead log) and not yet saved to their habit file:
+# path to habit file -> history object
+dict_unsaved_histories = {}
+
+
+def load_history(file, period):
+    """
+    Reading a habit file in any of the available formats (detected from the content of the file)
+
+    :param file: path to habit file
+    :param period: periodicity of the habit ('D' or '7d') - needed for the dataframe layout
+    :return: history object (DataFrameHistory, BitHistory, RunLengthHistory, SparseHistory, BinaryHistory
+             or SegmentedHistory)
+    """
+    if file in dict_unsaved_histories:
+        return dict_unsaved_histories[file]
+
+    if binstore.is_binary_file(file):
+        return binstore.BinaryHistory.read(file, period)
+
+    content = storage.backend.read_text(file)
+
+    if content.startswith('{"format":'):
+        data = json.loads(content)
+        if data["format"] not in dict_habit_file_formats:
+            raise ValueError("Unknown habit file format!")
+        if data["format"] == "segmented":
+            # archive segments are stored next to the habit file
+            return segments.SegmentedHistory.from_dict(data, file)
+        return dict_habit_file_formats[data["format"]].from_dict(data)
+
+    return DataFrameHistory(codec.decode_habit_file(content), period)
+
+
+def detect_format(file):
+    """
+    Detecting the format of a habit file from its first bytes (without reading the whole file)
+
+    :param file: path to habit file
+    :return: format of the habit file ('json', 'bits', 'rle', 'sparse', 'binary' or 'segmented')
+    """
+    prefix = storage.backend.read_prefix(file, 32)
+
+    if prefix.startswith(binstore.MAGIC):
+        return "binary"
+    if prefix.startswith(b'{"format":"'):
+        return prefix[len(b'{"format":"'):].split(b'"')[0].decode("ascii")
+    return "json"
+
+
+def read_habit_file(file, period="D"):
+    """
+    Reading a habit file in any of the available formats into the dataframe layout
+
+    :param file: path to habit file
+    :param period: periodicity of the habit ('D' or '7d')
+    :return: pandas dataframe with columns 'Checked-off' and 'Check-off date' and a date index
+    """
+    return load_history(file, period).to_dataframe()
+
+
+def read_day(data, key):
+    """
+    Reading a day number from serialized history data (key '<key>_day', older files: ISO date '<key>')
+
+    :param data: dictionary of the serialized history
+    :param key: name of the date ('start' or 'created')
+    :return: day number (None if not set)
+    """
+    if f"{key}_day" in data:
+        return data[f"{key}_day"]
+    return None if data.get(key) is None else periods.to_day(datetime.fromisoformat(data[key]))
+
+
+def to_milliseconds(timestamp):
+    """
+    Converting a datetime (naive datetimes are regarded as UTC) to milliseconds since 1970-01-01 (UTC)
+
+    :param timestamp: datetime or pandas timestamp
+    :return: integer
+    """
+    timestamp = pd.Timestamp(timestamp)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+    return int(timestamp.to_datetime64().astype("datetime64[ms]").astype(np.int64))
@@ -42,6 +42,38 @@ def read_config_data():
         return dict_config_data
 
 
+def apply_config_data(config_data):
+    """
+    Applying the configuration data: paths to habit overview and habit files (of the tenant), format of new habit
+    files and write-ahead log
+
+    :param config_data: dictionary with config data from config.txt (see read_config_data())
+    :return: tuple (absolute path to habit overview, relative path to habit files, absolute path to habit files)
+    """
+    absolute_path_habit_overview = f"{os.path.normpath(os.getcwd())}\\{config_data['Path File Habits Overview']}"
+    relative_path_habit_files = config_data['Directory Habits']
+    absolute_directory_habit_files = f"{os.path.normpath(os.getcwd())}\\{config_data['Directory Habits']}"
+    # format of new habit files ('json', 'bits', 'rle' or 'sparse') - existing files are read in any format
+    habits.habit_file_format = config_data.get('Habit File Format', 'json')
+    # worker processes of the analysis reading the check-offs from shared memory ('off' or number of processes)
+    if config_data.get('Analysis Processes', 'off') != 'off':
+        analyze.analysis_processes = int(config_data['Analysis Processes'])
+    # tenant of the session: own habit overview and habit files in the sharded directories of the tenants
+    tenant = tenants.select_tenant(config_data)
+    if tenant is not None:
+        path_registry = tenants.registry_file(os.path.join(os.getcwd(),
+                                                           *config_data['Directory Documents'].split("\\")))
+        absolute_path_habit_overview, absolute_directory_habit_files = \
+            tenants.register_tenant(path_registry, tenant)
+        relative_path_habit_files = os.path.relpath(absolute_directory_habit_files)
+        tenants.current_tenant = (path_registry, tenant)
+    # mutations of habits are logged first and folded into the habit files by checkpoints ('on' / 'off')
+    if config_data.get('Write-Ahead Log', 'off') == 'on':
+        habits.write_ahead_log = wal.WriteAheadLog(absolute_path_habit_overview)
+
+    return absolute_path_habit_overview, relative_path_habit_files, absolute_directory_habit_files
+
+
 def starting_routine(absolute_path_habit_overview, relative_path_habit_files):
     """
     Starting routine needs to be executed every time the app gets started.
@@ -55,25 +87,78 @@ def starting_routine(absolute_path_habit_overview, relative_path_habit_files):
 
     # creating empty global list for habit instances
     habits.list_habit_instances = []
-    # if path read from config file to habit overview exists ...
-    if os.path.exists(absolute_path_habit_overview):
-        # ... checking habit overview for existing habits
-        df_habit_overview = habits.read_habit_overview(absolute_path_habit_overview)
-        if not df_habit_overview.empty:
-            # if habit overview isn't empty: habits need to be re-instantiated
-            status_called_function = habits.re_instantiate_habits(df_habit_overview)
-            return status_called_function
-        else:
-            # if habit overview is empty there's nothing else to do
-            return "No current habits for re-instantiating"
+    # if path read from config file to habit overview exists (storage backend, e.g. in memory) ...
+    if storage.backend.exists(absolute_path_habit_overview):
+        # ... replaying logged mutations that haven't been folded into the habit files (e.g. after a crash)
+        if habits.write_ahead_log is not None:
+            status_recovery = habits.write_ahead_log.recover()
+            if status_recovery is not None:
+                print(status_recovery)
+        # ... cleaning up habits deleted in the last session (tombstones) in the background
+        tombstones.start_compaction(absolute_path_habit_overview)
+        # ... restoring the habits from the snapshot of the last session (if still valid)
+        status_called_function = snapshot.load_snapshot(absolute_path_habit_overview)
+        if status_called_function is None:
+            # ... otherwise checking habit overview for existing habits
+            df_habit_overview = habits.read_habit_overview(absolute_path_habit_overview)
+            if not df_habit_overview.empty:
+                # if habit overview isn't empty: habits need to be re-instantiated
+                status_called_function = habits.re_instantiate_habits(df_habit_overview)
+            else:
+                # if habit overview is empty there's nothing else to do
+                status_called_function = "No current habits for re-instantiating"
+        # ... and correcting the number of habits of the tenant in the registry (e.g. habits deleted by a crash)
+        tenants.update_habit_count(number_of_habits=len(habits.list_habit_instances))
+        return status_called_function
 
     else:
         # if there's no structure according to the config.txt the structure and habit overview need to be created
-        create_structure(relative_path_habit_files)
+        # (directories of tenants are created when registering the tenant)
+        if tenants.current_tenant is None:
+            create_structure(relative_path_habit_files)
         habits.create_habit_overview(absolute_path_habit_overview)
         return "Structure created"
 
 
+def closing_routine(absolute_path_habit_overview):
+    """
+    Closing routine needs to be executed every time the app (or the daemon) is quit.
+    Saves the state of the session for a fast start next time.
+
+    :param absolute_path_habit_overview: Absolute path to habit overview (.json-file)
+    :return: Status of closing routine
+    """
+    # folding the write-ahead log into the habit files and overview ...
+    if habits.write_ahead_log is not None:
+        habits.write_ahead_log.checkpoint()
+        # (habits changed by other processes meanwhile are read again for the snapshot)
+        habits.reload_merged_habits()
+    # ... compacting the habits deleted in this session ...
+    tombstones.wait_for_compaction()
+    tombstones.compact(absolute_path_habit_overview, [habit.file for habit in habits.list_habit_instances])
+    # ... and checkpoint of the current state for a fast start next time
+    status = snapshot.write_snapshot(absolute_path_habit_overview, habits.list_habit_instances)
+    return status
+
+
+def auto_update_routine():
+    """
+    Auto-updating the habits without user interaction (cron entry: python habittracker.py --auto-update).
+    Only the habits whose next deadline has passed are auto-updated by the starting routine (see scheduler.py).
+
+    :return: exit code (0: success, 1: error)
+    """
+    config_data = read_config_data()
+    if config_data["Status config-file"].split(" ")[0] == "ERROR:":
+        print(config_data["Status config-file"])
+        return 1
+    absolute_path_habit_overview, relative_path_habit_files, absolute_directory_habit_files = \
+        apply_config_data(config_data)
+    print(starting_routine(absolute_path_habit_overview, relative_path_habit_files))
+    print(closing_routine(absolute_path_habit_overview))
+    return 0
+
+
 def create_structure(relative_path_habit_files):
     """
     Creating the directories (default values)
@@ -110,20 +195,32 @@ def main():
         sys.exit()
 
     # assignment of relevant directory parameters from configuration data to run starting routine
-    absolute_path_habit_overview = f"{os.path.normpath(os.getcwd())}\\{config_data['Path File Habits Overview']}"
-    relative_path_habit_files = config_data['Directory Habits']
-    absolute_directory_habit_files = f"{os.path.normpath(os.getcwd())}\\{config_data['Directory Habits']}"
+    absolute_path_habit_overview, relative_path_habit_files, absolute_directory_habit_files = \
+        apply_config_data(config_data)
     app_version = config_data['Version']
 
     # running starting routine for
     # (1) re-instantiating habits (if existing) or
     # (2) creating structure (if app is started for the first time)
     starting_routine(absolute_path_habit_overview, relative_path_habit_files)
+    # computing the analysis in the background while the user navigates the menus
+    prefetch.analysis_prefetch.start(habits.list_habit_instances)
+    # watching the habit files for changes made by other programs (e.g. edited by hand)
+    habit_watcher = watcher.HabitWatcher(absolute_path_habit_overview)
 
     # variable for navigation through main menu - "Start main" = default value
     step_main = "Start main"
 
     while step_main != "Quit":
+        # dropping the cached state of habits changed by other programs since the last step
+        # (a running background analysis isn't waited for: its result is replaced below if anything changed)
+        list_changed_habits = habit_watcher.check()
+        if list_changed_habits or habits.auto_update_scheduler.is_due():
+            # the background analysis reads the habits: it's stopped before the missed periods are filled
+            prefetch.analysis_prefetch.cancel()
+            # filling periods missed while the app has been running (e.g. over midnight)
+            habits.run_due_auto_updates()
+            prefetch.analysis_prefetch.start(habits.list_habit_instances)
         # layout prompts via module display functions
         prompt_main = display.header("START", app_version)
         print(prompt_main)
@@ -145,9 +242,11 @@ def main():
                                                        f"{'daily' if habit_attributes[2] == 'D' else 'weekly'}")
 
             if answer_confirmation == "Yes":
-                # instantiating habit and adding it to the habit overview
+                # instantiating habit and adding it to the habit overview (after stopping the background analysis)
+                prefetch.analysis_prefetch.cancel()
                 status_called_function = habits.create_habit(habit_attributes, absolute_path_habit_overview,
                                                              absolute_directory_habit_files)
+                prefetch.analysis_prefetch.start(habits.list_habit_instances)
                 # display
                 display.dummy_output(status_called_function)
 
@@ -167,8 +266,10 @@ def main():
                                                        f"{'daily' if chosen_habit.period == 'D' else 'weekly'}")
 
             if answer_confirmation == "Yes":
-                # check-off habit
+                # check-off habit (after stopping the background analysis)
+                prefetch.analysis_prefetch.cancel()
                 status_called_function = chosen_habit.check_off_habit()
+                prefetch.analysis_prefetch.start(habits.list_habit_instances)
                 # confirmation for checked-off habit (!!! HIER GGF NOCH ERROR HANDLING EINBAUEN !!!)
                 display.dummy_output(status_called_function)
 
@@ -188,7 +289,9 @@ def main():
                                                        f"{'daily' if chosen_habit.period == 'D' else 'weekly'}")
 
             if answer_confirmation == "Yes":
+                prefetch.analysis_prefetch.cancel()
                 status_called_function = chosen_habit.remove_habit(absolute_path_habit_overview)
+                prefetch.analysis_prefetch.start(habits.list_habit_instances)
                 # confirmation for deleted habit
                 display.dummy_output(status_called_function)
 
@@ -203,8 +306,8 @@ def main():
         elif step_main == "Analyze my habits":
             """ --- FROM THIS POINT ON ANALYSIS MENU --- """
             # if user wants to analyze existing habits: analyzing-module starts and analysis menu is displayed
-            # dataframe (pandas) is created
-            df_analyzed_habits = analyze.request_analysis(habits.list_habit_instances)
+            # dataframe (pandas) is taken from the prefetch (computed in the background)
+            df_analyzed_habits = prefetch.analysis_prefetch.result(habits.list_habit_instances)
 
             if df_analyzed_habits.empty:
                 display.dummy_output("ERROR: No habits existing for analysis!")
@@ -236,6 +339,28 @@ def main():
                     print(result_analysis)
                     display.dummy_output("Analysis successful")
 
+                elif step_analysis == "Habits at risk today":
+                    # if user wants to see the running streaks whose period ends soon
+                    df_at_risk = analyze.request_habits_at_risk(habits.list_habit_instances)
+                    if df_at_risk.empty:
+                        print("No running streaks at risk. Well done!")
+                    else:
+                        print(step_analysis)
+                        analyze.render_table(df_at_risk, sys.stdout)
+                    display.dummy_output("Analysis successful")
+
+                elif step_analysis == "Completion per month (all habits)":
+                    # if user wants to see the monthly rollups (read from the materialized rollups of the habits)
+                    df_rollups = rollups.request_rollups(habits.list_habit_instances, "Month")
+                    print(step_analysis)
+                    analyze.render_table(df_rollups, sys.stdout)
+                    display.dummy_output("Analysis successful")
+
+                elif step_analysis == "Cross-habit analysis (daily habits)":
+                    # if user wants to see statistics across all daily habits (one boolean matrix habits x days)
+                    print(matrix.create_cross_analysis(habits.list_habit_instances))
+                    display.dummy_output("Analysis successful")
+
                 elif step_analysis == "Return to main":
                     # if no (further) analysis is wanted
                     pass
@@ -269,12 +394,13 @@ def main():
                         analysis_sorted_by = "Longest Streak"
                         analysis_periodicity = ["weekly"]
 
-                    result_analysis = analyze.create_analysis(df_analyzed_habits,
-                                                              step_analysis,
-                                                              analysis_sorted_by,
-                                                              analysis_periodicity)
-                    # print the results
-                    print(result_analysis)
+                    # results are streamed directly to the terminal (long specifications are truncated)
+                    analyze.create_analysis(df_analyzed_habits,
+                                            step_analysis,
+                                            analysis_sorted_by,
+                                            analysis_periodicity,
+                                            stream=sys.stdout,
+                                            max_len_spec=40)
                     display.dummy_output("Analysis successful")
 
         elif step_main == "Options":
@@ -293,7 +419,9 @@ def main():
 
                 if step_options == "Create random example data (daily habit)":
                     # if user wants to create a random daily habit
+                    prefetch.analysis_prefetch.cancel()
                     rand_habits.create_random_habit("D", absolute_path_habit_overview, absolute_directory_habit_files)
+                    prefetch.analysis_prefetch.start(habits.list_habit_instances)
                     # confirmation for analyzed habit (!!! HIER GGF NOCH ERROR HANDLING EINBAUEN !!!)
                     display.dummy_output(f"Random habit successfully created!")
                     # habit_attributes = display_functions.user_input_random_habit(habits.list_habit_instances)
@@ -301,16 +429,29 @@ def main():
 
                 elif step_options == "Create random example data (weekly habit)":
                     # if user wants to create a random weekly habit
+                    prefetch.analysis_prefetch.cancel()
                     rand_habits.create_random_habit("7d", absolute_path_habit_overview, absolute_directory_habit_files)
+                    prefetch.analysis_prefetch.start(habits.list_habit_instances)
                     # confirmation for analyzed habit (!!! HIER GGF NOCH ERROR HANDLING EINBAUEN !!!)
                     display.dummy_output(f"Random habit successfully created!")
                     # habit_attributes = display_functions.user_input_random_habit(habits.list_habit_instances)
                     # habits.create_habit(habit_attributes, absolute_path_habit_overview)
 
+                elif step_options == "Delete all demo data":
+                    # if user wants to delete all random habits (tombstones, files are removed in the background)
+                    answer_confirmation = display.confirmation("Do you really want to delete all demo data?")
+                    if answer_confirmation == "Yes":
+                        prefetch.analysis_prefetch.cancel()
+                        status_called_function = habits.remove_demo_habits(absolute_path_habit_overview)
+                        prefetch.analysis_prefetch.start(habits.list_habit_instances)
+                        display.dummy_output(status_called_function)
+
                 elif step_options == "Return to main":
                     # if no (further) options are wanted
                     pass
 
         elif step_main == "Quit":
-            # if user wants to quit
-            pass
+            # if user wants to quit: saving the state of the session (the analysis isn't needed anymore)
+            prefetch.analysis_prefetch.cancel()
+            habit_watcher.close()
+            closing_routine(absolute_path_habit_overview)
@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+
+import habittracker.analyze
+import habittracker.habits
+import habittracker.periods
+
+
+list_weekdays = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+class HabitMatrix:
+    """
+    All daily habits aligned into one boolean matrix (habits x days):
+    - done: True if the habit has been checked-off on that day
+    - valid: True if the day belongs to the tracked periods of the habit
+    Cross-habit statistics are calculated with vectorized operations over the whole matrix.
+    """
+
+    def __init__(self, names, first_day, done, valid):
+        self.names = names
+        self.first_day = first_day
+        self.done = done
+        self.valid = valid
+
+    def days(self):
+        """
+        :return: numpy datetime64 array with the days (columns) of the matrix
+        """
+        return np.datetime64(self.first_day, "D") + np.arange(self.done.shape[1])
+
+    def all_done_days(self):
+        """
+        Days on which every daily habit tracked on that day has been checked-off
+
+        :return: list of dates
+        """
+        all_done = np.all(self.done | ~self.valid, axis=0) & self.valid.any(axis=0)
+        return [self.first_day + timedelta(int(n)) for n in np.flatnonzero(all_done)]
+
+    def weekday_rates(self):
+        """
+        Completion rate of all daily habits per weekday
+
+        :return: pandas dataframe with columns 'Weekday', 'Periods', 'Checked-off' and 'Completion rate'
+        """
+        weekdays = (self.first_day.weekday() + np.arange(self.done.shape[1])) % 7
+        periods = np.bincount(weekdays, weights=self.valid.sum(axis=0), minlength=7).astype(int)
+        checked_off = np.bincount(weekdays, weights=(self.done & self.valid).sum(axis=0), minlength=7).astype(int)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rates = np.where(periods > 0, checked_off / periods * 100, np.nan)
+
+        return pd.DataFrame({"Weekday": list_weekdays,
+                             "Periods": periods,
+                             "Checked-off": checked_off,
+                             "Completion rate": rates.round(2)})
+
+    def best_weekday(self):
+        """
+        :return: weekday with the highest completion rate ('-' if there's no tracked day)
+        """
+        df_weekdays = self.weekday_rates()
+        if df_weekdays["Periods"].sum() == 0:
+            return "-"
+        return df_weekdays.loc[df_weekdays["Completion rate"].idxmax(), "Weekday"]
+
+    def co_occurrence(self):
+        """
+        Number of days on which two habits have both been checked-off (diagonal: checked-off days of the habit)
+
+        :return: pandas dataframe (habits x habits)
+        """
+        done = (self.done & self.valid).astype(np.int64)
+        return pd.DataFrame(done @ done.T, index=self.names, columns=self.names)
+
+    def co_occurrence_rate(self):
+        """
+        Share of the days tracked by both habits on which both have been checked-off
+
+        :return: pandas dataframe (habits x habits) with percentages
+        """
+        valid = self.valid.astype(np.int64)
+        both_valid = valid @ valid.T
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rates = np.where(both_valid > 0, self.co_occurrence().to_numpy() / both_valid * 100, np.nan)
+        return pd.DataFrame(rates.round(2), index=self.names, columns=self.names)
+
+
+def build_matrix(habit_instances):
+    """
+    Aligning all daily habits into one HabitMatrix.
+    The checked-off periods are taken from the history index of the habits (habit files are only read
+    if the index of a habit has not been built yet).
+
+    :param habit_instances: List of existing habit instances
+    :return: HabitMatrix (None if there are no daily habits with data)
+    """
+    list_names = []
+    list_first_days = []
+    list_checked_off = []
+    for habit in habit_instances:
+        if not isinstance(habit, habittracker.habits.Habit):
+            raise TypeError("Parameter is not of class Habit!")
+        if habit.period != "D":
+            continue
+        history_index = habit.get_history_index()
+        if len(history_index) == 0:
+            continue
+        list_names.append(habit.name)
+        list_first_days.append(history_index.first_day)
+        list_checked_off.append(history_index.checked_off())
+
+    if not list_names:
+        return None
+
+    first_day = min(list_first_days)
+    offsets = np.array(list_first_days) - first_day
+    lengths = np.array([len(checked_off) for checked_off in list_checked_off])
+    number_of_days = int((offsets + lengths).max())
+
+    done = np.zeros((len(list_names), number_of_days), dtype=bool)
+    # valid days of every habit: from its first period until its last period
+    columns = np.arange(number_of_days)
+    valid = (columns >= offsets[:, None]) & (columns < (offsets + lengths)[:, None])
+    done[valid] = np.concatenate(list_checked_off)
+
+    return HabitMatrix(list_names, habittracker.periods.to_date(first_day), done, valid)
+
+
+def create_cross_analysis(habit_instances):
+    """
+    Creating the cross-habit analysis output for all daily habits:
+    days on which all habits have been done, completion per weekday and co-occurrence of the habits
+
+    :param habit_instances: List of existing habit instances
+    :return: string with the analysis
+    """
+    habit_matrix = build_matrix(habit_instances)
+    if habit_matrix is None:
+        return "There are no daily habits to be analyzed!"
+
+    all_done_days = habit_matrix.all_done_days()
+    df_weekdays = habit_matrix.weekday_rates()
+    df_weekdays["Completion rate"] = df_weekdays["Completion rate"].map(
+        lambda rate: "-" if np.isnan(rate) else f"{rate}%")
+    df_co_occurrence = habit_matrix.co_occurrence().rename_axis("Checked-off together").reset_index()
+
+    return f"Cross-habit analysis of {len(habit_matrix.names)} daily habits:\n" \
+           f"Days with all habits checked-off: {len(all_done_days)}" \
+           f"{' (last: ' + str(all_done_days[-1]) + ')' if all_done_days else ''}\n" \
+           f"Best weekday: {habit_matrix.best_weekday()}\n\n" \
+           f"{habittracker.analyze.render_table(df_weekdays)}\n\n" \
+           f"{habittracker.analyze.render_table(df_co_occurrence)}\n"
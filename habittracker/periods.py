@@ -0,0 +1,119 @@
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+
+
+# all periods are represented as integer day numbers (days since 1970-01-01)
+# daily periods: consecutive day numbers, weekly periods: day numbers with a step of seven days
+# (weekly periods are anchored at the first period of the habit, not at a fixed weekday)
+EPOCH = date(1970, 1, 1)
+
+
+def period_step(period):
+    """
+    :param period: periodicity of the habit ('D' or '7d')
+    :return: days between two periods (daily: 1, weekly: 7)
+    """
+    if period == "D":
+        return 1
+    elif period == "7d":
+        return 7
+    else:
+        raise ValueError("Periodicity must be 'D' (daily) or '7d' (weekly)!")
+
+
+def to_day(value):
+    """
+    Converting a date to its day number
+
+    :param value: date, datetime (date part is used) or pandas timestamp
+    :return: integer (days since 1970-01-01)
+    """
+    if isinstance(value, (datetime, pd.Timestamp)):
+        value = value.date()
+    if not isinstance(value, date):
+        raise TypeError("Only dates can be converted to day numbers!")
+    return (value - EPOCH).days
+
+
+def as_day(value):
+    """
+    Day number of a value that is either already a day number or a date (None stays None)
+
+    :param value: integer, date, datetime, pandas timestamp or None
+    :return: integer or None
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return to_day(value)
+
+
+def to_date(day):
+    """
+    Converting a day number to a date (for display only)
+
+    :param day: integer (days since 1970-01-01)
+    :return: date
+    """
+    return EPOCH + timedelta(int(day))
+
+
+def to_days(index):
+    """
+    Converting a date index (e.g. of a habit dataframe) to day numbers
+
+    :param index: pandas DatetimeIndex or array-like of dates
+    :return: numpy int64 array
+    """
+    return pd.DatetimeIndex(index).values.astype("datetime64[D]").astype(np.int64)
+
+
+def to_date_index(days):
+    """
+    Converting day numbers to a pandas DatetimeIndex (for the dataframe layout of the habit file)
+
+    :param days: array-like of integers (days since 1970-01-01)
+    :return: pandas DatetimeIndex
+    """
+    return pd.DatetimeIndex(np.asarray(days, dtype=np.int64).astype("datetime64[D]").astype("datetime64[ns]"))
+
+
+def period_range(start_day, end_day, period):
+    """
+    Day numbers of all periods from start_day until end_day (both included)
+
+    :param start_day: day number of the first period
+    :param end_day: last possible day number
+    :param period: periodicity of the habit ('D' or '7d')
+    :return: numpy int64 array
+    """
+    return np.arange(start_day, end_day + 1, period_step(period), dtype=np.int64)
+
+
+def to_strings(days):
+    """
+    Converting day numbers to ISO date strings (for display only)
+
+    :param days: array-like of integers (days since 1970-01-01)
+    :return: numpy array of strings ('YYYY-MM-DD')
+    """
+    return np.datetime_as_string(np.asarray(days, dtype=np.int64).astype("datetime64[D]"))
+
+
+def longest_run(checked_off):
+    """
+    Longest run of checked-off periods (first one if there are several), calculated vectorized
+
+    :param checked_off: numpy boolean array with one entry per period
+    :return: tuple (length of the run, position of its first period) - (0, None) if no period has been checked-off
+    """
+    # starts and ends of the runs of checked-off periods
+    edges = np.diff(np.concatenate(([0], np.asarray(checked_off, dtype=np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    if len(run_starts) == 0:
+        return 0, None
+    run_lengths = np.flatnonzero(edges == -1) - run_starts
+    position = int(np.argmax(run_lengths))
+    return int(run_lengths[position]), int(run_starts[position])
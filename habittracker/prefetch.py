@@ -0,0 +1,135 @@
+"""
+Prefetch of the overview analysis: the analysis of all habits is computed on a background thread as soon as the habits
+are loaded and again after every change of the habits, while the app waits for the user at the main menu.
+Entering the analysis menu takes the finished snapshot (or waits for the running computation).
+A new computation cancels the running one: its result would be stale anyway.
+The computation reads and builds the history indexes of the habits (habit.history_index), so the habits must not be
+changed while it's running: the app cancels the computation before changing them, and a cancelled computation is
+joined before cancel() / start() return. The main menu doesn't wait for it: dropping the cached state of habits changed
+by other programs (watcher.py) only makes the computation read the changed files again, and its stale result is
+cancelled and computed again right after.
+"""
+import threading
+from datetime import datetime
+import pytz
+
+import habittracker.analyze
+import habittracker.sharedmatrix
+
+
+def compute_analysis(habit_instances, current_day, cancelled):
+    """
+    Overview analysis of the habits (same as analyze.request_analysis()), stopped as soon as it's cancelled
+
+    :param habit_instances: List of existing habit instances
+    :param current_day: reference day of the analysis
+    :param cancelled: threading.Event - set if the result isn't needed anymore
+    :return: pandas dataframe for analyzing existing habits - None if cancelled
+    """
+    if habittracker.analyze.analysis_processes is not None and len(habit_instances) > 0:
+        # worker processes reading the check-offs from shared memory (see sharedmatrix.py)
+        return habittracker.sharedmatrix.request_analysis(habit_instances, current_day,
+                                                          habittracker.analyze.analysis_processes, cancelled)
+    windows = habittracker.analyze.create_windows(current_day)
+    list_results = []
+    for habit in habit_instances:
+        if cancelled.is_set():
+            return None
+        list_results.append(habittracker.analyze.analyze_row(habit, windows, current_day))
+    return habittracker.analyze.create_analysis_dataframe(list_results, windows)
+
+
+class AnalysisPrefetch:
+    """
+    Snapshot of the overview analysis computed in the background.
+    Every computation gets a generation number: only the result of the latest one is kept.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # running / last computation (threading.Thread) and its cancel event
+        self.thread = None
+        self.cancelled = None
+        self.generation = 0
+        # result of the latest computation (None while running, after cancelling or if it failed)
+        self.df_analysis = None
+        # reference day of the latest computation (the date windows of the analysis depend on it)
+        self.current_day = None
+
+    def start(self, habit_instances):
+        """
+        Starting a new computation (the running one is cancelled)
+
+        :param habit_instances: List of existing habit instances
+        :return:
+        """
+        # the running computation must have stopped before the next one analyzes the same habits
+        self.cancel()
+        with self.lock:
+            self.generation += 1
+            self.cancelled = threading.Event()
+            self.df_analysis = None
+            self.current_day = datetime.now(pytz.utc).date()
+            # the habits are copied: the list may change while the analysis is running
+            self.thread = threading.Thread(target=self.compute,
+                                           args=(list(habit_instances), self.current_day, self.generation,
+                                                 self.cancelled),
+                                           name="habittracker-prefetch", daemon=True)
+            self.thread.start()
+
+    def compute(self, habit_instances, current_day, generation, cancelled):
+        # background thread: the result is kept if no newer computation has been started meanwhile
+        try:
+            df_analysis = compute_analysis(habit_instances, current_day, cancelled)
+        except (OSError, ValueError, KeyError, IndexError):
+            # e.g. habit file changed meanwhile: the analysis is computed again when requested
+            df_analysis = None
+        with self.lock:
+            if generation == self.generation and not cancelled.is_set():
+                self.df_analysis = df_analysis
+
+    def cancel(self):
+        """
+        Cancelling the running computation and dropping the snapshot. Returns as soon as the computation has stopped
+        (after the habit being analyzed), so the habits can be changed afterwards.
+
+        :return:
+        """
+        with self.lock:
+            if self.cancelled is not None:
+                self.cancelled.set()
+            self.generation += 1
+            self.df_analysis = None
+        # joined outside of the lock: the computation takes it to drop its result
+        self.wait()
+
+    def wait(self, timeout=None):
+        """
+        Waiting for the running computation
+
+        :param timeout: maximum time to wait in seconds (default: no limit)
+        :return: True if no computation is running anymore
+        """
+        thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+    def result(self, habit_instances):
+        """
+        Overview analysis of the habits: the snapshot of the latest computation (after waiting for it to finish).
+        Computed at once if there's no valid snapshot (not started, cancelled, failed or computed on another day).
+
+        :param habit_instances: List of existing habit instances
+        :return: pandas dataframe for analyzing existing habits
+        """
+        self.wait()
+        with self.lock:
+            if self.df_analysis is not None and self.current_day == datetime.now(pytz.utc).date():
+                return self.df_analysis.copy()
+        return habittracker.analyze.request_analysis(habit_instances)
+
+
+# prefetch of the overview analysis used by the app
+analysis_prefetch = AnalysisPrefetch()
@@ -3,7 +3,10 @@ import random
 import pandas as pd
 import numpy as np
 
+from habittracker import codec
 from habittracker import habits
+from habittracker import rollups
+from habittracker import tenants
 
 list_random_doings = [
     "Python Coding",
@@ -50,9 +53,11 @@ def create_random_habit(period, path_habit_overview, absolute_directory_habit_fi
     while name in names_existing_habits:
         name = list_random_doings[random.randint(0, len(list_random_doings) - 1)]
     # file path to habit file
-    file = f"{absolute_directory_habit_files}\\{name.replace(' ', '_').lower()}.json"
+    file = tenants.habit_file(absolute_directory_habit_files, name)
     # default specification for demo data
     spec = "! DEMO ! DATA !"
+    # the files of deleted demo data with the same name must be gone before the new habit file is created
+    habits.release_habit_file(path_habit_overview, file)
 
     # random data starts 2021/01/01 at the earliest
     start = date(2021, 1, 1)
@@ -69,6 +74,8 @@ def create_random_habit(period, path_habit_overview, absolute_directory_habit_fi
     new_instance = habits.Habit(name, spec, period, file, start_habit)
     # adding habit to habit overview
     new_instance.add_to_overview(path_habit_overview)
+    # number of habits of the tenant (registry)
+    tenants.update_habit_count(1)
 
     # empty list for dataframe values
     values_for_dataframe = []
@@ -97,4 +104,6 @@ def create_random_habit(period, path_habit_overview, absolute_directory_habit_fi
     # creating dataframe on basis of randomly created index and randomly created values
     df_habit = pd.DataFrame(values_for_dataframe, columns=["Checked-off", "Check-off date"], index=index_for_dataframe)
     # saving dataframe to .json file
-    df_habit.to_json(new_instance.file, date_format='iso')
+    codec.write_habit_file(new_instance.file, df_habit)
+    # materializing rollups of the random data
+    rollups.write_rollups(new_instance.file, rollups.compute_rollups(df_habit))
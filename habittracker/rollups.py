@@ -0,0 +1,186 @@
+import json
+import pandas as pd
+
+from habittracker import history
+from habittracker import storage
+
+
+# calendar buckets of the rollups and the according pandas resample rules (buckets are labeled by their first day)
+dict_rollup_rules = {"Week": "W-MON",
+                     "Month": "MS",
+                     "Year": "AS"}
+
+
+def rollup_file(habit_file):
+    """
+    Path of the materialized rollups, stored next to the habit file
+
+    :param habit_file: path to habit file (.json)
+    :return: path to rollup file (string)
+    """
+    return f"{habit_file[:-5]}_rollups.json"
+
+
+def compute_rollups(df_habit):
+    """
+    Computing the number of periods and checked-off periods per calendar week, month and year
+    with vectorized resampling of the habit data
+
+    :param df_habit: pandas dataframe with habit data (column 'Checked-off' and date index)
+    :return: dictionary with bucket ('Week', 'Month', 'Year') as key and pandas dataframe
+             (columns 'Periods' and 'Checked-off', index first day of bucket as string) as value
+    """
+    dict_rollups = {}
+    for bucket, rule in dict_rollup_rules.items():
+        if df_habit.empty:
+            dict_rollups[bucket] = pd.DataFrame(columns=["Periods", "Checked-off"], dtype="int64")
+            continue
+
+        df_periods = pd.DataFrame({"Periods": 1, "Checked-off": (df_habit["Checked-off"] == "Yes").astype("int64")},
+                                  index=pd.DatetimeIndex(df_habit.index))
+        df_bucket = df_periods.resample(rule, label="left", closed="left").sum()
+        # empty buckets (e.g. between two weekly periods) are not materialized
+        df_bucket = df_bucket[df_bucket["Periods"] > 0]
+        df_bucket.index = df_bucket.index.strftime("%Y-%m-%d")
+        dict_rollups[bucket] = df_bucket
+
+    return dict_rollups
+
+
+def merge_rollups(list_rollups):
+    """
+    Adding up rollups (e.g. existing rollups and rollups of appended periods or rollups of several habits)
+
+    :param list_rollups: list of rollup dictionaries (see compute_rollups())
+    :return: rollup dictionary
+    """
+    dict_rollups = {}
+    for bucket in dict_rollup_rules:
+        list_df = [rollups[bucket] for rollups in list_rollups if not rollups[bucket].empty]
+        if not list_df:
+            dict_rollups[bucket] = pd.DataFrame(columns=["Periods", "Checked-off"], dtype="int64")
+        else:
+            dict_rollups[bucket] = pd.concat(list_df).groupby(level=0).sum().sort_index()
+
+    return dict_rollups
+
+
+def write_rollups(habit_file, dict_rollups):
+    """
+    Materializing the rollups next to the habit file
+
+    :param habit_file: path to habit file (.json)
+    :param dict_rollups: rollup dictionary (see compute_rollups())
+    :return:
+    """
+    data = {bucket: {key: [int(row[0]), int(row[1])] for key, row in
+                     zip(df_bucket.index, df_bucket[["Periods", "Checked-off"]].to_numpy())}
+            for bucket, df_bucket in dict_rollups.items()}
+    storage.backend.write_text(rollup_file(habit_file), json.dumps(data))
+
+
+def read_rollups(habit_file):
+    """
+    Reading the materialized rollups of a habit
+
+    :param habit_file: path to habit file (.json)
+    :return: rollup dictionary (see compute_rollups())
+    """
+    data = json.loads(storage.backend.read_text(rollup_file(habit_file)))
+
+    dict_rollups = {}
+    for bucket in dict_rollup_rules:
+        dict_rollups[bucket] = pd.DataFrame.from_dict(data.get(bucket, {}), orient="index",
+                                                     columns=["Periods", "Checked-off"]).astype("int64")
+
+    return dict_rollups
+
+
+def is_sparse(habit_file):
+    """
+    Sparse habit files (see history.SparseHistory) derive their missed periods from the current day: the periods of
+    their rollups change every day without any change of the habit file, so their rollups are not materialized.
+
+    :param habit_file: path to habit file (.json)
+    :return: True if the habit file is a sparse habit file
+    """
+    if habit_file in history.dict_unsaved_histories:
+        return isinstance(history.dict_unsaved_histories[habit_file], history.SparseHistory)
+    return history.detect_format(habit_file) == "sparse"
+
+
+def update_rollups(habit_file, df_appended, period):
+    """
+    Updating the materialized rollups incrementally after periods have been appended to the habit data.
+    If there are no rollups yet, they are computed from the complete (already saved) habit file.
+    Sparse habit files: the appended periods don't contain the missed periods before them, so no rollups are kept
+    (see get_rollups()).
+
+    :param habit_file: path to habit file (.json)
+    :param df_appended: pandas dataframe with the appended periods
+    :param period: periodicity of the habit ('D' or '7d')
+    :return:
+    """
+    if is_sparse(habit_file):
+        remove_rollups(habit_file)
+        return
+    if storage.backend.exists(rollup_file(habit_file)):
+        dict_rollups = merge_rollups([read_rollups(habit_file), compute_rollups(df_appended)])
+    else:
+        dict_rollups = compute_rollups(history.read_habit_file(habit_file, period))
+    write_rollups(habit_file, dict_rollups)
+
+
+def remove_rollups(habit_file):
+    """
+    Removing the materialized rollups of a habit (if existing)
+
+    :param habit_file: path to habit file (.json)
+    :return:
+    """
+    if storage.backend.exists(rollup_file(habit_file)):
+        storage.backend.remove(rollup_file(habit_file))
+
+
+def get_rollups(habit):
+    """
+    Returns the rollups of a habit. Materialized rollups are used as long as they are up-to-date,
+    otherwise (missing or habit file changed afterwards) they are computed from the habit file and materialized.
+    Rollups of sparse habit files are always computed from the habit file (see is_sparse()).
+
+    :param habit: habit instance
+    :return: rollup dictionary (see compute_rollups())
+    """
+    if is_sparse(habit.file):
+        return compute_rollups(history.read_habit_file(habit.file, habit.period))
+    file_rollups = rollup_file(habit.file)
+    if storage.backend.exists(file_rollups) and \
+            storage.backend.stat(file_rollups)[0] >= storage.backend.stat(habit.file)[0]:
+        return read_rollups(habit.file)
+
+    dict_rollups = compute_rollups(history.read_habit_file(habit.file, habit.period))
+    write_rollups(habit.file, dict_rollups)
+    return dict_rollups
+
+
+def request_rollups(habit_instances, bucket):
+    """
+    Creating a pandas dataframe with the number of periods, checked-off periods and completion rate
+    per calendar bucket for every habit and across all habits (name 'All habits')
+
+    :param habit_instances: List of existing habit instances
+    :param bucket: calendar bucket ('Week', 'Month' or 'Year')
+    :return: pandas dataframe with columns 'Name', bucket, 'Periods', 'Checked-off', 'Completion rate'
+    """
+    if bucket not in dict_rollup_rules:
+        raise ValueError(f"Rollups are only available for {', '.join(dict_rollup_rules)}!")
+
+    list_rollups = [get_rollups(habit) for habit in habit_instances]
+    list_df = [rollups[bucket].assign(Name=habit.name) for habit, rollups in zip(habit_instances, list_rollups)]
+    df_total = merge_rollups(list_rollups)[bucket].assign(Name="All habits")
+
+    df_rollups = pd.concat(list_df + [df_total]).rename_axis(bucket).reset_index()
+    df_rollups["Completion rate"] = (df_rollups["Checked-off"] / df_rollups["Periods"] * 100).round(2) \
+        .astype(str) + "%"
+
+    return df_rollups[["Name", bucket, "Periods", "Checked-off", "Completion rate"]]
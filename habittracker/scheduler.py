@@ -0,0 +1,147 @@
+"""
+Deadline-ordered auto-updates of the habits: instead of running auto_update_file() on every habit, the habits are kept
+in a min-heap ordered by the day from which their next period counts as missed. Only the habits whose deadline has
+passed are auto-updated, so a long-running process (daemon, service) fills missed periods as days go by and a start
+only touches the habits that are due.
+Habits are scheduled without reading their habit file: as long as the history index of a habit isn't built, it's
+scheduled at its earliest possible deadline (derived from the creation date). The index is built when the habit
+reaches the top of the heap, and the habit is auto-updated or moved to its actual deadline.
+
+Cron entry (from the root directory of the project, e.g. every night): python habittracker.py --auto-update
+"""
+import heapq
+import itertools
+from datetime import datetime
+import pytz
+
+from habittracker import periods
+
+
+def next_deadline(habit, lazy=False):
+    """
+    Day from which auto_update_file() registers missed periods of the habit: the period after the last period of the
+    habit data has ended without a check-off.
+    - daily habits: two days after the last date
+    - weekly habits: two weeks (14 days) after the last date
+    (habits without data: counted from one period before the start date)
+
+    :param habit: habit instance
+    :param lazy: if the history index isn't built yet, the earliest possible deadline is returned instead of reading
+                 the habit file (the deadline of a habit without data: one period after the start date)
+    :return: day number - None if the habit is never auto-updated (demo data, unknown periodicity)
+    """
+    if habit.spec == "! DEMO ! DATA !" or habit.period not in ["D", "7d"]:
+        return None
+    if lazy and habit.history_index is None:
+        return periods.to_day(habit.created) + periods.period_step(habit.period)
+    history_index = habit.get_history_index()
+    last_day = history_index.last_day()
+    if last_day is None:
+        last_day = periods.to_day(habit.created) - history_index.step
+    return last_day + 2 * history_index.step
+
+
+class AutoUpdateScheduler:
+    """
+    Min-heap of the habits ordered by their next deadline (see next_deadline()).
+    Entries are checked lazily: a check-off moves the deadline of a habit without touching the heap, so the deadline is
+    calculated again (from the history index) before a habit is auto-updated. Habits are scheduled with
+    next_deadline(habit, lazy=True): no habit file is read before the habit reaches the top of the heap.
+    """
+
+    def __init__(self, list_habits=()):
+        # heap entries: (deadline (day number), sequence number, habit) - the sequence number keeps the order stable
+        self.heap = []
+        # habit -> sequence number of its valid entry (entries of unscheduled / rescheduled habits are skipped)
+        self.dict_sequences = {}
+        self.counter = itertools.count()
+        for habit in list_habits:
+            self.schedule(habit)
+
+    def __len__(self):
+        return len(self.dict_sequences)
+
+    def schedule(self, habit, deadline=None):
+        """
+        Adding a habit (or moving it to a new deadline)
+
+        :param habit: habit instance
+        :param deadline: day number (default: next_deadline() of the habit, the earliest possible one if the history
+                         index of the habit isn't built yet)
+        :return:
+        """
+        if deadline is None:
+            deadline = next_deadline(habit, lazy=True)
+        if deadline is None:
+            # habit is never auto-updated
+            self.dict_sequences.pop(habit, None)
+            return
+        sequence = next(self.counter)
+        self.dict_sequences[habit] = sequence
+        heapq.heappush(self.heap, (deadline, sequence, habit))
+
+    def unschedule(self, habit):
+        """
+        Removing a habit (e.g. deleted habit) - its entry is dropped as soon as it reaches the top of the heap
+
+        :param habit: habit instance
+        :return:
+        """
+        self.dict_sequences.pop(habit, None)
+
+    def drop_invalid(self):
+        # removing entries of unscheduled / rescheduled habits from the top of the heap
+        while self.heap and self.dict_sequences.get(self.heap[0][2]) != self.heap[0][1]:
+            heapq.heappop(self.heap)
+
+    def next_deadline_day(self):
+        """
+        :return: earliest deadline (day number) of all habits - None if no habit is scheduled
+        """
+        self.drop_invalid()
+        return self.heap[0][0] if self.heap else None
+
+    def is_due(self, current_day=None):
+        """
+        :param current_day: day number (default: today)
+        :return: True if at least one habit needs to be auto-updated (constant time)
+        """
+        if current_day is None:
+            current_day = periods.to_day(datetime.now(pytz.utc))
+        next_day = self.next_deadline_day()
+        return next_day is not None and next_day <= current_day
+
+    def due_habits(self, current_day=None):
+        """
+        :param current_day: day number (default: today)
+        :return: list of the habits whose scheduled deadline has passed (run_due() may only move some of them)
+        """
+        if current_day is None:
+            current_day = periods.to_day(datetime.now(pytz.utc))
+        return [habit for deadline, sequence, habit in self.heap
+                if deadline <= current_day and self.dict_sequences.get(habit) == sequence]
+
+    def run_due(self, current_day=None):
+        """
+        Auto-updating the habits whose deadline has passed and scheduling them with their next deadline
+
+        :param current_day: day number (default: today)
+        :return: list of the status of every auto-updated habit
+        """
+        if current_day is None:
+            current_day = periods.to_day(datetime.now(pytz.utc))
+
+        list_status = []
+        while self.is_due(current_day):
+            _, _, habit = heapq.heappop(self.heap)
+            deadline = next_deadline(habit)
+            if deadline is not None and deadline > current_day:
+                # habit has been checked-off since it was scheduled (or was scheduled at its earliest possible
+                # deadline): only the deadline has moved
+                self.schedule(habit, deadline)
+                continue
+            list_status.append(habit.auto_update_file())
+            # habits that aren't extended by auto-updates (e.g. sparse habit files) are due again tomorrow at the earliest
+            deadline = next_deadline(habit)
+            self.schedule(habit, None if deadline is None else max(deadline, current_day + 1))
+        return list_status
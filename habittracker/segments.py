@@ -0,0 +1,302 @@
+import os
+import gzip
+import json
+import numpy as np
+import pandas as pd
+
+from habittracker import periods
+from habittracker import storage
+
+
+# cache of the archive segments already read (archives are immutable): path -> (check-offs, check-off dates)
+dict_archive_cache = {}
+
+
+def read_archive(file):
+    """
+    Reading an archive segment (compressed .json-file) - every archive is read only once and cached afterwards
+
+    :param file: path to archive segment
+    :return: tuple (numpy boolean array with the check-offs, numpy object array with the check-off dates
+             in milliseconds since 1970-01-01 UTC or None)
+    """
+    if file not in dict_archive_cache:
+        data = json.loads(gzip.decompress(storage.backend.read_bytes(file)).decode("utf-8"))
+        dict_archive_cache[file] = (np.asarray(data["checked_off"], dtype=bool),
+                                    np.asarray(data["check_off_dates"], dtype=object))
+    return dict_archive_cache[file]
+
+
+def write_archive(file, start_day, checked_off, check_off_dates):
+    """
+    Saving an archive segment (compressed .json-file). Archives are immutable - existing archives aren't overwritten.
+
+    :param file: path to archive segment
+    :param start_day: day number of the first period of the segment
+    :param checked_off: list of booleans (True: period has been checked-off)
+    :param check_off_dates: list of check-off dates in milliseconds since 1970-01-01 UTC (None if not checked-off)
+    :return:
+    """
+    if storage.backend.exists(file):
+        return
+    content = json.dumps({"start_day": start_day,
+                          "checked_off": [int(value) for value in checked_off],
+                          "check_off_dates": list(check_off_dates)}, separators=(",", ":"))
+    storage.backend.write_bytes(file, gzip.compress(content.encode("utf-8")))
+    dict_archive_cache[file] = (np.asarray(checked_off, dtype=bool), np.asarray(check_off_dates, dtype=object))
+
+
+class SegmentedHistory:
+    """
+    Check-off history of a habit split into segments of one calendar year:
+    - the hot segment (periods of the running year) is stored in the habit file itself and is the only part that is
+      read and rewritten by check-offs and auto-updates
+    - cold segments (previous years) are immutable compressed archives next to the habit file, listed with their
+      number of periods and check-offs in the habit file. They are only read (lazily, cached) if an analysis
+      needs the single periods.
+    """
+
+    def __init__(self, period, start=None, checked_off=(), check_off_dates=(), archives=(), directory=""):
+        self.period = period
+        self.step_days = periods.period_step(period)
+        # day number of the first period of the hot segment (None as long as the hot segment is empty)
+        self.start_day = periods.as_day(start)
+        self.hot_checked_off = [bool(value) for value in checked_off]
+        # check-off dates in milliseconds since epoch (UTC), None for missed periods
+        self.hot_dates = list(check_off_dates)
+        # archive segments: dictionaries with 'file', 'start_day', 'length' and 'checked_off' (number of check-offs)
+        self.archives = [dict(archive) for archive in archives]
+        # directory of the habit file (archives are stored next to it)
+        self.directory = directory
+        # archived segments not saved yet: position in self.archives -> (check-offs, check-off dates)
+        self.pending = {}
+
+    def __len__(self):
+        return sum(archive["length"] for archive in self.archives) + len(self.hot_checked_off)
+
+    def step(self):
+        """
+        :return: days between two periods (daily: 1, weekly: 7)
+        """
+        return self.step_days
+
+    @property
+    def start(self):
+        """
+        :return: date of the first period (None if there is no period)
+        """
+        if self.archives:
+            return periods.to_date(self.archives[0]["start_day"])
+        return None if self.start_day is None else periods.to_date(self.start_day)
+
+    def last_day(self):
+        """
+        :return: day number of the last period (None if there is no period)
+        """
+        if self.hot_checked_off:
+            return self.start_day + self.step_days * (len(self.hot_checked_off) - 1)
+        if self.archives:
+            return self.archives[-1]["start_day"] + self.step_days * (self.archives[-1]["length"] - 1)
+        return None
+
+    def last_date(self):
+        """
+        :return: date of the last period (None if there is no period)
+        """
+        return None if len(self) == 0 else periods.to_date(self.last_day())
+
+    def segment(self, position):
+        """
+        Check-offs and check-off dates of an archive segment (pending or read from its archive)
+
+        :param position: position of the archive segment
+        :return: tuple (numpy boolean array, numpy object array)
+        """
+        if position in self.pending:
+            checked_off, check_off_dates = self.pending[position]
+            return np.asarray(checked_off, dtype=bool), np.asarray(check_off_dates, dtype=object)
+        return read_archive(os.path.join(self.directory, self.archives[position]["file"]))
+
+    def checked_off(self):
+        """
+        :return: numpy boolean array with one entry per period (True: period has been checked-off)
+        """
+        list_checked_off = [self.segment(position)[0] for position in range(len(self.archives))]
+        return np.concatenate(list_checked_off + [np.asarray(self.hot_checked_off, dtype=bool)])
+
+    def count_checked_off(self):
+        """
+        :return: number of checked-off periods (without reading the archives)
+        """
+        return sum(archive["checked_off"] for archive in self.archives) + sum(self.hot_checked_off)
+
+    def longest_streak(self):
+        """
+        Longest streak (first one if there are several)
+
+        :return: tuple (length of the streak, date of its first period, date of its last period)
+                 - (0, None, None) if no period has been checked-off
+        """
+        max_streak, position = periods.longest_run(self.checked_off())
+        if max_streak == 0:
+            return 0, None, None
+        start_streak = periods.as_day(self.start) + self.step_days * position
+        return max_streak, periods.to_date(start_streak), periods.to_date(start_streak + self.step_days * (max_streak - 1))
+
+    def archive_hot(self):
+        """
+        Moving the hot segment into a new archive segment (saved with the next write())
+
+        :return:
+        """
+        self.archives.append({"file": None, "start_day": self.start_day, "length": len(self.hot_checked_off),
+                              "checked_off": sum(self.hot_checked_off)})
+        self.pending[len(self.archives) - 1] = (self.hot_checked_off, self.hot_dates)
+        self.start_day = None
+        self.hot_checked_off = []
+        self.hot_dates = []
+
+    def append(self, checked_off, check_off_date=None, period_day=None):
+        """
+        Appending the next period to the hot segment. A period of a new year moves the hot segment into the archive.
+
+        :param checked_off: True if the period has been checked-off
+        :param check_off_date: check-off date in milliseconds since 1970-01-01 UTC (only for checked-off periods)
+        :param period_day: day number or date of the period (only needed for the first period)
+        :return:
+        """
+        if len(self) == 0:
+            if period_day is None:
+                raise ValueError("Date of the first period is needed!")
+            period_day = periods.as_day(period_day)
+        else:
+            period_day = self.last_day() + self.step_days
+        if checked_off and check_off_date is None:
+            raise ValueError("Check-off date is needed for checked-off periods!")
+
+        if self.hot_checked_off and periods.to_date(period_day).year != periods.to_date(self.start_day).year:
+            self.archive_hot()
+        if not self.hot_checked_off:
+            self.start_day = period_day
+        self.hot_checked_off.append(bool(checked_off))
+        self.hot_dates.append(int(check_off_date) if checked_off else None)
+
+    def extend(self, df_appended):
+        """
+        Appending periods given in the dataframe layout of the habit file
+
+        :param df_appended: pandas dataframe with the appended periods
+        :return:
+        """
+        if df_appended.empty:
+            return
+        checked_off = (df_appended["Checked-off"] == "Yes").to_numpy()
+        check_off_dates = pd.to_datetime(df_appended["Check-off date"].where(checked_off), utc=True)
+        dates = check_off_dates.dt.tz_localize(None).to_numpy(dtype="datetime64[ms]").astype(np.int64)
+        for period_day, period_checked_off, check_off_date in zip(periods.to_days(df_appended.index).tolist(),
+                                                                  checked_off.tolist(), dates.tolist()):
+            self.append(period_checked_off, check_off_date, period_day)
+
+    @classmethod
+    def from_dataframe(cls, df_habit, period, directory=""):
+        """
+        :param df_habit: pandas dataframe with columns 'Checked-off' and 'Check-off date' and a date index
+        :param period: periodicity of the habit ('D' or '7d')
+        :param directory: directory of the habit file
+        :return: SegmentedHistory
+        """
+        segmented_history = cls(period, directory=directory)
+        segmented_history.extend(df_habit)
+        return segmented_history
+
+    def to_dataframe(self):
+        """
+        :return: pandas dataframe with columns 'Checked-off' and 'Check-off date' and a date index
+        """
+        if len(self) == 0:
+            return pd.DataFrame(columns=["Checked-off", "Check-off date"])
+
+        list_segments = [self.segment(position) for position in range(len(self.archives))]
+        list_segments.append((np.asarray(self.hot_checked_off, dtype=bool), np.asarray(self.hot_dates, dtype=object)))
+        checked_off = np.concatenate([segment[0] for segment in list_segments])
+        check_off_dates = np.full(len(checked_off), np.datetime64("NaT"), dtype="datetime64[ms]")
+        check_off_dates[checked_off] = np.concatenate([segment[1] for segment in list_segments])[checked_off] \
+            .astype(np.int64).astype("datetime64[ms]")
+        first_day = periods.as_day(self.start)
+        return pd.DataFrame({"Checked-off": np.where(checked_off, "Yes", "No").astype(object),
+                             "Check-off date": check_off_dates},
+                            index=periods.to_date_index(first_day + self.step_days * np.arange(len(checked_off))))
+
+    def to_dict(self):
+        """
+        :return: dictionary for serializing the hot segment and the list of archive segments
+        """
+        return {"format": "segmented",
+                "period": self.period,
+                "archives": self.archives,
+                "start_day": self.start_day,
+                "checked_off": [int(value) for value in self.hot_checked_off],
+                "check_off_dates": self.hot_dates}
+
+    @classmethod
+    def from_dict(cls, data, file=""):
+        """
+        :param data: dictionary created by to_dict()
+        :param file: path to the habit file (archives are stored next to it)
+        :return: SegmentedHistory
+        """
+        if data.get("format") != "segmented":
+            raise ValueError("Data is not a segmented habit history!")
+        return cls(data["period"], data["start_day"], data["checked_off"], data["check_off_dates"],
+                   data["archives"], os.path.dirname(file))
+
+    def archive_files(self, file):
+        """
+        :param file: path to the habit file
+        :return: list of paths to the archive segments of the habit
+        """
+        return [os.path.join(os.path.dirname(file), archive["file"]) for archive in self.archives if archive["file"]]
+
+    def write(self, file):
+        """
+        Saving new archive segments (once) and the hot segment to the habit file
+
+        :param file: path to habit file
+        :return:
+        """
+        self.directory = os.path.dirname(file)
+        for position, (checked_off, check_off_dates) in sorted(self.pending.items()):
+            archive = self.archives[position]
+            archive["file"] = f"{os.path.basename(file)[:-5]}_{periods.to_date(archive['start_day']).year}.json.gz"
+            write_archive(os.path.join(self.directory, archive["file"]), archive["start_day"], checked_off,
+                          check_off_dates)
+        self.pending = {}
+
+        storage.backend.write_text(file, json.dumps(self.to_dict(), separators=(",", ":")))
+
+
+def list_archive_files(habit_file):
+    """
+    :param habit_file: path to habit file
+    :return: list of paths to the archive segments of the habit (empty if the habit file isn't segmented)
+    """
+    try:
+        content = storage.backend.read_text(habit_file)
+    except (OSError, UnicodeDecodeError):
+        return []
+    if not content.startswith('{"format":"segmented"'):
+        return []
+    return SegmentedHistory.from_dict(json.loads(content), habit_file).archive_files(habit_file)
+
+
+def remove_archives(list_files):
+    """
+    Removing archive segments (if existing) and dropping them from the cache
+
+    :param list_files: list of paths to archive segments
+    :return:
+    """
+    for file in list_files:
+        dict_archive_cache.pop(file, None)
+        if storage.backend.exists(file):
+            storage.backend.remove(file)
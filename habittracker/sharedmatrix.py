@@ -0,0 +1,234 @@
+"""
+Analysis of many habits by several worker processes without sending the habit data to them:
+the check-offs of all habits are packed into one block of shared memory (multiprocessing.shared_memory) once,
+the workers attach to the block by its name and read the check-offs in place (zero-copy). Only the name of the block,
+the positions of the habits and the date windows are sent to a worker, only numbers are sent back.
+
+Layout of the block:
+- table (int64, one row per habit): byte offset of the check-offs, number of periods, first day, step (days)
+- check-offs of all habits, bit-packed (numpy.packbits), every habit starting at a byte boundary
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta
+from multiprocessing import shared_memory
+import numpy as np
+import pytz
+
+import habittracker.analyze
+import habittracker.habits
+import habittracker.periods
+
+
+# columns of the table of the habits
+COLUMNS_TABLE = 4
+# seconds between two looks at the cancel event while waiting for the workers
+CANCEL_POLL_INTERVAL = 0.05
+
+
+class SharedHabitMatrix:
+    """
+    Check-offs of habits published into shared memory (taken from the history index of the habits).
+    History indexes not built yet are built here, in the calling process: their habit files are read one after another
+    (only the counting is done by the workers).
+    Use as context manager: the shared memory is released when leaving the context.
+    """
+
+    def __init__(self, habit_instances):
+        list_packed = []
+        table = np.zeros((len(habit_instances), COLUMNS_TABLE), dtype=np.int64)
+        offset = 0
+        for number, habit in enumerate(habit_instances):
+            if not isinstance(habit, habittracker.habits.Habit):
+                raise TypeError("Parameter is not of class Habit!")
+            history_index = habit.get_history_index()
+            packed = np.packbits(history_index.checked_off())
+            table[number] = [offset, len(history_index),
+                             -1 if history_index.first_day is None else history_index.first_day, history_index.step]
+            list_packed.append(packed)
+            offset += len(packed)
+
+        self.number_of_habits = len(habit_instances)
+        # shared memory can't be empty
+        self.shared_memory = shared_memory.SharedMemory(create=True, size=max(table.nbytes + offset, 1))
+        view_table, view_bits = attach_arrays(self.shared_memory, self.number_of_habits)
+        view_table[:] = table
+        if list_packed:
+            view_bits[:] = np.concatenate(list_packed)
+        del view_table, view_bits
+
+    @property
+    def name(self):
+        """
+        :return: name of the shared memory (workers attach by this name)
+        """
+        return self.shared_memory.name
+
+    def close(self):
+        """
+        Releasing the shared memory (workers must not attach anymore)
+
+        :return:
+        """
+        self.shared_memory.close()
+        self.shared_memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+def attach_arrays(block, number_of_habits):
+    """
+    numpy arrays on the shared memory (no copy)
+
+    :param block: multiprocessing.shared_memory.SharedMemory
+    :param number_of_habits: number of habits in the block
+    :return: tuple (table of the habits (int64, habits x columns), bit-packed check-offs (uint8))
+    """
+    table = np.ndarray((number_of_habits, COLUMNS_TABLE), dtype=np.int64, buffer=block.buf)
+    bits = np.ndarray((block.size - table.nbytes,), dtype=np.uint8, buffer=block.buf, offset=table.nbytes)
+    return table, bits
+
+
+def analyze_slice(name, number_of_habits, start, end, window_days):
+    """
+    Worker: analyzing the habits start ... end-1 of the shared memory
+
+    :param name: name of the shared memory
+    :param number_of_habits: number of habits in the shared memory
+    :param start: position of the first habit
+    :param end: position after the last habit
+    :param window_days: list of tuples (first day, last day) as day numbers (see analyze.create_windows())
+    :return: list of tuples per habit (number of periods, checked-off periods, longest streak, position of the
+             longest streak, current streak, list of tuples (number of periods, checked-off periods) per window)
+    """
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        table, bits = attach_arrays(block, number_of_habits)
+        list_results = []
+        for byte_offset, length, first_day, step in table[start:end].tolist():
+            checked_off = np.unpackbits(bits[byte_offset:byte_offset + (length + 7) // 8], count=length).astype(bool)
+            # same counting as the history index of the habit
+            history_index = habittracker.habits.HistoryIndex("D" if step == 1 else "7d",
+                                                             None if first_day < 0 else first_day, checked_off)
+            longest_streak, position = habittracker.periods.longest_run(checked_off)
+            list_results.append((length, int(np.count_nonzero(checked_off)), longest_streak, position,
+                                 history_index.current_streak,
+                                 [history_index.count(first, last) for first, last in window_days]))
+        del table, bits
+    finally:
+        block.close()
+    return list_results
+
+
+def create_row(habit, result, windows, current_day=None):
+    """
+    Results of one habit for the analysis, same as analyze.analyze_row()
+
+    :param habit: habit instance
+    :param result: tuple with the results of the worker (see analyze_slice())
+    :param windows: date windows (see analyze.create_windows())
+    :param current_day: reference day for the current streak (default: today)
+    :return: dictionary with the results of the habit
+    """
+    number_of_periods, count_checked_off, longest_streak, position, current_streak, list_windows = result
+    history_index = habit.history_index
+    period_longest_streak = "-"
+    if longest_streak > 0:
+        start_streak = habittracker.periods.to_date(history_index.first_day + history_index.step * position)
+        end_streak = start_streak + timedelta(history_index.step * (longest_streak - 1) +
+                                              (0 if habit.period == "D" else 6))
+        period_longest_streak = f"{start_streak} - {end_streak}"
+    # the current streak is running until the end of the period after the last checked-off period
+    if current_streak > 0:
+        if current_day is None:
+            current_day = datetime.now(pytz.utc).date()
+        end_running_period = habittracker.periods.to_date(history_index.last_day() + 2 * history_index.step - 1)
+        if current_day > end_running_period:
+            current_streak = 0
+
+    results_habit = {"Name": habit.name,
+                     "Specification": habit.spec,
+                     "Periodicity": "daily" if habit.period == "D" else "weekly",
+                     "Created on": habit.created.strftime("%Y-%m-%d"),
+                     "Number of periods": number_of_periods,
+                     "Checked-off periods": count_checked_off,
+                     "Percentage checked-off periods": "0%" if number_of_periods == 0 else
+                     f"{round(count_checked_off / number_of_periods * 100, 2)}%",
+                     "Longest Streak": longest_streak,
+                     "Period Longest Streak": period_longest_streak,
+                     "Current Streak": current_streak}
+    for window, (number_of_window_periods, count_window) in zip(windows, list_windows):
+        results_habit[window] = "-" if number_of_window_periods == 0 else \
+            f"{round(count_window / number_of_window_periods * 100, 2)}%"
+    return results_habit
+
+
+def collect_results(futures, cancelled=None):
+    """
+    Results of the workers in the order of the slices, stopped as soon as the computation is cancelled
+
+    :param futures: list of concurrent.futures.Future (one per slice, see analyze_slice())
+    :param cancelled: threading.Event - set if the result isn't needed anymore (default: not cancellable)
+    :return: list of the results of all habits - None if cancelled
+    """
+    list_results = []
+    for future in futures:
+        while True:
+            if cancelled is not None and cancelled.is_set():
+                return None
+            try:
+                list_results += future.result(timeout=None if cancelled is None else CANCEL_POLL_INTERVAL)
+                break
+            except FutureTimeoutError:
+                continue
+    return list_results
+
+
+def request_analysis(habit_instances, current_day=None, processes=None, cancelled=None):
+    """
+    Creating the pandas dataframe for analysis (same as analyze.request_analysis()) with worker processes
+    reading the check-offs from shared memory
+
+    :param habit_instances: List of existing habit instances
+    :param current_day: reference day for the date windows (default: today)
+    :param processes: number of worker processes (default: number of CPUs)
+    :param cancelled: threading.Event - set if the result isn't needed anymore (default: not cancellable)
+    :return: pandas dataframe for analyzing existing habits - None if cancelled
+    """
+    windows = habittracker.analyze.create_windows(current_day)
+    window_days = [(habittracker.periods.as_day(start), habittracker.periods.as_day(end))
+                   for start, end in windows.values()]
+    habit_instances = list(habit_instances)
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    # history indexes are built before the shared memory: a cancelled computation stops between two habit files
+    for habit in habit_instances:
+        if cancelled is not None and cancelled.is_set():
+            return None
+        habit.get_history_index()
+
+    with SharedHabitMatrix(habit_instances) as habit_matrix:
+        # a few slices per worker, so workers finishing early take over the remaining habits
+        number_of_slices = min(len(habit_instances), 4 * processes)
+        bounds = np.linspace(0, len(habit_instances), number_of_slices + 1).astype(int).tolist()
+        executor = ProcessPoolExecutor(max_workers=processes)
+        list_results = None
+        try:
+            futures = [executor.submit(analyze_slice, habit_matrix.name, len(habit_instances), start, end,
+                                       window_days)
+                       for start, end in zip(bounds[:-1], bounds[1:])]
+            list_results = collect_results(futures, cancelled)
+        finally:
+            # cancelled: slices not started are dropped and the running ones aren't waited for
+            executor.shutdown(wait=list_results is not None, cancel_futures=True)
+    if list_results is None:
+        return None
+
+    list_rows = [create_row(habit, result, windows, current_day)
+                 for habit, result in zip(habit_instances, list_results)]
+    return habittracker.analyze.create_analysis_dataframe(list_rows, windows)
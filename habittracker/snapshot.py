@@ -0,0 +1,155 @@
+import json
+import zlib
+import struct
+import numpy as np
+import pandas as pd
+
+from habittracker import habits
+from habittracker import history
+from habittracker import scheduler
+from habittracker import storage
+from habittracker import tombstones
+
+
+# snapshot file: header followed by the payload
+# header: magic, version, CRC-32 checksum of the payload, length of the payload
+# payload: length of the metadata, metadata (.json: overview and habits), packed check-offs of all habits
+MAGIC = b"HSNP"
+VERSION = 1
+HEADER = struct.Struct("<4sHxxIQ")
+LENGTH_METADATA = struct.Struct("<I")
+
+
+def snapshot_file(path_habit_overview):
+    """
+    Path of the snapshot, stored next to the habit overview
+
+    :param path_habit_overview: path to .json-habit-overview-file
+    :return: path to snapshot file (string)
+    """
+    return f"{path_habit_overview[:-5]}.snapshot"
+
+
+def file_state(file):
+    """
+    :param file: path to file
+    :return: tuple (modification time in nanoseconds, size in bytes) - (None, None) if the file doesn't exist
+    """
+    try:
+        return storage.backend.stat(file)
+    except OSError:
+        return None, None
+
+
+def write_snapshot(path_habit_overview, habit_instances):
+    """
+    Checkpoint: writing the in-memory state (habit overview and check-offs of every habit as kept in its
+    history index) into one snapshot file. Habit files and overview are recorded with their modification time
+    and size, so the snapshot can be validated on the next start.
+
+    :param path_habit_overview: path to .json-habit-overview-file
+    :param habit_instances: List of existing habit instances
+    :return: Status (string)
+    """
+    mtime_overview, size_overview = file_state(path_habit_overview)
+    mtime_tombstones, size_tombstones = file_state(tombstones.tombstone_file(path_habit_overview))
+    list_habits = []
+    list_bits = []
+    offset = 0
+    for habit in habit_instances:
+        history_index = habit.get_history_index()
+        mtime_habit, size_habit = file_state(habit.file)
+        bits = np.packbits(history_index.checked_off()).tobytes()
+        list_habits.append({"Name": habit.name,
+                            "Specification": habit.spec,
+                            "Periodicity": habit.period,
+                            "Created on": pd.Timestamp(habit.created).isoformat(),
+                            "File Directory": habit.file,
+                            "mtime": mtime_habit,
+                            "size": size_habit,
+                            "format": history.detect_format(habit.file),
+                            "first_day": history_index.first_day,
+                            "length": len(history_index),
+                            "offset": offset})
+        list_bits.append(bits)
+        offset += len(bits)
+
+    metadata = json.dumps({"overview": {"mtime": mtime_overview, "size": size_overview},
+                           "tombstones": {"mtime": mtime_tombstones, "size": size_tombstones},
+                           "habits": list_habits}, separators=(",", ":")).encode("utf-8")
+    payload = LENGTH_METADATA.pack(len(metadata)) + metadata + b"".join(list_bits)
+
+    # the snapshot is replaced at once, so there's never a partly written snapshot
+    file_temporary = f"{snapshot_file(path_habit_overview)}.tmp"
+    content = HEADER.pack(MAGIC, VERSION, zlib.crc32(payload), len(payload)) + payload
+    storage.backend.write_bytes(file_temporary, content)
+    storage.backend.replace(file_temporary, snapshot_file(path_habit_overview))
+
+    status = f"Snapshot of {len(list_habits)} habits saved."
+    return status
+
+
+def read_snapshot(path_habit_overview):
+    """
+    Reading the snapshot in one read and validating version and checksum
+
+    :param path_habit_overview: path to .json-habit-overview-file
+    :return: tuple (metadata (dictionary), packed check-offs (bytes)) - None if there's no valid snapshot
+    """
+    try:
+        content = storage.backend.read_bytes(snapshot_file(path_habit_overview))
+    except OSError:
+        return None
+
+    if len(content) < HEADER.size:
+        return None
+    magic, version, checksum, length_payload = HEADER.unpack_from(content)
+    payload = content[HEADER.size:]
+    if magic != MAGIC or version != VERSION or len(payload) != length_payload or zlib.crc32(payload) != checksum:
+        return None
+
+    length_metadata = LENGTH_METADATA.unpack_from(payload)[0]
+    metadata = json.loads(payload[LENGTH_METADATA.size:LENGTH_METADATA.size + length_metadata].decode("utf-8"))
+    return metadata, payload[LENGTH_METADATA.size + length_metadata:]
+
+
+def load_snapshot(path_habit_overview):
+    """
+    Re-instantiating the habits from the snapshot (replaces reading the habit overview and every habit file).
+    The snapshot is only used if the habit overview and the tombstones haven't changed since the checkpoint. Habits whose files
+    have changed (or whose missed periods are derived from the current day) are restored without index and
+    read from their habit file as usual.
+
+    :param path_habit_overview: path to .json-habit-overview-file
+    :return: Status (string) - None if the snapshot can't be used (habits need to be re-instantiated from files)
+    """
+    snapshot = read_snapshot(path_habit_overview)
+    if snapshot is None:
+        return None
+    metadata, bits = snapshot
+    if list(file_state(path_habit_overview)) != [metadata["overview"]["mtime"], metadata["overview"]["size"]]:
+        return None
+    # habits deleted since the checkpoint (tombstones) would be restored otherwise
+    if list(file_state(tombstones.tombstone_file(path_habit_overview))) != \
+            [metadata["tombstones"]["mtime"], metadata["tombstones"]["size"]]:
+        return None
+
+    number_restored = 0
+    for entry in metadata["habits"]:
+        habit = habits.Habit(entry["Name"], entry["Specification"], entry["Periodicity"], entry["File Directory"],
+                             pd.Timestamp(entry["Created on"]))
+        if list(file_state(habit.file)) == [entry["mtime"], entry["size"]] and entry["format"] != "sparse":
+            # habit file unchanged: the history index is restored from the snapshot
+            packed = np.frombuffer(bits, dtype=np.uint8, count=(entry["length"] + 7) // 8, offset=entry["offset"])
+            habit.history_index = habits.HistoryIndex(habit.period, entry["first_day"],
+                                                      np.unpackbits(packed, count=entry["length"]).astype(bool))
+            number_restored += 1
+
+    # scheduling the auto-updates: deadlines of restored habits are derived from their history index,
+    # only habits with changed files are read
+    habits.auto_update_scheduler = scheduler.AutoUpdateScheduler(habits.list_habit_instances)
+    for status_called_function in habits.run_due_auto_updates():
+        print(status_called_function)
+
+    status = f"Re-instantiated {len(metadata['habits'])} habits ({number_restored} from snapshot)."
+    return status
@@ -0,0 +1,403 @@
+import os
+import mmap
+import time
+import zlib
+import threading
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:
+    # no advisory file locks available (Windows): locks only apply within the process
+    fcntl = None
+
+
+# lock file of a directory: every locked file of the directory is assigned to one byte of it (byte-range locks),
+# so locks of different files don't block each other
+LOCK_FILE = ".habittracker.lock"
+# number of bytes (lock slots) per lock file
+LOCK_SLOTS = 1 << 20
+
+
+class LockTable:
+    """
+    Exclusive locks of files for threads and processes:
+    within the process a reentrant thread lock per lock slot, across processes an advisory fcntl byte-range lock
+    on the lock file of the directory (taken by the outermost acquire of the process only, because fcntl locks
+    belong to the process and would be released by any nested release).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # lock slot -> [reentrant thread lock, depth of the process-wide acquisition]
+        self.dict_slots = {}
+        # directory -> file descriptor of the lock file (kept open, closing it would release all locks on it)
+        self.dict_descriptors = {}
+
+    def slot(self, path):
+        """
+        :param path: path to file
+        :return: tuple (directory, byte offset within the lock file)
+        """
+        path = os.path.abspath(path)
+        return os.path.dirname(path), zlib.crc32(path.encode("utf-8")) % LOCK_SLOTS
+
+    def descriptor(self, directory):
+        """
+        :param directory: directory of the locked file
+        :return: file descriptor of the lock file of the directory
+        """
+        with self.lock:
+            if directory not in self.dict_descriptors:
+                self.dict_descriptors[directory] = os.open(os.path.join(directory, LOCK_FILE),
+                                                           os.O_RDWR | os.O_CREAT, 0o644)
+            return self.dict_descriptors[directory]
+
+    @contextmanager
+    def acquire(self, path):
+        """
+        Context manager holding the exclusive lock of a file
+
+        :param path: path to file
+        """
+        directory, offset = self.slot(path)
+        with self.lock:
+            entry = self.dict_slots.setdefault((directory, offset), [threading.RLock(), 0])
+        with entry[0]:
+            entry[1] += 1
+            try:
+                if entry[1] == 1 and fcntl is not None:
+                    fcntl.lockf(self.descriptor(directory), fcntl.LOCK_EX, 1, offset, os.SEEK_SET)
+                yield
+            finally:
+                entry[1] -= 1
+                if entry[1] == 0 and fcntl is not None:
+                    fcntl.lockf(self.descriptor(directory), fcntl.LOCK_UN, 1, offset, os.SEEK_SET)
+
+
+def sync_directory(directory):
+    """
+    Flushing a directory to disk, so a file renamed into it survives a crash (not possible on Windows)
+
+    :param directory: path to directory ('' - current directory)
+    :return:
+    """
+    if os.name != "posix":
+        return
+    descriptor = os.open(directory or ".", os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+class FileBackend:
+    """
+    Storage backend for the files of the habit tracker on disk (default).
+    Every file access of the habit tracker (habit files, habit overview, rollups, archives, snapshot, logs)
+    goes through a storage backend with these methods, so other backends can be dropped in.
+    Files are replaced at once when written (temporary file and rename), so readers never see a partly written file.
+    Written files are flushed to disk (fsync of the file and its directory), so they survive a crash once written.
+    Read-modify-write sequences hold the lock of the file (lock()), which is safe for several processes.
+    """
+
+    def __init__(self):
+        self.locks = LockTable()
+        # absolute path -> (modification time in nanoseconds, size) after the last write of this process,
+        # so changes of the files by other programs can be told apart from own writes (see watcher.py)
+        self.dict_written = {}
+
+    def lock(self, path):
+        """
+        Exclusive advisory lock of a file (threads and processes), held while the context is active.
+        Locks are reentrant within a thread.
+
+        :param path: path to file
+        :return: context manager
+        """
+        return self.locks.acquire(path)
+
+    def temporary_file(self, path):
+        """
+        :param path: path to file
+        :return: path to a temporary file next to the file (unique per process and thread)
+        """
+        return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def exists(self, path):
+        """
+        :param path: path to file
+        :return: True if the file exists
+        """
+        return os.path.exists(path)
+
+    def read_bytes(self, path):
+        """
+        :param path: path to file
+        :return: content of the file (bytes)
+        """
+        with open(path, "rb") as file:
+            return file.read()
+
+    def read_text(self, path):
+        """
+        :param path: path to file
+        :return: content of the file (string)
+        """
+        with open(path, "r") as file:
+            return file.read()
+
+    def read_prefix(self, path, size):
+        """
+        :param path: path to file
+        :param size: number of bytes
+        :return: first bytes of the file (without reading the whole file)
+        """
+        with open(path, "rb") as file:
+            return file.read(size)
+
+    def map(self, path):
+        """
+        Read-only view of the content of a file (memory mapping, pages are only read if accessed)
+
+        :param path: path to file
+        :return: buffer (mmap)
+        """
+        with open(path, "rb") as file:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def write_bytes(self, path, content):
+        """
+        Writing a file: the content is written to a temporary file which replaces the file at once
+
+        :param path: path to file
+        :param content: bytes
+        :return:
+        """
+        file_temporary = self.temporary_file(path)
+        try:
+            with open(file_temporary, "wb") as file:
+                file.write(content)
+                # the content is on disk before the file is replaced (e.g. before a checkpoint removes the log)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(file_temporary, path)
+        except OSError:
+            if os.path.exists(file_temporary):
+                os.remove(file_temporary)
+            raise
+        sync_directory(os.path.dirname(path))
+        self.record_written(path)
+
+    def write_text(self, path, content):
+        """
+        Writing a file: the content is written to a temporary file which replaces the file at once
+
+        :param path: path to file
+        :param content: string
+        :return:
+        """
+        self.write_bytes(path, content.encode("utf-8"))
+
+    def write_ranges(self, path, list_ranges):
+        """
+        Overwriting parts of an existing file in place (in the given order - the caller needs to hold the lock)
+
+        :param path: path to file
+        :param list_ranges: list of tuples (byte offset, bytes)
+        :return:
+        """
+        with open(path, "r+b") as file:
+            for offset, content in list_ranges:
+                file.seek(offset)
+                file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        self.record_written(path)
+
+    def append_text(self, path, content, sync=False):
+        """
+        Appending to a file (created if not existing)
+
+        :param path: path to file
+        :param content: string
+        :param sync: True: the file is flushed to disk before returning (durable append)
+        :return:
+        """
+        with open(path, "a") as file:
+            file.write(content)
+            if sync:
+                file.flush()
+                os.fsync(file.fileno())
+        self.record_written(path)
+
+    def remove(self, path):
+        """
+        :param path: path to file (OSError if not existing)
+        :return:
+        """
+        os.remove(path)
+        self.dict_written.pop(os.path.abspath(path), None)
+
+    def replace(self, source, destination):
+        """
+        Renaming a file, an existing destination is replaced at once
+
+        :param source: path to file
+        :param destination: path to file
+        :return:
+        """
+        os.replace(source, destination)
+        sync_directory(os.path.dirname(destination))
+        self.record_written(destination)
+
+    def make_directories(self, directory):
+        """
+        Creating a directory including missing parent directories (nothing to do if it exists)
+
+        :param directory: path to directory
+        :return:
+        """
+        os.makedirs(directory, exist_ok=True)
+
+    def stat(self, path):
+        """
+        :param path: path to file (OSError if not existing)
+        :return: tuple (modification time in nanoseconds, size in bytes)
+        """
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def list_directory(self, directory):
+        """
+        :param directory: path to directory ('' - current directory)
+        :return: list of the names of the files in the directory (empty if not existing)
+        """
+        try:
+            return os.listdir(directory or ".")
+        except FileNotFoundError:
+            return []
+
+    def record_written(self, path):
+        """
+        Remembering the state of a file written by this process
+
+        :param path: path to file
+        :return:
+        """
+        try:
+            self.dict_written[os.path.abspath(path)] = self.stat(path)
+        except OSError:
+            # removed meanwhile: the next change is regarded as external
+            self.dict_written.pop(os.path.abspath(path), None)
+
+    def written_state(self, path):
+        """
+        :param path: path to file
+        :return: tuple (modification time in nanoseconds, size) after the last write of this process
+                 (None if not written by this process)
+        """
+        return self.dict_written.get(os.path.abspath(path))
+
+
+class MemoryBackend(FileBackend):
+    """
+    Storage backend keeping all files in memory (e.g. for tests and benchmarks without disk I/O).
+    Paths are only used as keys, no directories are needed.
+    """
+
+    def __init__(self):
+        # path -> content (bytes)
+        self.dict_files = {}
+        # path -> modification time in nanoseconds
+        self.dict_mtimes = {}
+        self.lock_files = threading.Lock()
+        # path -> reentrant lock of the file
+        self.dict_locks = {}
+
+    def lock(self, path):
+        with self.lock_files:
+            return self.dict_locks.setdefault(path, threading.RLock())
+
+    def touch(self, path, content):
+        """
+        Saving the content of a file and updating its modification time (strictly increasing)
+
+        :param path: path to file
+        :param content: bytes
+        :return:
+        """
+        mtime = time.time_ns()
+        if path in self.dict_mtimes and mtime <= self.dict_mtimes[path]:
+            mtime = self.dict_mtimes[path] + 1
+        self.dict_files[path] = bytes(content)
+        self.dict_mtimes[path] = mtime
+
+    def exists(self, path):
+        return path in self.dict_files
+
+    def read_bytes(self, path):
+        try:
+            return self.dict_files[path]
+        except KeyError:
+            raise FileNotFoundError(f"No such file: '{path}'")
+
+    def read_text(self, path):
+        return self.read_bytes(path).decode("utf-8")
+
+    def read_prefix(self, path, size):
+        return self.read_bytes(path)[:size]
+
+    def map(self, path):
+        return memoryview(self.read_bytes(path))
+
+    def write_bytes(self, path, content):
+        with self.lock_files:
+            self.touch(path, content)
+
+    def write_text(self, path, content):
+        self.write_bytes(path, content.encode("utf-8"))
+
+    def write_ranges(self, path, list_ranges):
+        with self.lock_files:
+            content = bytearray(self.read_bytes(path))
+            for offset, part in list_ranges:
+                content[offset:offset + len(part)] = part
+            self.touch(path, content)
+
+    def append_text(self, path, content, sync=False):
+        with self.lock_files:
+            self.touch(path, self.dict_files.get(path, b"") + content.encode("utf-8"))
+
+    def remove(self, path):
+        with self.lock_files:
+            self.read_bytes(path)
+            del self.dict_files[path]
+            del self.dict_mtimes[path]
+
+    def replace(self, source, destination):
+        with self.lock_files:
+            content = self.read_bytes(source)
+            del self.dict_files[source]
+            del self.dict_mtimes[source]
+            self.touch(destination, content)
+
+    def make_directories(self, directory):
+        pass
+
+    def stat(self, path):
+        content = self.read_bytes(path)
+        return self.dict_mtimes[path], len(content)
+
+    def list_directory(self, directory):
+        return [os.path.basename(path) for path in self.dict_files if os.path.dirname(path) == directory]
+
+    def written_state(self, path):
+        # files in memory can only be written by this process
+        try:
+            return self.stat(path)
+        except FileNotFoundError:
+            return None
+
+
+# storage backend used for all files of the habit tracker (FileBackend: files on disk, MemoryBackend: in memory)
+backend = FileBackend()
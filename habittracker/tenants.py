@@ -0,0 +1,167 @@
+"""
+Multi-tenant storage layout: several users of one machine keep their habits apart.
+Every tenant has its own habit overview and directory of habit files below the directory of documents:
+
+    docs\\tenants\\registry.json                                  (registry of all tenants)
+    docs\\tenants\\<shard>\\<shard>\\<tenant>\\habits_overview.json   (habit overview of the tenant)
+    docs\\tenants\\<shard>\\<shard>\\<tenant>\\habits\\<shard>\\...     (habit files of the tenant)
+
+The shards are taken from a hash of the tenant / habit file name, so no directory grows beyond a bounded size
+(256 entries per shard level). The registry keeps the directory and the number of habits of every tenant, so the
+main menu never needs to list a directory.
+
+The tenant is chosen with "Tenant" in the config.txt ('off': single user with the paths of the config.txt,
+'user': login name, any other value: name of the tenant) - the environment variable HABITTRACKER_TENANT overrides it.
+"""
+import os
+import re
+import json
+import getpass
+import hashlib
+
+from habittracker import storage
+
+
+# name of the directory of all tenants (below the directory of documents) and of the registry file within it
+DIRECTORY_TENANTS = "tenants"
+REGISTRY_FILE = "registry.json"
+# environment variable overriding the tenant of the config.txt
+ENVIRONMENT_TENANT = "HABITTRACKER_TENANT"
+# valid names of tenants (used as directory names)
+PATTERN_TENANT = re.compile(r"[A-Za-z0-9_-][A-Za-z0-9_.-]{0,63}")
+
+# active tenant: tuple (path to registry file, name of the tenant) - None: single user (no registry)
+current_tenant = None
+
+
+def select_tenant(config_data):
+    """
+    :param config_data: dictionary with config data from config.txt (see main.read_config_data())
+    :return: name of the tenant - None for a single user
+    """
+    tenant = os.environ.get(ENVIRONMENT_TENANT) or config_data.get("Tenant", "off")
+    if tenant == "off":
+        return None
+    if tenant == "user":
+        tenant = getpass.getuser()
+    if not PATTERN_TENANT.fullmatch(tenant):
+        raise ValueError(f"Invalid name of tenant '{tenant}'!")
+    return tenant
+
+
+def shard(key, levels=1):
+    """
+    Shard directories of a key: the first bytes of its hash (two hex digits per level)
+
+    :param key: name of tenant or habit file
+    :param levels: number of shard levels (256 directories per level)
+    :return: list of directory names
+    """
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return [digest[2 * level:2 * level + 2] for level in range(levels)]
+
+
+def tenant_directory(tenant):
+    """
+    :param tenant: name of the tenant
+    :return: directory of the tenant relative to the directory of all tenants
+    """
+    return os.path.join(*shard(tenant, 2), tenant)
+
+
+def registry_file(directory_documents):
+    """
+    :param directory_documents: directory of documents (see config.txt)
+    :return: path to registry file
+    """
+    return os.path.join(directory_documents, DIRECTORY_TENANTS, REGISTRY_FILE)
+
+
+def read_registry(path_registry):
+    """
+    :param path_registry: path to registry file
+    :return: dictionary tenant -> {'directory': directory relative to the registry, 'habits': number of habits}
+    """
+    try:
+        return json.loads(storage.backend.read_text(path_registry))
+    except FileNotFoundError:
+        return {}
+
+
+def write_registry(path_registry, dict_registry):
+    """
+    :param path_registry: path to registry file
+    :param dict_registry: dictionary (see read_registry())
+    :return:
+    """
+    storage.backend.write_text(path_registry, json.dumps(dict_registry, indent=1, sort_keys=True))
+
+
+def register_tenant(path_registry, tenant):
+    """
+    Adding a tenant to the registry (if not registered yet) and creating its directories
+
+    :param path_registry: path to registry file
+    :param tenant: name of the tenant
+    :return: tuple (path to habit overview of the tenant, directory of habit files of the tenant)
+    """
+    directory_tenants = os.path.dirname(path_registry)
+    storage.backend.make_directories(directory_tenants)
+    # the registry is locked from reading to saving (other tenants starting at the same time)
+    with storage.backend.lock(path_registry):
+        dict_registry = read_registry(path_registry)
+        if tenant not in dict_registry:
+            dict_registry[tenant] = {"directory": tenant_directory(tenant), "habits": 0}
+            write_registry(path_registry, dict_registry)
+    directory_tenant = os.path.join(directory_tenants, dict_registry[tenant]["directory"])
+    directory_habit_files = os.path.join(directory_tenant, "habits")
+    storage.backend.make_directories(directory_habit_files)
+    return os.path.join(directory_tenant, "habits_overview.json"), directory_habit_files
+
+
+def habit_file(directory_habit_files, name):
+    """
+    Path to the habit file of a new habit: sharded by the file name for tenants (the shard directory is created),
+    directly within the directory of habit files for a single user
+
+    :param directory_habit_files: (absolute) directory of habit files
+    :param name: name of the habit
+    :return: path to habit file
+    """
+    file_name = f"{name.replace(' ', '_').lower()}.json"
+    if current_tenant is None:
+        return f"{directory_habit_files}\\{file_name}"
+    directory = os.path.join(directory_habit_files, *shard(file_name))
+    storage.backend.make_directories(directory)
+    return os.path.join(directory, file_name)
+
+
+def habit_count():
+    """
+    :return: number of habits of the active tenant according to the registry - None for a single user
+    """
+    if current_tenant is None:
+        return None
+    path_registry, tenant = current_tenant
+    return read_registry(path_registry).get(tenant, {}).get("habits", 0)
+
+
+def update_habit_count(change=0, number_of_habits=None):
+    """
+    Updating the number of habits of the active tenant in the registry (nothing to do for a single user)
+
+    :param change: number of created (positive) or deleted (negative) habits
+    :param number_of_habits: number of habits replacing the registered one (e.g. after re-instantiating)
+    :return:
+    """
+    if current_tenant is None:
+        return
+    path_registry, tenant = current_tenant
+    with storage.backend.lock(path_registry):
+        dict_registry = read_registry(path_registry)
+        entry = dict_registry.setdefault(tenant, {"directory": tenant_directory(tenant), "habits": 0})
+        new_count = entry["habits"] + change if number_of_habits is None else number_of_habits
+        if new_count == entry["habits"]:
+            return
+        entry["habits"] = max(new_count, 0)
+        write_registry(path_registry, dict_registry)
@@ -0,0 +1,161 @@
+import json
+import threading
+import pandas as pd
+
+from habittracker import codec
+from habittracker import rollups
+from habittracker import segments
+from habittracker import storage
+
+
+# running background compaction (threading.Thread) - None if no compaction has been started
+thread_compaction = None
+
+
+def tombstone_file(path_habit_overview):
+    """
+    Path of the tombstone file, stored next to the habit overview
+
+    :param path_habit_overview: path to .json-habit-overview-file
+    :return: path to tombstone file (string)
+    """
+    return f"{path_habit_overview[:-5]}.tombstones"
+
+
+def add_tombstones(path_habit_overview, list_removed):
+    """
+    Marking habits as deleted: one tombstone record (one line .json) per habit is appended to the tombstone file.
+    All tombstones are written with one write and flushed to disk, the habit overview isn't touched.
+
+    :param path_habit_overview: path to .json-habit-overview-file
+    :param list_removed: list of tuples (name of the habit, path to habit file)
+    :return:
+    """
+    if not list_removed:
+        return
+    content = "".join(json.dumps({"Name": name, "File Directory": file}, separators=(",", ":")) + "\n"
+                      for name, file in list_removed)
+    with storage.backend.lock(path_habit_overview):
+        storage.backend.append_text(tombstone_file(path_habit_overview), content, sync=True)
+
+
+def read_tombstones(path_habit_overview):
+    """
+    Reading the tombstone records - an incomplete last record (torn write) is ignored
+
+    :param path_habit_overview: path to .json-habit-overview-file
+    :return: list of tuples (name of the habit, path to habit file)
+    """
+    try:
+        content = storage.backend.read_text(tombstone_file(path_habit_overview))
+    except OSError:
+        return []
+
+    list_tombstones = []
+    for line in content.splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            break
+        list_tombstones.append((record["Name"], record["File Directory"]))
+    return list_tombstones
+
+
+def mask_tombstones(df_overview, list_tombstones):
+    """
+    :param df_overview: pandas dataframe of the habit overview
+    :param list_tombstones: list of tuples (name of the habit, path to habit file)
+    :return: numpy boolean array (True: entry of the habit overview has been deleted)
+    """
+    keys = pd.MultiIndex.from_frame(df_overview[["Name", "File Directory"]].astype(str))
+    return keys.isin(list_tombstones)
+
+
+def skip_tombstones(path_habit_overview, df_overview):
+    """
+    Dropping the deleted habits (tombstones not compacted yet) from the habit overview as read from the file
+
+    :param path_habit_overview: path to .json-habit-overview-file
+    :param df_overview: pandas dataframe of the habit overview
+    :return: pandas dataframe without deleted habits
+    """
+    list_tombstones = read_tombstones(path_habit_overview)
+    if not list_tombstones or df_overview.empty:
+        return df_overview
+    return df_overview[~mask_tombstones(df_overview, list_tombstones)].reset_index(drop=True)
+
+
+def is_tombstoned(path_habit_overview, habit_file):
+    """
+    :param path_habit_overview: path to .json-habit-overview-file
+    :param habit_file: path to habit file
+    :return: True if a deleted habit with this habit file hasn't been compacted yet
+    """
+    return any(file == habit_file for _, file in read_tombstones(path_habit_overview))
+
+
+def compact(path_habit_overview, list_protected_files=()):
+    """
+    Compaction: the habit overview is rewritten once without the deleted habits, the orphaned files of the deleted
+    habits (habit file, materialized rollups, archive segments) are removed and the tombstone file is emptied.
+    Files of existing habits are never removed, even if a deleted habit used the same habit file.
+
+    :param path_habit_overview: path to .json-habit-overview-file
+    :param list_protected_files: list of paths to habit files in use (e.g. of the current habit instances)
+    :return: Status (string)
+    """
+    with storage.backend.lock(path_habit_overview):
+        list_tombstones = read_tombstones(path_habit_overview)
+        if not list_tombstones:
+            return "Compaction: nothing to do."
+
+        set_protected_files = set(list_protected_files)
+        if storage.backend.exists(path_habit_overview):
+            df_overview = codec.read_overview(path_habit_overview)
+            mask_deleted = mask_tombstones(df_overview, list_tombstones)
+            if mask_deleted.any():
+                df_overview = df_overview[~mask_deleted].reset_index(drop=True)
+                codec.write_overview(path_habit_overview, df_overview)
+            set_protected_files.update(df_overview["File Directory"].astype(str).tolist())
+
+        number_removed = 0
+        for habit_file in sorted({file for _, file in list_tombstones} - set_protected_files):
+            with storage.backend.lock(habit_file):
+                segments.remove_archives(segments.list_archive_files(habit_file))
+                rollups.remove_rollups(habit_file)
+                if storage.backend.exists(habit_file):
+                    storage.backend.remove(habit_file)
+                    number_removed += 1
+
+        # tombstones are only dropped after the overview and the files have been cleaned up
+        storage.backend.write_text(tombstone_file(path_habit_overview), "")
+
+    status = f"Compaction: {len(list_tombstones)} deleted habits, {number_removed} habit files removed."
+    return status
+
+
+def start_compaction(path_habit_overview, list_protected_files=()):
+    """
+    Running the compaction in a background thread (if not already running)
+
+    :param path_habit_overview: path to .json-habit-overview-file
+    :param list_protected_files: list of paths to habit files in use (e.g. of the current habit instances)
+    :return: threading.Thread running the compaction
+    """
+    global thread_compaction
+
+    if thread_compaction is None or not thread_compaction.is_alive():
+        thread_compaction = threading.Thread(target=compact, args=(path_habit_overview, list(list_protected_files)),
+                                             name="habittracker-compaction", daemon=True)
+        thread_compaction.start()
+    return thread_compaction
+
+
+def wait_for_compaction():
+    """
+    Waiting until a running background compaction has finished (e.g. before quitting)
+
+    :return:
+    """
+    if thread_compaction is not None:
+        thread_compaction.join()
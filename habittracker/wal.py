@@ -0,0 +1,365 @@
+import os
+import json
+import zlib
+import threading
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+from habittracker import codec
+from habittracker import history
+from habittracker import periods
+from habittracker import storage
+
+
+def log_file(path_habit_overview, pid=None):
+    """
+    Path of the write-ahead log of a process, stored next to the habit overview.
+    Every process (app, daemon, cron) logs to its own file, so no process empties the log of another one.
+
+    :param path_habit_overview: path to .json-habit-overview-file
+    :param pid: process id (default: current process)
+    :return: path to log file (string)
+    """
+    return f"{path_habit_overview[:-5]}.{os.getpid() if pid is None else pid}.wal"
+
+
+def list_log_files(path_habit_overview):
+    """
+    Logs of all processes next to the habit overview
+
+    :param path_habit_overview: path to .json-habit-overview-file
+    :return: list of tuples (path to log file, process id - None for the log of older versions shared by all processes)
+    """
+    directory, name_overview = os.path.split(path_habit_overview)
+    prefix = name_overview[:-5]
+    list_logs = []
+    for name in storage.backend.list_directory(directory):
+        if name == f"{prefix}.wal":
+            list_logs.append((os.path.join(directory, name), None))
+        elif name.startswith(f"{prefix}.") and name.endswith(".wal") and name[len(prefix) + 1:-4].isdigit():
+            list_logs.append((os.path.join(directory, name), int(name[len(prefix) + 1:-4])))
+    return sorted(list_logs, key=lambda log: log[0])
+
+
+def process_running(pid):
+    """
+    :param pid: process id
+    :return: True if the process is still running (its log must not be replayed by another process)
+    """
+    if pid == os.getpid():
+        return True
+    if os.name != "posix":
+        # without locks across processes (see storage.py) only one process uses the habits at a time:
+        # logs of other processes are left over
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # running process of another user
+        return True
+    return True
+
+
+def encode_record(record):
+    """
+    Encoding a log record as one line: CRC-32 checksum (hex) and the record (.json)
+
+    :param record: dictionary
+    :return: string
+    """
+    payload = json.dumps(record, separators=(",", ":"))
+    return f"{zlib.crc32(payload.encode('utf-8')):08x} {payload}\n"
+
+
+def decode_records(content):
+    """
+    Decoding the log records - reading stops at the first incomplete or damaged record (torn write)
+
+    :param content: content of the log file (string)
+    :return: list of dictionaries
+    """
+    list_records = []
+    for line in content.split("\n"):
+        checksum, _, payload = line.partition(" ")
+        if not payload or f"{zlib.crc32(payload.encode('utf-8')):08x}" != checksum:
+            break
+        list_records.append(json.loads(payload))
+    return list_records
+
+
+def rows_from_dataframe(df_appended):
+    """
+    :param df_appended: pandas dataframe with the appended periods (layout of the habit file)
+    :return: list of rows [day number, 1 (checked-off) / 0 (missed), check-off date in milliseconds or None]
+    """
+    checked_off = (df_appended["Checked-off"] == "Yes").tolist()
+    return [[day, int(value), history.to_milliseconds(check_off_date) if value else None]
+            for day, value, check_off_date in zip(periods.to_days(df_appended.index).tolist(), checked_off,
+                                                  df_appended["Check-off date"])]
+
+
+def dataframe_from_rows(rows):
+    """
+    :param rows: list of rows (see rows_from_dataframe())
+    :return: pandas dataframe with the appended periods (layout of the habit file)
+    """
+    days = np.array([row[0] for row in rows], dtype=np.int64)
+    return pd.DataFrame({"Checked-off": ["Yes" if row[1] else "No" for row in rows],
+                         "Check-off date": pd.to_datetime([row[2] for row in rows], unit="ms", utc=True)},
+                        index=periods.to_date_index(days))
+
+
+def merge_rows(habit_file, period, rows):
+    """
+    Folding logged periods into the current content of a habit file (read-modify-write under the lock of the file).
+    The habit file may have been changed by other processes since the periods were logged: periods after its last
+    period are appended, periods it already contains are kept - unless the logged period has been checked-off and the
+    stored one is missed (e.g. auto-updated by another process while the check-off was only logged): a check-off wins.
+    The caller has to make sure the habit file isn't served from history.dict_unsaved_histories.
+
+    :param habit_file: path to habit file
+    :param period: periodicity of the habit ('D' or '7d')
+    :param rows: list of logged rows in the order of the periods (see rows_from_dataframe())
+    :return: history object as saved - None if the habit file doesn't exist anymore
+    """
+    with storage.backend.lock(habit_file):
+        if not storage.backend.exists(habit_file):
+            return None
+        history_habit = history.load_history(habit_file, period)
+        last_day = history_habit.last_day()
+        rows_appended = [row for row in rows if last_day is None or row[0] > last_day]
+        rows_checked_off = [row for row in rows if row[1] and last_day is not None and row[0] <= last_day]
+
+        changed = False
+        if rows_checked_off:
+            df_habit = history_habit.to_dataframe()
+            days = periods.to_days(df_habit.index)
+            stored_checked_off = dict(zip(days.tolist(), (df_habit["Checked-off"] == "Yes").tolist()))
+            rows_checked_off = [row for row in rows_checked_off if stored_checked_off.get(row[0]) is False]
+            if rows_checked_off:
+                # rare case: the history is rebuilt in its format with the missed periods replaced by the check-offs
+                days_checked_off = [row[0] for row in rows_checked_off]
+                df_habit = df_habit[~np.isin(days, days_checked_off)].append(dataframe_from_rows(rows_checked_off))
+                file_format = history.detect_format(habit_file)
+                history_habit = history.create_history(
+                    period, file_format, history_habit.created_day if file_format == "sparse" else None)
+                history_habit.extend(df_habit.sort_index())
+                changed = True
+        if rows_appended:
+            history_habit.extend(dataframe_from_rows(rows_appended))
+            changed = True
+        if changed:
+            history_habit.write(habit_file)
+        return history_habit
+
+
+def apply_overview_records(path_habit_overview, list_records):
+    """
+    Applying logged creations and removals of habits to the habit overview (read and written once)
+
+    :param path_habit_overview: path to .json-habit-overview-file
+    :param list_records: list of 'create' and 'remove' records
+    :return:
+    """
+    if not list_records:
+        return
+    with storage.backend.lock(path_habit_overview):
+        df_overview = codec.read_overview(path_habit_overview)
+        for record in list_records:
+            if record["op"] == "create" and record["habit"]["Name"] not in df_overview["Name"].tolist():
+                df_overview = df_overview.append(record["habit"], ignore_index=True)
+            elif record["op"] == "remove":
+                df_overview = df_overview.drop(df_overview[df_overview.Name == record["name"]].index)
+        codec.write_overview(path_habit_overview, df_overview)
+
+
+class WriteAheadLog:
+    """
+    Write-ahead log for all mutations of habits (create, check-off, auto-update, remove):
+    every mutation is appended to the log (and flushed to disk) before it counts as done, while the habit files
+    and the habit overview are only rewritten by a checkpoint. Mutations queued within batch() are committed
+    together with one write and one flush (group commit). Until the checkpoint, changed histories are kept in
+    history.dict_unsaved_histories, so reading a habit always returns the logged state.
+    Every process has its own log; checkpoints merge the logged periods into the current habit files under their
+    locks (see merge_rows()), so processes sharing the habits (app, daemon, cron) don't overwrite each other.
+    """
+
+    def __init__(self, path_habit_overview, checkpoint_interval=100):
+        self.path_habit_overview = path_habit_overview
+        self.file = log_file(path_habit_overview)
+        # number of committed records after which a checkpoint is done
+        self.checkpoint_interval = checkpoint_interval
+        # encoded records waiting for the next commit
+        self.queue = []
+        # number of records committed since the last checkpoint
+        self.number_committed = 0
+        # creations / removals of habits not yet applied to the habit overview
+        self.overview_records = []
+        # periods appended since the last checkpoint: path to habit file -> (periodicity, list of logged rows)
+        self.dict_appended = {}
+        # habit files that got periods of other processes by a checkpoint (in-memory state of the habits is outdated)
+        self.set_merged_files = set()
+        # nesting depth of batch()
+        self.depth_batch = 0
+        # mutations may be logged from several threads (e.g. executor of the asyncio API)
+        self.lock = threading.RLock()
+
+    def log(self, record):
+        """
+        Queueing a record - committed at once or at the end of the running batch
+
+        :param record: dictionary
+        :return:
+        """
+        with self.lock:
+            self.queue.append(encode_record(record))
+            if self.depth_batch == 0:
+                self.commit()
+
+    def commit(self):
+        """
+        Group commit: writing all queued records with one write and one flush to disk
+
+        :return:
+        """
+        with self.lock:
+            if not self.queue:
+                return
+            storage.backend.append_text(self.file, "".join(self.queue), sync=True)
+            self.number_committed += len(self.queue)
+            self.queue = []
+            if self.number_committed >= self.checkpoint_interval and self.depth_batch == 0:
+                self.checkpoint()
+
+    @contextmanager
+    def batch(self):
+        """
+        Context manager for mutations that are committed together (one write / flush for all of them)
+        """
+        self.depth_batch += 1
+        try:
+            yield self
+        finally:
+            self.depth_batch -= 1
+            if self.depth_batch == 0:
+                self.commit()
+
+    def log_append(self, habit_file, period, df_appended, history_habit):
+        """
+        Logging periods appended to a habit (check-off or auto-update) instead of rewriting the habit file
+
+        :param habit_file: path to habit file
+        :param period: periodicity of the habit ('D' or '7d')
+        :param df_appended: pandas dataframe with the appended periods
+        :param history_habit: history object of the habit including the appended periods
+        :return:
+        """
+        rows = rows_from_dataframe(df_appended)
+        with self.lock:
+            history.dict_unsaved_histories[habit_file] = history_habit
+            self.dict_appended.setdefault(habit_file, (period, []))[1].extend(rows)
+            self.log({"op": "append", "file": habit_file, "period": period, "rows": rows})
+
+    def log_create(self, dict_habit):
+        """
+        Logging a new habit instead of rewriting the habit overview
+
+        :param dict_habit: entry of the habit overview ('Name', 'Specification', 'Periodicity', 'Created on',
+                           'File Directory')
+        :return:
+        """
+        dict_habit = dict(dict_habit, **{"Created on": pd.Timestamp(dict_habit["Created on"]).isoformat()})
+        record = {"op": "create", "habit": dict_habit}
+        self.overview_records.append(record)
+        self.log(record)
+
+    def log_remove(self, name, habit_file):
+        """
+        Logging the removal of a habit instead of rewriting the habit overview
+
+        :param name: name of the habit
+        :param habit_file: path to habit file (removed by the compaction of the tombstones)
+        :return:
+        """
+        with self.lock:
+            history.dict_unsaved_histories.pop(habit_file, None)
+            self.dict_appended.pop(habit_file, None)
+            record = {"op": "remove", "name": name, "file": habit_file}
+            self.overview_records.append(record)
+            self.log(record)
+
+    def checkpoint(self):
+        """
+        Folding the log into the main store: merging the appended periods into the habit files and applying the
+        creations / removals to the habit overview, afterwards the log is removed
+
+        :return: Status (string)
+        """
+        with self.lock:
+            self.commit()
+            number_histories = len(self.dict_appended)
+            for habit_file, (period, rows) in list(self.dict_appended.items()):
+                history_unsaved = history.dict_unsaved_histories.pop(habit_file, None)
+                history_merged = merge_rows(habit_file, period, rows)
+                if history_unsaved is not None and history_merged is not None and \
+                        (history_merged.last_day() != history_unsaved.last_day() or
+                         not np.array_equal(history_merged.checked_off(), history_unsaved.checked_off())):
+                    self.set_merged_files.add(habit_file)
+            self.dict_appended = {}
+            apply_overview_records(self.path_habit_overview, self.overview_records)
+            self.overview_records = []
+
+            # the log is only removed after the main store has been written completely and flushed to disk
+            if storage.backend.exists(self.file):
+                storage.backend.remove(self.file)
+            self.number_committed = 0
+        status = f"Checkpoint: {number_histories} habit files saved."
+        return status
+
+    def pop_merged_files(self):
+        """
+        :return: set of the habit files that got periods of other processes by the checkpoints since the last call
+        """
+        with self.lock:
+            set_merged_files, self.set_merged_files = self.set_merged_files, set()
+        return set_merged_files
+
+    def recover(self):
+        """
+        Replaying the logs left over by processes that have ended without checkpoint (e.g. crash): the own log of the
+        process and the logs of processes that aren't running anymore.
+        Replaying is idempotent: periods already contained in a habit file are kept (see merge_rows()).
+
+        :return: Status (string) - None if there was nothing to recover
+        """
+        number_records = 0
+        for file, pid in list_log_files(self.path_habit_overview):
+            if file != self.file and pid is not None and process_running(pid):
+                # log of another running process: folded in by its own checkpoints
+                continue
+            list_records = decode_records(storage.backend.read_text(file))
+
+            # logged periods per habit file: path to habit file -> (periodicity, list of logged rows)
+            dict_appended = {}
+            list_overview_records = []
+            for record in list_records:
+                if record["op"] == "append":
+                    dict_appended.setdefault(record["file"], (record["period"], []))[1].extend(record["rows"])
+                else:
+                    dict_appended.pop(record.get("file"), None)
+                    list_overview_records.append(record)
+
+            # read-modify-write of every habit file under its lock (other processes may use the habits meanwhile)
+            for habit_file, (period, rows) in dict_appended.items():
+                merge_rows(habit_file, period, rows)
+            apply_overview_records(self.path_habit_overview, list_overview_records)
+            storage.backend.remove(file)
+            number_records += len(list_records)
+
+        if number_records == 0:
+            return None
+        status = f"Recovered {number_records} logged mutations."
+        return status
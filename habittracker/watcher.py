@@ -0,0 +1,323 @@
+"""
+Watching the habit overview and the habit files for changes made by other programs (e.g. a habit file edited by hand
+or synced from another device) while the habits are kept in memory: only the cached state of the changed habits
+(history index, archive segments, rollups) is dropped, all other habits keep theirs.
+Changes of the habit overview add / remove / update the habit instances.
+
+Linux: the kernel reports the changes of the watched directories (inotify), nothing is read while no file changes.
+Otherwise the modification times of the watched files are polled.
+Files written by the app itself are recognized by their state after the last own write (see storage.py) and ignored.
+"""
+import os
+import re
+import sys
+import time
+import ctypes
+import ctypes.util
+import struct
+import pandas as pd
+
+from habittracker import habits
+from habittracker import rollups
+from habittracker import segments
+from habittracker import storage
+
+
+# inotify events of interest (see inotify(7)): file written, moved into / out of the directory or deleted
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+# events have been dropped by the kernel (queue full)
+IN_Q_OVERFLOW = 0x00004000
+# flags of inotify_init1()
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+MASK_EVENTS = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+# header of an inotify event: watch descriptor, mask, cookie, length of the name
+FORMAT_EVENT = "iIII"
+SIZE_EVENT = struct.calcsize(FORMAT_EVENT)
+
+# seconds between two polls of the modification times (fallback without inotify)
+POLL_INTERVAL = 1.0
+
+# archive segment of a habit file: <habit file without .json>_<year>.json.gz (see segments.py)
+PATTERN_ARCHIVE = re.compile(r"_\d+\.json\.gz")
+
+
+class InotifyWatcher:
+    """
+    Changes of files reported by the kernel (Linux): the directories of the watched files are watched,
+    events of other files in these directories are skipped.
+    """
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.descriptor = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.descriptor < 0:
+            raise OSError(ctypes.get_errno(), "Could not initialize inotify!")
+        # watch descriptor -> directory, directory -> watch descriptor
+        self.dict_watches = {}
+        self.dict_directories = {}
+        # absolute path -> path to file as given to watch()
+        self.dict_files = {}
+
+    def watch(self, list_files):
+        """
+        Replacing the watched files
+
+        :param list_files: list of paths to files
+        :return:
+        """
+        self.dict_files = {os.path.abspath(file): file for file in list_files}
+        set_directories = {os.path.dirname(file) for file in self.dict_files}
+        for directory in set_directories - set(self.dict_directories):
+            watch_descriptor = self.libc.inotify_add_watch(self.descriptor, os.fsencode(directory), MASK_EVENTS)
+            if watch_descriptor < 0:
+                # e.g. directory not existing (yet): changes of its files are not reported
+                continue
+            self.dict_watches[watch_descriptor] = directory
+            self.dict_directories[directory] = watch_descriptor
+        for directory in set(self.dict_directories) - set_directories:
+            watch_descriptor = self.dict_directories.pop(directory)
+            del self.dict_watches[watch_descriptor]
+            self.libc.inotify_rm_watch(self.descriptor, watch_descriptor)
+
+    def changes(self):
+        """
+        :return: set of the watched files changed since the last call (paths as given to watch())
+        """
+        set_changed = set()
+        while True:
+            try:
+                buffer = os.read(self.descriptor, 65536)
+            except BlockingIOError:
+                # no more events
+                break
+            offset = 0
+            while offset < len(buffer):
+                watch_descriptor, mask, _, length = struct.unpack_from(FORMAT_EVENT, buffer, offset)
+                name = buffer[offset + SIZE_EVENT:offset + SIZE_EVENT + length].rstrip(b"\0")
+                offset += SIZE_EVENT + length
+                if mask & IN_Q_OVERFLOW:
+                    # events are lost: every watched file may have changed
+                    set_changed.update(self.dict_files.values())
+                elif watch_descriptor in self.dict_watches and name:
+                    file = self.dict_files.get(os.path.join(self.dict_watches[watch_descriptor], os.fsdecode(name)))
+                    if file is not None:
+                        set_changed.add(file)
+        return set_changed
+
+    def close(self):
+        """
+        Releasing the inotify instance (all watches are removed)
+
+        :return:
+        """
+        if self.descriptor >= 0:
+            os.close(self.descriptor)
+            self.descriptor = -1
+
+
+class PollingWatcher:
+    """
+    Changes of files detected by comparing their modification time and size (storage backend) with the last poll.
+    Polling is done at most every interval seconds.
+    """
+
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        # path to file -> (modification time in nanoseconds, size) or None if not existing
+        self.dict_states = {}
+        self.time_last_poll = time.monotonic()
+
+    def watch(self, list_files):
+        """
+        Replacing the watched files (the state of files not watched before is taken as of now)
+
+        :param list_files: list of paths to files
+        :return:
+        """
+        self.dict_states = {file: self.dict_states[file] if file in self.dict_states else file_state(file)
+                            for file in list_files}
+
+    def changes(self):
+        """
+        :return: set of the watched files changed since the last poll
+        """
+        if time.monotonic() - self.time_last_poll < self.interval:
+            return set()
+        self.time_last_poll = time.monotonic()
+        set_changed = set()
+        for file, state in self.dict_states.items():
+            state_now = file_state(file)
+            if state_now != state:
+                self.dict_states[file] = state_now
+                set_changed.add(file)
+        return set_changed
+
+    def close(self):
+        pass
+
+
+def file_state(file):
+    """
+    :param file: path to file
+    :return: tuple (modification time in nanoseconds, size) - None if the file doesn't exist
+    """
+    try:
+        return storage.backend.stat(file)
+    except OSError:
+        return None
+
+
+def create_watcher(interval=POLL_INTERVAL):
+    """
+    inotify if available (Linux, files on disk), otherwise polling
+
+    :param interval: seconds between two polls (fallback)
+    :return: InotifyWatcher or PollingWatcher
+    """
+    if sys.platform.startswith("linux") and not isinstance(storage.backend, storage.MemoryBackend):
+        try:
+            return InotifyWatcher()
+        except (OSError, AttributeError):
+            # no inotify available (e.g. limit of inotify instances reached)
+            pass
+    return PollingWatcher(interval)
+
+
+def invalidate_habit(habit):
+    """
+    Dropping the cached state of a habit: it's read from the habit file again when needed.
+    Changes only logged so far (write-ahead log) are kept and take precedence over the changed habit file.
+
+    :param habit: habit instance
+    :return:
+    """
+    habit.history_index = None
+    prefix = os.path.basename(habit.file)[:-5]
+    for file in [file for file in segments.dict_archive_cache
+                 if os.path.dirname(file) == os.path.dirname(habit.file)
+                 and os.path.basename(file).startswith(prefix)
+                 and PATTERN_ARCHIVE.fullmatch(os.path.basename(file)[len(prefix):])]:
+        del segments.dict_archive_cache[file]
+    # materialized rollups are computed from the habit file again
+    rollups.remove_rollups(habit.file)
+
+
+class HabitWatcher:
+    """
+    Keeps the habits in memory (habits.list_habit_instances) consistent with changes of the habit overview and
+    the habit files made by other programs. check() is cheap enough for every menu step / request.
+    """
+
+    def __init__(self, path_habit_overview, watcher=None):
+        self.path_habit_overview = path_habit_overview
+        self.watcher = create_watcher() if watcher is None else watcher
+        # path to habit file -> habit instance (habits watched)
+        self.dict_habits = {}
+        self.update_files()
+
+    def update_files(self):
+        """
+        Watching the habit overview and the habit files of the current habits
+
+        :return:
+        """
+        self.dict_habits = {habit.file: habit for habit in habits.list_habit_instances}
+        self.watcher.watch([self.path_habit_overview] + list(self.dict_habits))
+
+    def external_changes(self):
+        """
+        :return: set of the watched files changed by other programs (own writes are skipped)
+        """
+        set_changed = set()
+        for file in self.watcher.changes():
+            state = file_state(file)
+            if state is None or state != storage.backend.written_state(file):
+                set_changed.add(file)
+        return set_changed
+
+    def reload_overview(self):
+        """
+        Applying the changed habit overview to the habits in memory: new habits are instantiated, removed habits are
+        dropped, habits with changed attributes are updated. Creations / removals only logged so far (write-ahead log)
+        are kept.
+
+        :return: list of the added, removed and updated habit instances
+        """
+        try:
+            df_habit_overview = habits.read_habit_overview(self.path_habit_overview)
+        except (FileNotFoundError, ValueError):
+            # removed or not readable: the habits in memory are kept (the overview is written by the closing routine)
+            return []
+        df_habit_overview["Created on"] = pd.to_datetime(df_habit_overview["Created on"])
+        dict_rows = {file: (name, spec, period, created)
+                     for name, spec, period, created, file in df_habit_overview.values.tolist()}
+
+        set_created, set_removed = set(), set()
+        if habits.write_ahead_log is not None:
+            for record in habits.write_ahead_log.overview_records:
+                if record["op"] == "create":
+                    set_created.add(record["habit"]["File Directory"])
+                else:
+                    set_removed.add(record["file"])
+
+        list_changed = []
+        for habit in list(habits.list_habit_instances):
+            if habit.file not in dict_rows:
+                if habit.file not in set_created:
+                    habits.list_habit_instances.remove(habit)
+                    habits.auto_update_scheduler.unschedule(habit)
+                    list_changed.append(habit)
+            elif (habit.name, habit.spec, habit.period) != dict_rows[habit.file][:3]:
+                habit.name, habit.spec, period, _ = dict_rows[habit.file]
+                habit.period = sys.intern(period)
+                invalidate_habit(habit)
+                habits.auto_update_scheduler.schedule(habit)
+                list_changed.append(habit)
+
+        set_files = {habit.file for habit in habits.list_habit_instances}
+        for file, (name, spec, period, created) in dict_rows.items():
+            if file not in set_files and file not in set_removed:
+                habit = habits.Habit(name, spec, period, file, created)
+                habits.auto_update_scheduler.schedule(habit)
+                list_changed.append(habit)
+        return list_changed
+
+    def check(self):
+        """
+        Applying the changes of the watched files made by other programs since the last check
+
+        :return: list of the habit instances whose cached state has been dropped, added or removed
+        """
+        if len(self.dict_habits) != len(habits.list_habit_instances) or \
+                any(self.dict_habits.get(habit.file) is not habit for habit in habits.list_habit_instances):
+            # habits created / removed by the app meanwhile
+            self.update_files()
+
+        set_changed = self.external_changes()
+        # habits that got periods of other processes by a checkpoint of the own write-ahead log
+        list_changed = habits.reload_merged_habits()
+        if self.path_habit_overview in set_changed:
+            list_changed += self.reload_overview()
+        for file in set_changed:
+            habit = self.dict_habits.get(file)
+            if habit is not None and habit not in list_changed:
+                invalidate_habit(habit)
+                # the deadline of the next auto-update depends on the changed habit data
+                habits.auto_update_scheduler.schedule(habit)
+                list_changed.append(habit)
+        if list_changed:
+            self.update_files()
+        return list_changed
+
+    def close(self):
+        """
+        Stopping to watch the files
+
+        :return:
+        """
+        self.watcher.close()
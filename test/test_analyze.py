@@ -1,11 +1,17 @@
 import sys
 import os
+import io
 import unittest
+from unittest import mock
 import pandas as pd
 import numpy as np
 from datetime import date, datetime
+import pytz
 from habittracker import analyze
 from habittracker import habits
+from habittracker import history
+from habittracker import matrix
+from habittracker import sharedmatrix
 
 # insertion to sys.path to be able to import the modules to be tested
 path = os.path.normpath(os.getcwd() + os.sep + os.pardir + os.sep + "habittracker")
@@ -164,6 +170,122 @@ class TestAnalyze(unittest.TestCase):
         df_analysis = analyze.request_analysis(empty_list)
         self.assertTrue(df_analysis.empty)
 
+    def test_analyze_window(self):
+        # test: date range within the history of Testcase1 (2021-09-03 - 2021-09-06: Yes, Yes, No, No)
+        window = analyze.analyze_window(habits.list_habit_instances[0], date(2021, 9, 3), date(2021, 9, 6))
+        self.assertEqual(window["Number of periods"], 4)
+        self.assertEqual(window["Checked-off periods"], 2)
+        self.assertEqual(window["Completion rate"], "50.0%")
+
+        # test: weekly habit (Testcase4) and date range exceeding the history
+        window = analyze.analyze_window(habits.list_habit_instances[3], date(2021, 8, 1), date(2021, 12, 31))
+        self.assertEqual(window["Number of periods"], 5)
+        self.assertEqual(window["Checked-off periods"], 4)
+
+        # test: date range without periods and empty habit (Testcase5)
+        window = analyze.analyze_window(habits.list_habit_instances[0], date(2022, 1, 1), date(2022, 1, 31))
+        self.assertEqual(window["Completion rate"], "-")
+        window = analyze.analyze_window(habits.list_habit_instances[4], date(2021, 9, 1), date(2021, 9, 30))
+        self.assertEqual(window["Number of periods"], 0)
+
+        # test: windows as columns of the analysis
+        df_analysis = analyze.request_analysis(habits.list_habit_instances, date(2021, 9, 7))
+        self.assertEqual(df_analysis.iloc[0]["Last 7 days"], "71.43%")
+        self.assertEqual(df_analysis.iloc[0]["This month"], "71.43%")
+        self.assertEqual(df_analysis.iloc[0]["Last month"], "-")
+
+        # test: default reference day of the windows is today in UTC (like the periods), not the local day
+        class ClockEastOfUTC(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                now_utc = datetime(2021, 9, 30, 23, 30, tzinfo=pytz.utc)
+                # local time in a time zone east of UTC: already the next day (next month)
+                return now_utc if tz is not None else datetime(2021, 10, 1, 1, 30)
+
+        with mock.patch.object(analyze, "datetime", ClockEastOfUTC):
+            self.assertEqual(analyze.create_windows()["This month"], (date(2021, 9, 1), date(2021, 9, 30)))
+
+        # raising errors
+        with self.assertRaises(TypeError):
+            analyze.analyze_window("Habit", date(2021, 9, 1), date(2021, 9, 2))
+        with self.assertRaises(ValueError):
+            analyze.analyze_window(habits.list_habit_instances[0], date(2021, 9, 2), date(2021, 9, 1))
+
+    def test_request_habits_at_risk(self):
+        # test: current streaks (Testcase1 ends with one, Testcase4 with one checked-off period)
+        self.assertEqual(habits.list_habit_instances[0].running_streak(date(2021, 9, 8)), (1, date(2021, 9, 8)))
+        self.assertEqual(habits.list_habit_instances[3].running_streak(date(2021, 10, 1)), (1, date(2021, 10, 12)))
+        # test: streak isn't running anymore if the next period has ended
+        self.assertEqual(habits.list_habit_instances[0].running_streak(date(2021, 9, 9)), (0, None))
+
+        # test: daily habit at risk the day after the last check-off
+        df_at_risk = analyze.request_habits_at_risk(habits.list_habit_instances, date(2021, 9, 8))
+        self.assertEqual(df_at_risk["Name"].tolist(), ["Testcase1"])
+        # test: weekly habit at risk only at the end of the running period
+        df_at_risk = analyze.request_habits_at_risk(habits.list_habit_instances, date(2021, 10, 6))
+        self.assertTrue(df_at_risk.empty)
+        df_at_risk = analyze.request_habits_at_risk(habits.list_habit_instances, date(2021, 10, 11))
+        self.assertEqual(df_at_risk["Name"].tolist(), ["Testcase4"])
+        self.assertEqual(df_at_risk.iloc[0]["Current Streak"], 1)
+
+        # test: current streak in the analysis
+        df_analysis = analyze.request_analysis(habits.list_habit_instances, date(2021, 9, 8))
+        self.assertEqual(df_analysis.iloc[0]["Current Streak"], 1)
+        self.assertEqual(df_analysis.iloc[4]["Current Streak"], 0)
+
+        with self.assertRaises(ValueError):
+            analyze.request_habits_at_risk(habits.list_habit_instances, date(2021, 9, 8), 0)
+
+        # test: habit files are only read for habits whose history index isn't built yet (once per habit)
+        for habit in habits.list_habit_instances:
+            habit.history_index = None
+        with mock.patch.object(history, "load_history", wraps=history.load_history) as load_history:
+            analyze.request_habits_at_risk(habits.list_habit_instances, date(2021, 9, 8))
+            self.assertEqual(load_history.call_count, len(habits.list_habit_instances))
+            analyze.request_habits_at_risk(habits.list_habit_instances, date(2021, 9, 8))
+            self.assertEqual(load_history.call_count, len(habits.list_habit_instances))
+
+    def test_shared_matrix(self):
+        # test: check-offs published into shared memory are read in place
+        with sharedmatrix.SharedHabitMatrix(habits.list_habit_instances) as habit_matrix:
+            table, bits = sharedmatrix.attach_arrays(habit_matrix.shared_memory, 5)
+            self.assertEqual(table[:, 1].tolist(), [7, 10, 3, 5, 0])
+            self.assertEqual(np.unpackbits(bits[:1], count=7).tolist(), [1, 1, 1, 1, 0, 0, 1])
+            del table, bits
+
+        # test: analysis by worker processes is the same as within the process
+        for current_day in [date(2021, 9, 7), date(2021, 9, 8), date(2021, 10, 11)]:
+            pd.testing.assert_frame_equal(analyze.request_analysis(habits.list_habit_instances, current_day,
+                                                                   processes=2),
+                                          analyze.request_analysis(habits.list_habit_instances, current_day))
+
+    def test_habit_matrix(self):
+        # Testcase1: 2021-09-01 - 2021-09-07 (Y Y Y Y N N Y), Testcase2: 2021-09-01 - 2021-09-10 (Y N N Y Y Y N N N Y)
+        habit_matrix = matrix.build_matrix(habits.list_habit_instances)
+        # test: only daily habits are aligned
+        self.assertEqual(habit_matrix.names, ["Testcase1", "Testcase2"])
+        self.assertEqual(habit_matrix.done.shape, (2, 10))
+        self.assertEqual(habit_matrix.valid.sum(), 17)
+
+        # test: days with all habits checked-off (2021-09-10 only Testcase2 is tracked)
+        self.assertEqual(habit_matrix.all_done_days(), [date(2021, 9, 1), date(2021, 9, 4), date(2021, 9, 10)])
+
+        # test: completion per weekday (2021-09-01 is a wednesday)
+        df_weekdays = habit_matrix.weekday_rates()
+        self.assertEqual(df_weekdays.loc[2, "Periods"], 3)
+        self.assertEqual(df_weekdays.loc[2, "Checked-off"], 2)
+        self.assertEqual(habit_matrix.best_weekday(), "Saturday")
+
+        # test: co-occurrence of the habits
+        df_co_occurrence = habit_matrix.co_occurrence()
+        self.assertEqual(df_co_occurrence.loc["Testcase1", "Testcase1"], 5)
+        self.assertEqual(df_co_occurrence.loc["Testcase1", "Testcase2"], 2)
+        self.assertEqual(habit_matrix.co_occurrence_rate().loc["Testcase2", "Testcase1"], 28.57)
+
+        # test: analysis output and no daily habits
+        self.assertIn("Best weekday: Saturday", matrix.create_cross_analysis(habits.list_habit_instances))
+        self.assertIsNone(matrix.build_matrix(habits.list_habit_instances[2:]))
+
     def test_create_analysis(self):
         df_analysis = analyze.request_analysis(habits.list_habit_instances)
         result_analysis = analyze.create_analysis(df_analysis, "Test:", "Name", ["daily"])
@@ -195,6 +317,48 @@ class TestAnalyze(unittest.TestCase):
         with self.assertRaises(TypeError):
             analyze.create_analysis(df_analysis, "This is an test analysis", "Name", "daily")
 
+    def test_render_table(self):
+        df_analysis = analyze.request_analysis(habits.list_habit_instances)
+        df_analysis.loc[0, "Specification"] = "A very long specification that needs to be truncated"
+        table = analyze.render_table(df_analysis[["Name", "Specification"]], max_len_spec=10)
+        lines = table.split("\n")
+        # test: header, separator and one line for every habit with same width
+        self.assertEqual(len(lines), 7)
+        self.assertEqual(len(set(len(line) for line in lines)), 1)
+        self.assertIn("| Testcase1 | A very ...    |", lines)
+
+        # test: numeric columns of the analysis (object dtype, built with DataFrame.append()) are right-aligned
+        lines = analyze.render_table(df_analysis[["Name", "Checked-off periods"]]).split("\n")
+        self.assertEqual(lines[1], "|:----------|--------------------:|")
+        self.assertRegex(lines[2], r"^\| Testcase1 \| +\d \|$")
+
+        # test: streaming rows to a file-like object gives the same table
+        stream = io.StringIO()
+        self.assertIsNone(analyze.render_table(df_analysis[["Name", "Specification"]], stream, 10))
+        self.assertEqual(stream.getvalue(), f"{table}\n")
+
+        # test: rows are rendered and written chunk by chunk, widths are taken across all chunks
+        stream = mock.Mock()
+        with mock.patch.object(analyze, "render_chunk_rows", 2):
+            self.assertEqual(analyze.render_table(df_analysis[["Name", "Specification"]], max_len_spec=10), table)
+            analyze.render_table(df_analysis[["Name", "Specification"]], stream, 10)
+        list_writes = [call.args[0] for call in stream.write.call_args_list]
+        self.assertEqual(len(list_writes), 4)
+        self.assertTrue(all(write.count("\n") <= 2 for write in list_writes))
+        self.assertEqual("".join(list_writes), f"{table}\n")
+
+        # test: streaming the analysis
+        stream = io.StringIO()
+        analyze.create_analysis(df_analysis, "Test:", "Name", ["weekly"], stream=stream)
+        self.assertEqual(stream.getvalue()[:5], "Test:")
+        self.assertEqual(stream.getvalue()[-3:-2], "3")
+
+        # raising errors
+        with self.assertRaises(TypeError):
+            analyze.render_table("df_analysis")
+        with self.assertRaises(ValueError):
+            analyze.render_table(df_analysis, max_len_spec=2)
+
     def test_details_habit(self):
         result_analysis = analyze.details_habit(habits.list_habit_instances[0])
         self.assertEqual(result_analysis[:21], "Detailed analysis for")
@@ -0,0 +1,144 @@
+import time
+import asyncio
+import unittest
+from unittest import mock
+from datetime import datetime, timedelta
+import pytz
+from habittracker import api
+from habittracker import habits
+from habittracker import scheduler
+from habittracker import storage
+from habittracker import tombstones
+
+
+class TestHabitAPI(unittest.TestCase):
+
+    def setUp(self) -> None:
+        habits.list_habit_instances = []
+        habits.auto_update_scheduler = scheduler.AutoUpdateScheduler()
+        storage.backend = storage.MemoryBackend()
+        habits.create_habit_overview("test_api_overview.json")
+        created = datetime.now(pytz.utc) - timedelta(30)
+        for number in range(20):
+            habit = habits.Habit(f"Testcase{number}", f"DT{number}", "D", f"test_api_testcase{number}.json", created)
+            habit.add_to_overview("test_api_overview.json")
+            habit.auto_update_file()
+
+    def tearDown(self) -> None:
+        tombstones.wait_for_compaction()
+        habits.auto_update_scheduler = scheduler.AutoUpdateScheduler()
+        storage.backend = storage.FileBackend()
+
+    def test_mixed_load(self):
+        async def timed(coroutine):
+            start = time.perf_counter()
+            response = await coroutine
+            return response, time.perf_counter() - start
+
+        async def run_load():
+            habit_api = api.HabitAPI("test_api_overview.json", ".")
+            list_requests = []
+            for number in range(20):
+                list_requests.append(habit_api.handle({"op": "check_off", "name": f"Testcase{number}"}))
+                if number % 4 == 0:
+                    list_requests.append(habit_api.handle({"op": "analysis"}))
+                    list_requests.append(habit_api.handle({"op": "details", "name": f"Testcase{number}"}))
+            return await asyncio.gather(*[timed(request) for request in list_requests])
+
+        list_results = asyncio.run(run_load())
+
+        # test: every request has been answered, every habit checked-off once
+        self.assertEqual(len(list_results), 30)
+        self.assertTrue(all(response["status"] == "ok" for response, _ in list_results))
+        self.assertEqual([habit.get_history_index().checked_off()[-1] for habit in habits.list_habit_instances],
+                         [True] * 20)
+
+        # test: requests of the same habit are answered in the order they have been made (details after check-off)
+        list_details = [response["result"] for response, _ in list_results if "Detailed analysis" in response["result"]]
+        self.assertEqual(len(list_details), 5)
+        self.assertTrue(all("Checked-off periods: 1\n" in details for details in list_details))
+
+        # test: analyses don't wait for the writes of other habits - answered while a check-off is still pending
+        async def run_pending_check_off():
+            habit_api = api.HabitAPI("test_api_overview.json", ".")
+            async with habit_api.lock("Testcase0"):
+                # check-off waiting for the lock of its habit (e.g. slow write of habit 0 still running)
+                check_off = asyncio.ensure_future(habit_api.handle({"op": "check_off", "name": "Testcase0"}))
+                await asyncio.sleep(0)
+                response_details = await habit_api.handle({"op": "details", "name": "Testcase1"})
+                pending = not check_off.done()
+            return response_details, pending, await check_off
+
+        response_details, pending, response_check_off = asyncio.run(run_pending_check_off())
+        self.assertEqual(response_details["status"], "ok")
+        self.assertTrue(pending)
+        # answered after the lock has been released (habit 0 has already been checked-off by the mixed load)
+        self.assertEqual(response_check_off["status"], "error")
+
+        # test: latency percentiles of the mixed load
+        percentiles = api.latency_percentiles([latency for _, latency in list_results])
+        self.assertEqual(list(percentiles), ["p50", "p95", "p99"])
+        self.assertLessEqual(percentiles["p50"], percentiles["p95"])
+        self.assertLessEqual(percentiles["p95"], percentiles["p99"])
+
+    def test_writes_serialized_per_habit(self):
+        async def run_check_offs():
+            habit_api = api.HabitAPI("test_api_overview.json", ".")
+            return await asyncio.gather(*[habit_api.handle({"op": "check_off", "name": "Testcase1"})
+                                          for _ in range(3)])
+
+        # test: concurrent check-offs of the same habit are serialized (only the first one succeeds)
+        list_responses = asyncio.run(run_check_offs())
+        self.assertEqual([response["status"] for response in list_responses], ["ok", "error", "error"])
+        self.assertEqual(len(habits.list_habit_instances[1].get_history_index()), 31)
+
+    def test_invalid_requests(self):
+        async def run_requests():
+            habit_api = api.HabitAPI("test_api_overview.json", ".")
+            return [await habit_api.handle(message) for message in [[1], "x", {"op": "reboot"}]]
+
+        # test: requests that are no .json object or have an unknown operation are answered with an error
+        list_responses = asyncio.run(run_requests())
+        self.assertEqual(list_responses[:2], [{"status": "error", "message": "Request must be a .json object!"}] * 2)
+        self.assertEqual(list_responses[2], {"status": "error", "message": "Unknown operation 'reboot'!"})
+
+    def test_auto_updates(self):
+        habits.auto_update_scheduler = scheduler.AutoUpdateScheduler(habits.list_habit_instances)
+        habit = habits.Habit("Testcase20", "DT20", "D", "test_api_testcase20.json",
+                             datetime.now(pytz.utc) - timedelta(5))
+        habits.auto_update_scheduler.schedule(habit)
+        habit_api = api.HabitAPI("test_api_overview.json", ".")
+        list_locked = []
+
+        def run_due_auto_updates(current_day):
+            list_locked.append(habit_api.lock("Testcase20").locked())
+            return auto_update(current_day)
+
+        # test: missed periods of due habits are filled before a request, while holding the lock of the habit
+        auto_update = habits.run_due_auto_updates
+        with mock.patch.object(habits, "run_due_auto_updates", run_due_auto_updates):
+            response = asyncio.run(habit_api.handle({"op": "list"}))
+            self.assertEqual(response["status"], "ok")
+            self.assertEqual(list_locked, [True])
+            self.assertEqual(len(habit.get_history_index()), 5)
+            # test: nothing due anymore
+            asyncio.run(habit_api.handle({"op": "list"}))
+            self.assertEqual(list_locked, [True])
+        self.assertFalse(habit_api.lock("Testcase20").locked())
+
+    def test_at_risk_and_shutdown(self):
+        async def run_requests():
+            habit_api = api.HabitAPI("test_api_overview.json", ".")
+            response_at_risk = await habit_api.handle({"op": "at_risk"})
+            response_shutdown = await habit_api.handle({"op": "shutdown"})
+            return response_at_risk, response_shutdown, habit_api.stopped.is_set()
+
+        # test: same operations as the daemon - the service stops after the closing routine
+        response_at_risk, response_shutdown, stopped = asyncio.run(run_requests())
+        self.assertEqual(response_at_risk, {"status": "ok", "result": "No running streaks at risk. Well done!"})
+        self.assertEqual(response_shutdown["status"], "ok")
+        self.assertTrue(stopped)
+
+
+if __name__ == '__main__':
+    unittest.main()
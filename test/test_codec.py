@@ -0,0 +1,80 @@
+import os
+import json
+import unittest
+import pandas as pd
+import numpy as np
+from datetime import date, datetime
+import pytz
+from habittracker import codec
+
+
+class TestCodec(unittest.TestCase):
+
+    def setUp(self) -> None:
+        # set-up habit data in the layout of the habit file (naive and timezone-aware check-off dates)
+        list_index = pd.date_range(date(2021, 9, 1), date(2021, 9, 3), freq="D")
+        list_values = [["Yes", datetime(2021, 9, 1, 12, 0, 0, tzinfo=pytz.utc)],
+                       ["No", np.nan],
+                       ["Yes", datetime(2021, 9, 3, 8, 30, 0)]]
+        self.df_habit = pd.DataFrame(list_values, columns=["Checked-off", "Check-off date"], index=list_index)
+
+    def tearDown(self) -> None:
+        for file in ["test_codec_testcase1.json", "test_codec_testcase2.json"]:
+            if os.path.exists(file):
+                os.remove(file)
+
+    def test_habit_file(self):
+        # test: files written by pandas are decoded into typed arrays
+        index, checked_off, check_off_dates = codec.decode_habit_arrays(self.df_habit.to_json(date_format='iso'))
+        self.assertEqual(index[0], np.datetime64("2021-09-01"))
+        self.assertEqual(list(checked_off), [True, False, True])
+        self.assertTrue(pd.isna(check_off_dates[1]))
+        self.assertEqual(check_off_dates[2], pd.Timestamp("2021-09-03 08:30:00", tz="UTC"))
+
+        # test: older files with milliseconds as keys and values
+        df_decoded = codec.decode_habit_file(self.df_habit.to_json())
+        self.assertEqual(list(df_decoded.index), list(self.df_habit.index))
+        self.assertEqual(list(df_decoded["Checked-off"]), ["Yes", "No", "Yes"])
+
+        # test: written files can be read by pandas and by the codec
+        codec.write_habit_file("test_codec_testcase1.json", self.df_habit)
+        df_pandas = pd.read_json("test_codec_testcase1.json")
+        self.assertEqual(list(df_pandas.index), list(self.df_habit.index))
+        self.assertEqual(df_pandas["Check-off date"].iloc[0], "2021-09-01T12:00:00.000Z")
+        df_read = codec.read_habit_file("test_codec_testcase1.json")
+        self.assertEqual(list(df_read["Check-off date"].iloc[[0, 2]]),
+                         [pd.Timestamp("2021-09-01 12:00:00", tz="UTC"), pd.Timestamp("2021-09-03 08:30:00", tz="UTC")])
+
+        # test: same content as json.dumps() of the column objects, also for periods not starting at midnight
+        df_habit = pd.concat([self.df_habit, self.df_habit.set_axis(self.df_habit.index + pd.Timedelta(hours=6))])
+        keys = np.datetime_as_string(df_habit.index.values.astype("datetime64[ms]"), unit="ms").tolist()
+        data = {"Checked-off": dict(zip(keys, df_habit["Checked-off"])),
+                "Check-off date": dict(zip(keys, ["2021-09-01T12:00:00.000Z", None, "2021-09-03T08:30:00.000Z"] * 2))}
+        self.assertEqual(codec.encode_habit_file(df_habit), json.dumps(data, separators=(",", ":")))
+        self.assertEqual(codec.format_period_keys(self.df_habit.index)[1], "2021-09-02T00:00:00.000")
+
+        # test: content that is not a habit file
+        with self.assertRaises(ValueError):
+            codec.decode_habit_file('{"Name":{}}')
+
+    def test_overview(self):
+        df_overview = pd.DataFrame({"Name": ["Read", "Run"], "Specification": ["Book", "5 km"], "Periodicity": ["D", "7d"],
+                                    "Created on": [datetime(2021, 9, 1, 10, 0, 0, tzinfo=pytz.utc),
+                                                   datetime(2021, 9, 2, 10, 0, 0, tzinfo=pytz.utc)],
+                                    "File Directory": ["read.json", "run.json"]}, index=[0, 2])
+        df_overview.to_json("test_codec_testcase2.json", date_format='iso')
+
+        # test: overview written by pandas is decoded with typed columns
+        df_read = codec.read_overview("test_codec_testcase2.json")
+        self.assertEqual(list(df_read.index), [0, 2])
+        self.assertEqual(list(df_read.columns), codec.list_overview_columns)
+        self.assertEqual(df_read["Created on"].iloc[1], pd.Timestamp("2021-09-02 10:00:00", tz="UTC"))
+
+        # test: encoded overview matches the pandas file
+        codec.write_overview("test_codec_testcase2.json", df_read)
+        df_pandas = pd.read_json("test_codec_testcase2.json")
+        self.assertEqual(list(df_pandas["Name"]), ["Read", "Run"])
+        self.assertEqual(df_pandas["Created on"].iloc[0], "2021-09-01T10:00:00.000Z")
+
+        # test: empty overview
+        self.assertTrue(codec.decode_overview(pd.DataFrame(columns=codec.list_overview_columns).to_json()).empty)
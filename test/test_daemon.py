@@ -0,0 +1,103 @@
+import os
+import sys
+import socket
+import unittest
+import threading
+import subprocess
+from datetime import datetime, timedelta
+import pytz
+from habittracker import client
+from habittracker import daemon
+from habittracker import habits
+from habittracker import rollups
+from habittracker import scheduler
+from habittracker import tombstones
+
+
+@unittest.skipIf(not hasattr(socket, "AF_UNIX"), "no unix domain sockets available")
+class TestDaemon(unittest.TestCase):
+
+    def setUp(self) -> None:
+        habits.list_habit_instances = []
+        habits.auto_update_scheduler = scheduler.AutoUpdateScheduler()
+        self.list_of_test_files = ["test_daemon_overview.json",
+                                   "test_daemon_overview.tombstones",
+                                   "test_daemon_overview.snapshot",
+                                   "test_daemon_testcase1.json",
+                                   ".\\test_daemon_testcase2.json"]
+        for file in self.list_of_test_files:
+            if os.path.exists(file):
+                os.remove(file)
+        habits.create_habit_overview("test_daemon_overview.json")
+        habit1 = habits.Habit("Testcase1", "DT1", "D", "test_daemon_testcase1.json",
+                              datetime.now(pytz.utc) - timedelta(2))
+        habit1.add_to_overview("test_daemon_overview.json")
+        habit1.auto_update_file()
+
+        self.habit_daemon = daemon.HabitDaemon("test_daemon_overview.json", ".")
+        self.thread = threading.Thread(target=daemon.serve, args=(self.habit_daemon, "test_daemon.sock"))
+        self.thread.start()
+        while not daemon.is_running("test_daemon.sock"):
+            pass
+
+    def tearDown(self) -> None:
+        if self.thread.is_alive():
+            client.request("shutdown", "test_daemon.sock")
+        self.thread.join()
+        tombstones.wait_for_compaction()
+        for file in self.list_of_test_files:
+            rollups.remove_rollups(file)
+            if os.path.exists(file):
+                os.remove(file)
+
+    def test_requests(self):
+        # test: habits are served from memory
+        response = client.request("list", "test_daemon.sock")
+        self.assertEqual(response, {"status": "ok",
+                                    "result": [{"Name": "Testcase1", "Specification": "DT1", "Periodicity": "D"}]})
+        response = client.request("check_off", "test_daemon.sock", name="Testcase1")
+        self.assertEqual(response, {"status": "ok", "result": "Successfully checked-off your habit!"})
+        response = client.request("check_off", "test_daemon.sock", name="Testcase1")
+        self.assertEqual(response, {"status": "error", "message": "Can't check-off twice a habit!"})
+        response = client.request("analysis", "test_daemon.sock")
+        self.assertIn("Testcase1", response["result"])
+
+        # test: create and delete
+        response = client.request("create", "test_daemon.sock", name="Testcase2", spec="DT2", period="7d")
+        self.assertEqual(response["status"], "ok")
+        self.assertEqual([habit.name for habit in habits.list_habit_instances], ["Testcase1", "Testcase2"])
+        response = client.request("delete", "test_daemon.sock", name="Testcase2")
+        self.assertEqual(response, {"status": "ok", "result": "Habit successfully deleted"})
+
+        # test: invalid requests
+        self.assertEqual(client.request("details", "test_daemon.sock", name="Testcase2")["message"],
+                         "Habit 'Testcase2' doesn't exist!")
+        self.assertEqual(client.request("reboot", "test_daemon.sock")["status"], "error")
+        # test: requests that are valid .json but no .json object are answered with an error (connection kept)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect("test_daemon.sock")
+            with connection.makefile("rwb") as stream:
+                for line in [b'[1]\n', b'"x"\n', b'{"op": "list"}\n']:
+                    stream.write(line)
+                    stream.flush()
+                    response = client.decode_message(stream.readline())
+                    self.assertEqual(response["status"], "error" if line != b'{"op": "list"}\n' else "ok")
+
+        # test: shutdown saves the snapshot and stops serving
+        response = client.request("shutdown", "test_daemon.sock")
+        self.assertEqual(response, {"status": "ok", "result": "Snapshot of 1 habits saved."})
+        self.thread.join()
+        self.assertFalse(os.path.exists("test_daemon.sock"))
+
+    def test_client_without_pandas(self):
+        # test: the client doesn't import pandas
+        code = "import sys; from habittracker import client; " \
+               "sys.exit(client.main(['list']) if 'pandas' not in sys.modules else 2)"
+        environment = dict(os.environ, PYTHONPATH=os.getcwd())
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=environment)
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("Daemon is not running", result.stdout)
+
+
+if __name__ == '__main__':
+    unittest.main()
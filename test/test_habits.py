@@ -1,10 +1,15 @@
 import sys
 import os
+import time
 import unittest
+from unittest import mock
 import pandas as pd
 import numpy as np
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
+import pytz
 from habittracker import habits
+from habittracker import history
+from habittracker import rollups
 
 # insertion to sys.path to be able to import the modules to be tested
 path = os.path.normpath(os.getcwd() + os.sep + os.pardir + os.sep + "habittracker")
@@ -172,6 +177,7 @@ class TestHabitsClass(unittest.TestCase):
         for file in list_of_test_files:
             if os.path.exists(file):
                 os.remove(file)
+            rollups.remove_rollups(file)
 
     def test_add_to_overview(self):
         # create empty overview
@@ -183,6 +189,21 @@ class TestHabitsClass(unittest.TestCase):
         status = habit10.add_to_overview("test_habits_overview_testcase10.json")
         self.assertEqual(status, "Added habit to overview")
 
+    def test_compact_instances(self):
+        habit10 = habits.Habit("Testcase10", "Habits Testcase 10", "D", "test_habits_habit_testcase10.json")
+        time.sleep(0.01)
+        habit11 = habits.Habit("Testcase11", "Habits Testcase 11", "D", "test_habits_habit_testcase11.json")
+
+        # test: instances have no per-instance dictionary
+        self.assertFalse(hasattr(habit10, "__dict__"))
+        with self.assertRaises(AttributeError):
+            habit10.something = "not an attribute of a habit"
+        # test: periodicity codes are interned (shared by all habits)
+        self.assertIs(habit10.period, sys.intern("D"))
+        self.assertIs(habit10.period, habit11.period)
+        # test: default date of creation is evaluated per instance
+        self.assertLess(habit10.created, habit11.created)
+
     def test_create_dataframe(self):
         # create new habit with created on date 2021-09-01
         habit11 = habits.Habit("Testcase11", "Habits Testcase 11", "D",
@@ -246,16 +267,67 @@ class TestHabitsClass(unittest.TestCase):
         status = habit15.check_off_habit()
         self.assertEqual(status, "Successfully checked-off your habit!")
 
+        # test: index of checked-off periods has been extended like the habit file
+        index_rebuilt = habits.HistoryIndex.from_dataframe(pd.read_json(habit15.file), habit15.period)
+        self.assertEqual(len(habit15.history_index), len(index_rebuilt))
+        self.assertEqual(habit15.history_index.last_date(), index_rebuilt.last_date())
+        self.assertEqual(habit15.history_index.count(date(2021, 9, 1), date.today()), (len(index_rebuilt), 1))
+        # test: current streak has been increased by the check-off (after auto-filled missed periods)
+        self.assertEqual(habit15.history_index.current_streak, 1)
+
+        # test: rollups have been updated incrementally like computed from the habit file
+        dict_rollups = rollups.read_rollups(habit15.file)
+        dict_rollups_rebuilt = rollups.compute_rollups(pd.read_json(habit15.file))
+        for bucket in ["Week", "Month", "Year"]:
+            self.assertTrue(dict_rollups[bucket].equals(dict_rollups_rebuilt[bucket]))
+
         # test: check-off twice auto-update habit
         habit16.auto_update_file()
         habit16.check_off_habit()
         status = habit16.check_off_habit()
         self.assertEqual(status, "ERROR: Can't check-off twice a habit!")
 
+        # test: sparse habit file needs no auto-update, check-off stores only the check-off
+        habits.habit_file_format = "sparse"
+        habit20 = habits.Habit("Testcase20", "Habits Testcase 20", "D",
+                               "test_habits_habit_testcase20.json", datetime(2021, 9, 1))
+        habits.habit_file_format = "json"
+        status = habit20.auto_update_file()
+        self.assertEqual(status, "Habit Testcase20: No auto-update needed - missed periods are derived "
+                                 "from the check-offs")
+        status = habit20.check_off_habit()
+        self.assertEqual(status, "Successfully checked-off your habit!")
+        self.assertEqual(habit20.check_off_habit(), "ERROR: Can't check-off twice a habit!")
+        self.assertEqual(len(history.load_history(habit20.file, "D").positions), 1)
+        self.assertEqual(habit20.analyze_habit()["Number of periods"], (date.today() - date(2021, 9, 1)).days + 1)
+        self.assertEqual(habit20.history_index.current_streak, 1)
+
         # test: check off demo data
         status = habit17.check_off_habit()
         self.assertEqual(status, "ERROR: Can't check-off demo data! For further information read the instructions.")
 
+    def test_sparse_history_index(self):
+        # create weekly habit with sparse habit file, created three days ago (first period is still running)
+        created = datetime.now(pytz.utc) - timedelta(3)
+        habits.habit_file_format = "sparse"
+        habit19 = habits.Habit("Testcase19", "Habits Testcase 19", "7d", "test_habits_habit_testcase19.json", created)
+        habits.habit_file_format = "json"
+
+        # test: first check-off is indexed at the period stored in the habit file (anchored at the date of creation)
+        self.assertEqual(habit19.check_off_habit(), "Successfully checked-off your habit!")
+        history_habit = history.load_history(habit19.file, "7d")
+        self.assertEqual(list(history_habit.positions), [0])
+        self.assertEqual(habit19.history_index.first_date, created.date())
+        self.assertEqual(habit19.history_index.checked_off().tolist(), [True])
+
+        # test: crossing the period boundary - the elapsed period without check-off is added to the index as missed
+        history_index = habit19.get_history_index()
+        history_habit.current_day = created.date() + timedelta(15)
+        self.assertIs(habit19.get_history_index(history_habit), history_index)
+        self.assertEqual(history_index.checked_off().tolist(), [True, False])
+        self.assertEqual(history_index.current_streak, 0)
+        self.assertEqual(history_index.checked_off().tolist(), history_habit.checked_off().tolist())
+
     def test_analyze_habit(self):
         # create new daily habit with created on date 2021-09-01
         habit18 = habits.Habit("Testcase18", "Habits Testcase 18", "D",
@@ -291,6 +363,17 @@ class TestHabitsClass(unittest.TestCase):
                          "Period Longest Streak": "2021-09-04 - 2021-09-06"}
         self.assertDictEqual(analysis, analysis_test)
 
+        # test: identical analysis if habit file is run-length encoded (answered from the runs)
+        history.RunLengthHistory.from_dataframe(df_habit18, "D").write(habit18.file)
+        self.assertDictEqual(habit18.analyze_habit(), analysis_test)
+        # test: current streak answered from the last run (the runs aren't expanded into an index)
+        habit18.history_index = None
+        with mock.patch.object(history.RunLengthHistory, "checked_off") as checked_off:
+            self.assertEqual(habit18.running_streak(date(2021, 9, 11)), (1, date(2021, 9, 11)))
+            self.assertEqual(habit18.running_streak(date(2021, 9, 12)), (0, None))
+        checked_off.assert_not_called()
+        self.assertIsNone(habit18.history_index)
+
         # create new weekly habit with created on date 2021-09-01
         habit19 = habits.Habit("Testcase19", "Habits Testcase 19", "7d",
                                "test_habits_habit_testcase19.json", datetime(2021, 9, 1))
@@ -346,3 +429,4 @@ class TestHabitsClass(unittest.TestCase):
         for file in list_of_test_files:
             if os.path.exists(file):
                 os.remove(file)
+            rollups.remove_rollups(file)
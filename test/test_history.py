@@ -0,0 +1,239 @@
+import os
+import unittest
+from unittest import mock
+import pandas as pd
+import numpy as np
+from datetime import date, datetime
+import pytz
+from habittracker import history
+from habittracker import periods
+from habittracker import segments
+from habittracker import storage
+from habittracker.history import BitHistory, RunLengthHistory, SparseHistory
+from habittracker.binstore import BinaryHistory
+from habittracker.segments import SegmentedHistory
+
+
+class TestBitHistory(unittest.TestCase):
+
+    def setUp(self) -> None:
+        if os.path.exists("test_history_testcase1.json"):
+            os.remove("test_history_testcase1.json")
+
+        # set-up habit data in the layout of the habit file
+        list_index = pd.date_range(date(2021, 9, 1), date(2021, 9, 10), freq="D")
+        list_values = [["Yes", datetime(2021, 9, 1, 12, 0, 0)],
+                       ["No", np.nan],
+                       ["No", np.nan],
+                       ["Yes", datetime(2021, 9, 4, 12, 0, 0)],
+                       ["Yes", datetime(2021, 9, 5, 12, 0, 0)],
+                       ["Yes", datetime(2021, 9, 6, 12, 0, 0)],
+                       ["No", np.nan],
+                       ["No", np.nan],
+                       ["No", np.nan],
+                       ["Yes", datetime(2021, 9, 10, 12, 0, 0)]]
+        pd.DataFrame(list_values, columns=["Checked-off", "Check-off date"], index=list_index) \
+            .to_json("test_history_testcase1.json", date_format='iso')
+        self.df_habit = pd.read_json("test_history_testcase1.json")
+
+    def test_from_to_dataframe(self):
+        bit_history = BitHistory.from_dataframe(self.df_habit, "D")
+        # test: one bit per period, check-off dates only for checked-off periods
+        self.assertEqual(len(bit_history), 10)
+        self.assertEqual(len(bit_history.bits), 2)
+        self.assertEqual(len(bit_history.check_off_dates), 5)
+        self.assertEqual(bit_history.last_date(), date(2021, 9, 10))
+
+        # test: conversion back to the dataframe layout
+        df_habit = bit_history.to_dataframe()
+        self.assertTrue(df_habit.index.equals(self.df_habit.index))
+        self.assertEqual(df_habit["Checked-off"].tolist(), self.df_habit["Checked-off"].tolist())
+        self.assertEqual(df_habit.loc["2021-09-04", "Check-off date"], pd.Timestamp(2021, 9, 4, 12))
+        self.assertTrue(pd.isna(df_habit.loc["2021-09-07", "Check-off date"]))
+
+        # test: empty history
+        self.assertTrue(BitHistory.from_dataframe(pd.DataFrame(columns=["Checked-off"]), "7d").to_dataframe().empty)
+
+    def test_append(self):
+        bit_history = BitHistory.from_dataframe(self.df_habit, "D")
+        bit_history.append_missed(7)
+        bit_history.append(True, datetime(2021, 9, 18, 8, 0, 0, tzinfo=pytz.utc))
+        self.assertEqual(len(bit_history), 18)
+        self.assertEqual(len(bit_history.bits), 3)
+        self.assertEqual(bit_history.checked_off()[-8:].tolist(), [False] * 7 + [True])
+        self.assertEqual(bit_history.to_dataframe().iloc[-1]["Check-off date"], pd.Timestamp(2021, 9, 18, 8))
+
+        # test: first period needs a date
+        with self.assertRaises(ValueError):
+            BitHistory("7d").append(False)
+        with self.assertRaises(ValueError):
+            BitHistory("monthly")
+
+    def test_read_write(self):
+        bit_history = BitHistory.from_dataframe(self.df_habit, "D")
+        bit_history.write("test_history_testcase1.json")
+        bit_history_read = BitHistory.read("test_history_testcase1.json")
+        self.assertTrue(bit_history_read.to_dataframe().equals(bit_history.to_dataframe()))
+
+    def test_run_length_history(self):
+        rle_history = RunLengthHistory.from_dataframe(self.df_habit, "D")
+        # test: runs of the history (Y N N Y Y Y N N N Y)
+        self.assertEqual(rle_history.runs, [[1, 1], [0, 2], [1, 3], [0, 3], [1, 1]])
+        self.assertEqual(len(rle_history), 10)
+        # test: streak queries on the runs
+        self.assertEqual(rle_history.count_checked_off(), 5)
+        self.assertEqual(rle_history.longest_streak(), (3, date(2021, 9, 4), date(2021, 9, 6)))
+        self.assertEqual(rle_history.current_streak(), 1)
+        self.assertEqual(rle_history.checked_off().tolist(), (self.df_habit["Checked-off"] == "Yes").tolist())
+
+        # test: appending periods only extends or adds one run
+        rle_history.append(True, datetime(2021, 9, 11, 12, 0, 0))
+        self.assertEqual(rle_history.runs[-1], [1, 2])
+        rle_history.append_missed(30)
+        self.assertEqual(rle_history.runs[-1], [0, 30])
+        self.assertEqual(len(rle_history.runs), 6)
+        self.assertEqual(rle_history.current_streak(), 0)
+
+        # test: saving and loading in any habit file format
+        rle_history.write("test_history_testcase1.json")
+        rle_history_read = history.load_history("test_history_testcase1.json", "D")
+        self.assertIsInstance(rle_history_read, RunLengthHistory)
+        self.assertEqual(rle_history_read.runs, rle_history.runs)
+        self.assertTrue(history.read_habit_file("test_history_testcase1.json").equals(rle_history.to_dataframe()))
+
+    def test_sparse_history(self):
+        sparse_history = SparseHistory("D", date(2021, 9, 1), current_day=date(2021, 9, 10))
+        sparse_history.extend(self.df_habit)
+        # test: only check-offs are stored, missed periods are derived until yesterday
+        self.assertEqual(list(sparse_history.positions), [0, 3, 4, 5, 9])
+        self.assertEqual(len(sparse_history), 10)
+        self.assertEqual(sparse_history.checked_off().tolist(), (self.df_habit["Checked-off"] == "Yes").tolist())
+        self.assertEqual(sparse_history.to_dataframe()["Checked-off"].tolist(), self.df_habit["Checked-off"].tolist())
+
+        # test: periods elapsed meanwhile are missed without writing anything
+        sparse_history.current_day = date(2021, 12, 31)
+        self.assertEqual(len(sparse_history), 121)
+        self.assertEqual(sparse_history.last_date(), date(2021, 12, 30))
+        # test: reading a date range only
+        df_range = sparse_history.to_dataframe(date(2021, 9, 5), date(2021, 9, 7))
+        self.assertEqual(df_range["Checked-off"].tolist(), ["Yes", "Yes", "No"])
+
+        # test: check-off of the running period and saving / loading
+        sparse_history.append(True, datetime(2021, 12, 31, 12, 0, 0))
+        self.assertEqual(sparse_history.positions[-1], 121)
+        sparse_history.write("test_history_testcase1.json")
+        sparse_history_read = history.load_history("test_history_testcase1.json", "D")
+        sparse_history_read.current_day = date(2021, 12, 31)
+        self.assertTrue(sparse_history_read.to_dataframe().equals(sparse_history.to_dataframe()))
+
+        # test: weekly periods anchored at the date of creation
+        sparse_history = SparseHistory("7d", date(2021, 9, 1), current_day=date(2021, 9, 20))
+        self.assertEqual(len(sparse_history), 2)
+        sparse_history.append(True, datetime(2021, 9, 20, 12, 0, 0))
+        self.assertEqual(sparse_history.last_date(), date(2021, 9, 15))
+
+        with self.assertRaises(ValueError):
+            sparse_history.append(True, datetime(2021, 9, 20, 12, 0, 0), date(2021, 9, 8))
+
+    def test_binary_history(self):
+        binary_history = BinaryHistory.from_dataframe(self.df_habit, "D")
+        binary_history.write("test_history_testcase1.json")
+        # test: binary file is detected and read as views of the memory mapping
+        binary_history_read = history.load_history("test_history_testcase1.json", "D")
+        self.assertIsInstance(binary_history_read, BinaryHistory)
+        self.assertIsNotNone(binary_history_read.checked_off().base)
+        self.assertEqual(binary_history_read.capacity, 64)
+        self.assertEqual(binary_history_read.count_checked_off(), 5)
+        self.assertEqual(binary_history_read.longest_streak(), (3, date(2021, 9, 4), date(2021, 9, 6)))
+        df_habit = binary_history_read.to_dataframe()
+        self.assertTrue(df_habit.index.equals(self.df_habit.index))
+        self.assertEqual(df_habit["Checked-off"].tolist(), self.df_habit["Checked-off"].tolist())
+        self.assertEqual(df_habit.loc["2021-09-04", "Check-off date"], pd.Timestamp(2021, 9, 4, 12))
+
+        # test: appending in place (within the capacity) and growing the file (capacity doubled)
+        binary_history_read.extend(self.df_habit.set_axis(pd.date_range(date(2021, 9, 11), periods=10)))
+        binary_history_read.write("test_history_testcase1.json")
+        size = os.path.getsize("test_history_testcase1.json")
+        self.assertEqual(len(history.load_history("test_history_testcase1.json", "D")), 20)
+
+        # test: the header with the new length is written after the appended periods - a crash in between (header not
+        # written) leaves the previous history
+        write_ranges = storage.backend.write_ranges
+
+        def write_ranges_crash(path, list_ranges):
+            if list_ranges[0][0] == 0:
+                raise OSError("Crash before the header is written")
+            write_ranges(path, list_ranges)
+
+        binary_history_crash = history.load_history("test_history_testcase1.json", "D")
+        binary_history_crash.extend(self.df_habit.set_axis(pd.date_range(date(2021, 9, 21), periods=10)))
+        with mock.patch.object(storage.backend, "write_ranges", write_ranges_crash):
+            with self.assertRaises(OSError):
+                binary_history_crash.write("test_history_testcase1.json")
+        self.assertEqual(len(history.load_history("test_history_testcase1.json", "D")), 20)
+        binary_history_read.extend(self.df_habit.iloc[[0] * 60].set_axis(pd.date_range(date(2021, 9, 21), periods=60)))
+        binary_history_read.write("test_history_testcase1.json")
+        binary_history_read = history.load_history("test_history_testcase1.json", "D")
+        self.assertGreater(os.path.getsize("test_history_testcase1.json"), size)
+        self.assertEqual((len(binary_history_read), binary_history_read.capacity), (80, 128))
+        self.assertEqual(binary_history_read.longest_streak()[0], 61)
+
+        # test: periodicity must fit the habit
+        with self.assertRaises(ValueError):
+            history.load_history("test_history_testcase1.json", "7d")
+
+    def test_segmented_history(self):
+        # habit data from 2020-12-28 until 2021-01-06 (one period in a new year)
+        df_habit = self.df_habit.set_axis(pd.date_range(date(2020, 12, 28), periods=10))
+        segmented_history = SegmentedHistory.from_dataframe(df_habit, "D")
+        segmented_history.write("test_history_testcase1.json")
+        # test: periods of 2020 are archived, the habit file holds the periods of 2021 only
+        self.assertEqual(segmented_history.archives[0]["file"], "test_history_testcase1_2020.json.gz")
+        self.assertTrue(os.path.exists("test_history_testcase1_2020.json.gz"))
+        self.assertEqual(len(segmented_history.hot_checked_off), 6)
+
+        # test: counts are answered without reading the archive
+        segments.dict_archive_cache.clear()
+        segmented_history_read = history.load_history("test_history_testcase1.json", "D")
+        self.assertEqual(len(segmented_history_read), 10)
+        self.assertEqual(segmented_history_read.count_checked_off(), 5)
+        self.assertEqual(segmented_history_read.last_date(), date(2021, 1, 6))
+        self.assertEqual(segments.dict_archive_cache, {})
+        # test: analysis reads the archive lazily (and caches it)
+        self.assertEqual(segmented_history_read.longest_streak(), (3, date(2020, 12, 31), date(2021, 1, 2)))
+        self.assertEqual(list(segments.dict_archive_cache), ["test_history_testcase1_2020.json.gz"])
+        df_read = segmented_history_read.to_dataframe()
+        self.assertTrue(df_read.index.equals(df_habit.index))
+        self.assertEqual(df_read["Checked-off"].tolist(), df_habit["Checked-off"].tolist())
+        self.assertEqual(df_read.iloc[3]["Check-off date"], pd.Timestamp(2021, 9, 4, 12))
+
+        # test: removing the archives listed in the habit file
+        list_files = segments.list_archive_files("test_history_testcase1.json")
+        self.assertEqual(list_files, ["test_history_testcase1_2020.json.gz"])
+        segments.remove_archives(list_files)
+        self.assertFalse(os.path.exists("test_history_testcase1_2020.json.gz"))
+
+    def tearDown(self) -> None:
+        if os.path.exists("test_history_testcase1.json"):
+            os.remove("test_history_testcase1.json")
+
+
+class TestPeriods(unittest.TestCase):
+
+    def test_day_numbers(self):
+        # round trip between dates and day numbers
+        self.assertEqual(periods.to_day(date(1970, 1, 2)), 1)
+        self.assertEqual(periods.to_day(datetime(2021, 9, 1, 23, 0, 0, tzinfo=pytz.utc)), 18871)
+        self.assertEqual(periods.to_date(18871), date(2021, 9, 1))
+        self.assertEqual(periods.as_day(18871), 18871)
+        self.assertIsNone(periods.as_day(None))
+        with self.assertRaises(TypeError):
+            periods.to_day("2021-09-01")
+
+        # weekly periods are generated with a step of seven days
+        days = periods.period_range(18871, 18890, "7d")
+        self.assertEqual(list(days), [18871, 18878, 18885])
+        self.assertEqual(list(periods.to_strings(days)), ["2021-09-01", "2021-09-08", "2021-09-15"])
+        self.assertEqual(list(periods.to_days(periods.to_date_index(days))), list(days))
+        with self.assertRaises(ValueError):
+            periods.period_step("M")
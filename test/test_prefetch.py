@@ -0,0 +1,111 @@
+import os
+import threading
+import unittest
+from unittest import mock
+from datetime import datetime, timedelta
+import pandas as pd
+import pytz
+from habittracker import analyze
+from habittracker import habits
+from habittracker import prefetch
+from habittracker import rollups
+from habittracker import sharedmatrix
+
+
+class TestPrefetch(unittest.TestCase):
+
+    def setUp(self) -> None:
+        habits.list_habit_instances = []
+        self.list_of_test_files = ["test_prefetch_testcase1.json", "test_prefetch_testcase2.json"]
+        self.tearDown()
+        for number, file in enumerate(self.list_of_test_files):
+            habit = habits.Habit(f"Testcase{number + 1}", "Spec", "D", file, datetime.now(pytz.utc) - timedelta(5))
+            habit.auto_update_file()
+        self.analysis_prefetch = prefetch.AnalysisPrefetch()
+
+    def tearDown(self) -> None:
+        analyze.analysis_processes = None
+        for file in self.list_of_test_files:
+            rollups.remove_rollups(file)
+            if os.path.exists(file):
+                os.remove(file)
+
+    def test_result(self):
+        # test: snapshot computed in the background is the same as the analysis on request
+        self.analysis_prefetch.start(habits.list_habit_instances)
+        self.assertTrue(self.analysis_prefetch.wait(30))
+        pd.testing.assert_frame_equal(self.analysis_prefetch.result(habits.list_habit_instances),
+                                      analyze.request_analysis(habits.list_habit_instances))
+
+        # test: snapshot is computed again after a change of the habits
+        habits.list_habit_instances[0].check_off_habit()
+        self.analysis_prefetch.start(habits.list_habit_instances)
+        df_analysis = self.analysis_prefetch.result(habits.list_habit_instances)
+        self.assertEqual(df_analysis.iloc[0]["Checked-off periods"], 1)
+        self.assertEqual(df_analysis.iloc[1]["Checked-off periods"], 0)
+
+    def test_cancel(self):
+        # test: cancelled computations stop before analyzing the next habit and keep no result
+        cancelled = threading.Event()
+        cancelled.set()
+        self.assertIsNone(prefetch.compute_analysis(habits.list_habit_instances, datetime.now(pytz.utc).date(),
+                                                    cancelled))
+
+        self.analysis_prefetch.start(habits.list_habit_instances)
+        first_cancelled = self.analysis_prefetch.cancelled
+        first_thread = self.analysis_prefetch.thread
+        self.analysis_prefetch.start(habits.list_habit_instances[:1])
+        self.assertTrue(first_cancelled.is_set())
+        # test: the cancelled computation has stopped before the next one analyzes the same habits
+        self.assertFalse(first_thread.is_alive())
+        # test: only the latest computation is kept
+        self.assertEqual(len(self.analysis_prefetch.result(habits.list_habit_instances)), 1)
+
+        # test: without snapshot the analysis is computed on request
+        self.analysis_prefetch.start(habits.list_habit_instances)
+        self.analysis_prefetch.cancel()
+        self.assertIsNone(self.analysis_prefetch.df_analysis)
+        # test: no computation is running anymore when cancel() returns (habits can be changed afterwards)
+        self.assertFalse(self.analysis_prefetch.thread.is_alive())
+        self.assertEqual(len(self.analysis_prefetch.result(habits.list_habit_instances)), 2)
+
+    def test_cancel_processes(self):
+        # computation by worker processes (see sharedmatrix.py)
+        analyze.analysis_processes = 1
+        current_day = datetime.now(pytz.utc).date()
+
+        # test: cancelled before building the shared memory - no shared memory, no workers
+        cancelled = threading.Event()
+        cancelled.set()
+        with mock.patch.object(sharedmatrix, "SharedHabitMatrix") as shared_habit_matrix:
+            self.assertIsNone(prefetch.compute_analysis(habits.list_habit_instances, current_day, cancelled))
+        shared_habit_matrix.assert_not_called()
+
+        # test: cancelled while the workers are running - the results aren't collected
+        class CancelledAfterBuilding:
+            # not set while the history indexes are built (one look per habit), set afterwards
+            def __init__(self):
+                self.looks = 0
+
+            def is_set(self):
+                self.looks += 1
+                return self.looks > len(habits.list_habit_instances)
+
+        with mock.patch.object(sharedmatrix, "create_row") as create_row:
+            self.assertIsNone(prefetch.compute_analysis(habits.list_habit_instances, current_day,
+                                                        CancelledAfterBuilding()))
+        create_row.assert_not_called()
+
+        # test: not cancelled - same as the analysis on request
+        self.analysis_prefetch.start(habits.list_habit_instances)
+        self.analysis_prefetch.cancel()
+        self.assertFalse(self.analysis_prefetch.thread.is_alive())
+        self.analysis_prefetch.start(habits.list_habit_instances)
+        self.assertTrue(self.analysis_prefetch.wait(60))
+        analyze.analysis_processes = None
+        pd.testing.assert_frame_equal(self.analysis_prefetch.result(habits.list_habit_instances),
+                                      analyze.request_analysis(habits.list_habit_instances))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import unittest
+import pandas as pd
+import numpy as np
+from datetime import date, datetime, timedelta
+import pytz
+from habittracker import habits
+from habittracker import history
+from habittracker import rollups
+
+
+class TestRollups(unittest.TestCase):
+
+    def setUp(self) -> None:
+        habits.list_habit_instances = []
+        self.list_of_test_files = ["test_rollups_habit_testcase1.json",
+                                   "test_rollups_habit_testcase2.json",
+                                   "test_rollups_habit_testcase3.json"]
+        for file in self.list_of_test_files:
+            if os.path.exists(file):
+                os.remove(file)
+            rollups.remove_rollups(file)
+
+        # set-up habits: daily habit from saturday 2021-08-28 to monday 2021-09-13 (every second day checked-off)
+        self.habit1 = habits.Habit("Testcase1", "DT1", "D", "test_rollups_habit_testcase1.json")
+        list_index = pd.date_range(date(2021, 8, 28), date(2021, 9, 13), freq="D")
+        list_values = [["Yes", datetime(2021, 9, 1, 12, 0, 0)] if n % 2 == 0 else ["No", np.nan]
+                       for n in range(len(list_index))]
+        pd.DataFrame(list_values, columns=["Checked-off", "Check-off date"], index=list_index) \
+            .to_json(self.habit1.file, date_format='iso')
+
+        # set-up habits: weekly habit without data
+        self.habit2 = habits.Habit("Testcase2", "WT1", "7d", "test_rollups_habit_testcase2.json")
+
+    def test_compute_rollups(self):
+        dict_rollups = rollups.get_rollups(self.habit1)
+        # test: calendar weeks start on monday
+        self.assertEqual(dict_rollups["Week"].index.tolist(), ["2021-08-23", "2021-08-30", "2021-09-06", "2021-09-13"])
+        self.assertEqual(dict_rollups["Week"]["Periods"].tolist(), [2, 7, 7, 1])
+        self.assertEqual(dict_rollups["Week"]["Checked-off"].tolist(), [1, 4, 3, 1])
+        self.assertEqual(dict_rollups["Month"]["Periods"].tolist(), [4, 13])
+        self.assertEqual(dict_rollups["Year"]["Checked-off"].tolist(), [9])
+        # test: rollups have been materialized next to the habit file
+        self.assertTrue(os.path.exists("test_rollups_habit_testcase1_rollups.json"))
+
+        # test: habit without data
+        self.assertTrue(rollups.get_rollups(self.habit2)["Month"].empty)
+
+    def test_update_rollups(self):
+        df_habit = pd.read_json(self.habit1.file)
+        rollups.write_rollups(self.habit1.file, rollups.compute_rollups(df_habit.iloc[:-3]))
+        # test: appending periods updates the materialized rollups
+        rollups.update_rollups(self.habit1.file, df_habit.iloc[-3:], "D")
+        dict_rollups = rollups.read_rollups(self.habit1.file)
+        dict_rollups_rebuilt = rollups.compute_rollups(df_habit)
+        for bucket in ["Week", "Month", "Year"]:
+            self.assertTrue(dict_rollups[bucket].equals(dict_rollups_rebuilt[bucket]))
+
+    def test_sparse_rollups(self):
+        # set-up habits: daily habit with sparse habit file created 10 days ago, checked-off on the day of creation
+        # (rollups materialized on that day)
+        created = datetime.now(pytz.utc) - timedelta(10)
+        habits.habit_file_format = "sparse"
+        habit3 = habits.Habit("Testcase3", "DT3", "D", "test_rollups_habit_testcase3.json", created)
+        habits.habit_file_format = "json"
+        history_habit = history.load_history(habit3.file, "D")
+        history_habit.append(True, created, created.date())
+        history_habit.write(habit3.file)
+        rollups.write_rollups(habit3.file, rollups.compute_rollups(history_habit.to_dataframe().iloc[:1]))
+
+        # test: checking-off again after 9 missed days - the missed periods are part of the rollups
+        self.assertEqual(habit3.check_off_habit(), "Successfully checked-off your habit!")
+        dict_rollups = rollups.get_rollups(habit3)
+        self.assertEqual(dict_rollups["Year"][["Periods", "Checked-off"]].sum().tolist(), [11, 2])
+        dict_rollups_rebuilt = rollups.compute_rollups(history.read_habit_file(habit3.file, "D"))
+        for bucket in ["Week", "Month", "Year"]:
+            self.assertTrue(dict_rollups[bucket].equals(dict_rollups_rebuilt[bucket]))
+        # test: no stale rollups are kept for sparse habit files
+        self.assertFalse(os.path.exists("test_rollups_habit_testcase3_rollups.json"))
+
+    def test_request_rollups(self):
+        df_rollups = rollups.request_rollups([self.habit1, self.habit2], "Month")
+        self.assertEqual(df_rollups["Name"].tolist(), ["Testcase1", "Testcase1", "All habits", "All habits"])
+        self.assertEqual(df_rollups.iloc[0]["Completion rate"], "50.0%")
+
+        with self.assertRaises(ValueError):
+            rollups.request_rollups([self.habit1], "Day")
+
+    def tearDown(self) -> None:
+        for file in self.list_of_test_files:
+            if os.path.exists(file):
+                os.remove(file)
+            rollups.remove_rollups(file)
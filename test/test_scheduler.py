@@ -0,0 +1,77 @@
+import os
+import unittest
+from datetime import datetime, timedelta
+import pytz
+from habittracker import habits
+from habittracker import history
+from habittracker import periods
+from habittracker import rollups
+from habittracker import scheduler
+
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self) -> None:
+        habits.list_habit_instances = []
+        self.list_of_test_files = ["test_scheduler_daily.json", "test_scheduler_weekly.json",
+                                   "test_scheduler_demo.json"]
+        self.tearDown()
+        self.today = periods.to_day(datetime.now(pytz.utc))
+        self.habit_daily = habits.Habit("Daily", "Spec", "D", "test_scheduler_daily.json",
+                                        datetime.now(pytz.utc) - timedelta(3))
+        self.habit_weekly = habits.Habit("Weekly", "Spec", "7d", "test_scheduler_weekly.json",
+                                         datetime.now(pytz.utc) - timedelta(3))
+        self.habit_demo = habits.Habit("Demo", "! DEMO ! DATA !", "D", "test_scheduler_demo.json",
+                                       datetime.now(pytz.utc) - timedelta(30))
+
+    def tearDown(self) -> None:
+        for file in self.list_of_test_files:
+            rollups.remove_rollups(file)
+            if os.path.exists(file):
+                os.remove(file)
+
+    def test_next_deadline(self):
+        # test: deadline is two periods after the last date (one period before the start date without data)
+        self.assertEqual(scheduler.next_deadline(self.habit_daily), self.today - 3 + 1)
+        self.assertEqual(scheduler.next_deadline(self.habit_weekly), self.today - 3 + 7)
+        # test: demo data is never auto-updated
+        self.assertIsNone(scheduler.next_deadline(self.habit_demo))
+
+    def test_run_due(self):
+        auto_update_scheduler = scheduler.AutoUpdateScheduler(habits.list_habit_instances)
+        self.assertEqual(len(auto_update_scheduler), 2)
+        self.assertEqual(auto_update_scheduler.next_deadline_day(), self.today - 2)
+
+        # test: only the due habit is auto-updated, its next deadline lies in the future
+        list_status = auto_update_scheduler.run_due(self.today)
+        self.assertEqual(list_status, [f"Habit Daily: Auto-Update for {periods.to_date(self.today - 3)} - "
+                                       f"{periods.to_date(self.today - 1)} successfully completed."])
+        self.assertEqual(len(history.read_habit_file("test_scheduler_daily.json")), 3)
+        self.assertEqual(len(history.read_habit_file("test_scheduler_weekly.json")), 0)
+        self.assertEqual(auto_update_scheduler.next_deadline_day(), self.today + 1)
+        self.assertFalse(auto_update_scheduler.is_due(self.today))
+        self.assertEqual(auto_update_scheduler.run_due(self.today), [])
+
+        # test: a check-off moves the deadline without auto-update
+        self.habit_daily.check_off_habit()
+        self.assertEqual(auto_update_scheduler.run_due(self.today + 1), [])
+        self.assertEqual(auto_update_scheduler.next_deadline_day(), self.today + 2)
+
+        # test: habits are scheduled without reading their habit file (earliest possible deadline), the history index
+        # is built when the habit is due: checked-off today, so it's only moved to its actual deadline
+        self.habit_daily.history_index = None
+        auto_update_scheduler = scheduler.AutoUpdateScheduler(habits.list_habit_instances)
+        self.assertIsNone(self.habit_daily.history_index)
+        self.assertEqual(auto_update_scheduler.next_deadline_day(), self.today - 2)
+        self.assertEqual(auto_update_scheduler.run_due(self.today + 1), [])
+        self.assertIsNotNone(self.habit_daily.history_index)
+        self.assertEqual(auto_update_scheduler.next_deadline_day(), self.today + 2)
+
+        # test: unscheduled habits (deleted) are dropped
+        auto_update_scheduler.unschedule(self.habit_daily)
+        self.assertEqual(auto_update_scheduler.next_deadline_day(), self.today + 4)
+        self.assertEqual(len(auto_update_scheduler), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import unittest
+import pandas as pd
+import numpy as np
+from datetime import date, datetime, timedelta
+import pytz
+from habittracker import habits
+from habittracker import rollups
+from habittracker import snapshot
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self) -> None:
+        habits.list_habit_instances = []
+        self.list_of_test_files = ["test_snapshot_overview.json",
+                                   "test_snapshot_overview.snapshot",
+                                   "test_snapshot_testcase1.json",
+                                   "test_snapshot_testcase2.json"]
+        self.tearDown()
+
+        # set-up two habits: a daily habit checked-off until yesterday and an empty weekly habit
+        habits.create_habit_overview("test_snapshot_overview.json")
+        created = datetime.now(pytz.utc) - timedelta(3)
+        habit1 = habits.Habit("Testcase1", "DT1", "D", "test_snapshot_testcase1.json", created)
+        habit2 = habits.Habit("Testcase2", "WT1", "7d", "test_snapshot_testcase2.json", created)
+        list_index = pd.date_range(created.date(), periods=3, freq="D")
+        pd.DataFrame([["Yes", created], ["No", np.nan], ["Yes", created + timedelta(2)]],
+                     columns=["Checked-off", "Check-off date"], index=list_index) \
+            .to_json(habit1.file, date_format='iso')
+        habit1.add_to_overview("test_snapshot_overview.json")
+        habit2.add_to_overview("test_snapshot_overview.json")
+
+    def tearDown(self) -> None:
+        for file in self.list_of_test_files:
+            rollups.remove_rollups(file)
+            if os.path.exists(file):
+                os.remove(file)
+
+    def test_write_load_snapshot(self):
+        status = snapshot.write_snapshot("test_snapshot_overview.json", habits.list_habit_instances)
+        self.assertEqual(status, "Snapshot of 2 habits saved.")
+
+        # test: habits are restored with their history index (habit files are not read)
+        habits.list_habit_instances = []
+        status = snapshot.load_snapshot("test_snapshot_overview.json")
+        self.assertEqual(status, "Re-instantiated 2 habits (2 from snapshot).")
+        habit1, habit2 = habits.list_habit_instances
+        self.assertEqual((habit1.name, habit1.period, habit2.name, habit2.period),
+                         ("Testcase1", "D", "Testcase2", "7d"))
+        self.assertEqual(habit1.history_index.checked_off().tolist(), [True, False, True])
+        self.assertEqual(habit1.history_index.current_streak, 1)
+        self.assertEqual(len(habit2.history_index), 0)
+
+        # test: changed habit file is read as usual
+        with open(habit1.file, "a") as file:
+            file.write(" ")
+        habits.list_habit_instances = []
+        status = snapshot.load_snapshot("test_snapshot_overview.json")
+        self.assertEqual(status, "Re-instantiated 2 habits (1 from snapshot).")
+        # (index built from the habit file by the auto-update)
+        self.assertEqual(habits.list_habit_instances[0].history_index.checked_off().tolist(), [True, False, True])
+
+    def test_invalid_snapshot(self):
+        # test: no snapshot
+        self.assertIsNone(snapshot.load_snapshot("test_snapshot_overview.json"))
+
+        # test: corrupted snapshot (checksum doesn't fit)
+        snapshot.write_snapshot("test_snapshot_overview.json", habits.list_habit_instances)
+        with open("test_snapshot_overview.snapshot", "r+b") as file:
+            file.seek(-1, os.SEEK_END)
+            file.write(b"\xff")
+        self.assertIsNone(snapshot.read_snapshot("test_snapshot_overview.json"))
+
+        # test: habit overview changed after the checkpoint
+        snapshot.write_snapshot("test_snapshot_overview.json", habits.list_habit_instances)
+        habits.Habit("Testcase3", "DT3", "D", "test_snapshot_testcase2.json") \
+            .add_to_overview("test_snapshot_overview.json")
+        self.assertIsNone(snapshot.load_snapshot("test_snapshot_overview.json"))
@@ -0,0 +1,178 @@
+import os
+import unittest
+from unittest import mock
+import multiprocessing
+from datetime import datetime, timedelta
+import pytz
+from habittracker import codec
+from habittracker import habits
+from habittracker import history
+from habittracker import rollups
+from habittracker import storage
+from habittracker import tombstones
+from habittracker import wal
+
+
+class TestMemoryBackend(unittest.TestCase):
+
+    def setUp(self) -> None:
+        habits.list_habit_instances = []
+        storage.backend = storage.MemoryBackend()
+
+    def tearDown(self) -> None:
+        tombstones.wait_for_compaction()
+        storage.backend = storage.FileBackend()
+        habits.habit_file_format = "json"
+
+    def test_backend(self):
+        backend = storage.backend
+        backend.write_text("test_storage_file.txt", "abc")
+        backend.append_text("test_storage_file.txt", "def", sync=True)
+        backend.write_ranges("test_storage_file.txt", [(1, b"X")])
+        mtime, size = backend.stat("test_storage_file.txt")
+
+        # test: content and state of the file, nothing is written to disk
+        self.assertEqual(backend.read_text("test_storage_file.txt"), "aXcdef")
+        self.assertEqual(backend.read_prefix("test_storage_file.txt", 2), b"aX")
+        self.assertEqual(size, 6)
+        self.assertFalse(os.path.exists("test_storage_file.txt"))
+
+        # test: replacing updates the modification time, removed files are gone
+        backend.write_text("test_storage_file.tmp", "new")
+        backend.replace("test_storage_file.tmp", "test_storage_file.txt")
+        self.assertGreater(backend.stat("test_storage_file.txt")[0], mtime)
+        self.assertFalse(backend.exists("test_storage_file.tmp"))
+        backend.remove("test_storage_file.txt")
+        with self.assertRaises(FileNotFoundError):
+            backend.read_text("test_storage_file.txt")
+
+    def test_habits_in_memory(self):
+        created = datetime.now(pytz.utc) - timedelta(3)
+        habits.create_habit_overview("test_storage_overview.json")
+        for habit_file_format in ["json", "binary", "segmented"]:
+            habits.habit_file_format = habit_file_format
+            habit = habits.Habit(f"Testcase {habit_file_format}", "Spec", "D",
+                                 f"test_storage_{habit_file_format}.json", created)
+            habit.add_to_overview("test_storage_overview.json")
+            habit.auto_update_file()
+            habit.check_off_habit()
+
+            # test: habit file in the configured format is kept in memory
+            self.assertEqual(history.detect_format(habit.file), habit_file_format)
+            self.assertEqual(history.read_habit_file(habit.file)["Checked-off"].tolist(), ["No", "No", "No", "Yes"])
+            self.assertEqual(rollups.get_rollups(habit)["Year"]["Checked-off"].sum(), 1)
+
+        # test: overview and removal work without disk I/O
+        self.assertEqual(len(habits.read_habit_overview("test_storage_overview.json")), 3)
+        habits.list_habit_instances[0].remove_habit("test_storage_overview.json")
+        tombstones.wait_for_compaction()
+        self.assertEqual(codec.read_overview("test_storage_overview.json")["Name"].tolist(),
+                         ["Testcase binary", "Testcase segmented"])
+        self.assertFalse(storage.backend.exists("test_storage_json.json"))
+        self.assertFalse(os.path.exists("test_storage_overview.json"))
+        self.assertFalse(os.path.exists("test_storage_binary.json"))
+
+
+def add_habits_to_overview(number_process, number_of_habits):
+    # worker process: adding habits to the shared habit overview
+    habits.list_habit_instances = []
+    created = datetime.now(pytz.utc) - timedelta(1)
+    for number in range(number_of_habits):
+        habit = habits.Habit(f"Testcase {number_process}-{number}", "Spec", "D",
+                             f"test_storage_testcase{number_process}.json", created)
+        habit.add_to_overview("test_storage_overview.json")
+
+
+def log_and_checkpoint(list_numbers_checked_off, created, event_logged, event_wait, event_done):
+    # worker process: auto-updating and checking-off habits with the write-ahead log, checkpoint after the event
+    habits.list_habit_instances = []
+    history.dict_unsaved_histories.clear()
+    habits.write_ahead_log = wal.WriteAheadLog("test_storage_overview.json")
+    for number in range(2):
+        habit = habits.Habit(f"Testcase {number}", "Spec", "D", f"test_storage_testcase{number}.json", created)
+        habit.auto_update_file()
+        if number in list_numbers_checked_off:
+            habit.check_off_habit()
+    event_logged.set()
+    event_wait.wait(30)
+    habits.write_ahead_log.checkpoint()
+    event_done.set()
+
+
+class TestFileLocks(unittest.TestCase):
+
+    def setUp(self) -> None:
+        habits.list_habit_instances = []
+        self.list_of_test_files = ["test_storage_overview.json"] + \
+                                  [f"test_storage_testcase{number}.json" for number in range(4)]
+        self.tearDown()
+        habits.create_habit_overview("test_storage_overview.json")
+
+    def tearDown(self) -> None:
+        for file in self.list_of_test_files:
+            rollups.remove_rollups(file)
+            if os.path.exists(file):
+                os.remove(file)
+
+    @unittest.skipIf(storage.fcntl is None, "no advisory file locks available")
+    def test_concurrent_processes(self):
+        # test: concurrent read-modify-writes of the habit overview by several processes don't lose updates
+        context = multiprocessing.get_context("fork")
+        list_processes = [context.Process(target=add_habits_to_overview, args=(number, 10)) for number in range(4)]
+        for process in list_processes:
+            process.start()
+        for process in list_processes:
+            process.join()
+        self.assertEqual([process.exitcode for process in list_processes], [0, 0, 0, 0])
+        self.assertEqual(len(codec.read_overview("test_storage_overview.json")), 40)
+
+        # test: files are replaced at once, no temporary files are left
+        self.assertEqual([file for file in os.listdir(".") if file.startswith("test_storage_") and
+                          file.endswith(".tmp")], [])
+
+    def test_durable_writes(self):
+        # test: the content is flushed to disk before the file is replaced, the directory after the rename
+        list_synced = []
+        with mock.patch("habittracker.storage.os.fsync", side_effect=lambda descriptor: list_synced.append(
+                os.readlink(f"/proc/self/fd/{descriptor}") if os.path.exists("/proc/self/fd") else descriptor)):
+            storage.backend.write_text("test_storage_testcase0.json", "[]")
+        self.assertEqual(len(list_synced), 2 if os.name == "posix" else 1)
+        if os.path.exists("/proc/self/fd"):
+            self.assertTrue(list_synced[0].endswith(".tmp"))
+            self.assertEqual(list_synced[1], os.getcwd())
+
+    @unittest.skipIf(storage.fcntl is None, "no advisory file locks available")
+    def test_concurrent_write_ahead_logs(self):
+        # test: two processes with the write-ahead log on change the same habits, both checkpoints are merged
+        # (process 1 checks off habit 0 and checkpoints first, process 2 checks off habit 1 and checkpoints later)
+        context = multiprocessing.get_context("fork")
+        created = datetime.now(pytz.utc) - timedelta(3)
+        event_logged1, event_logged2, event_done1, event_done2 = [context.Event() for _ in range(4)]
+        process1 = context.Process(target=log_and_checkpoint,
+                                   args=([0], created, event_logged1, event_logged2, event_done1))
+        process2 = context.Process(target=log_and_checkpoint,
+                                   args=([1], created, event_logged2, event_done1, event_done2))
+        process1.start()
+        event_logged1.wait(30)
+        process2.start()
+        for process in [process1, process2]:
+            process.join()
+        self.assertEqual([process1.exitcode, process2.exitcode], [0, 0])
+
+        # test: no check-off is lost, every process has removed its own log
+        for number in range(2):
+            self.assertEqual(history.read_habit_file(f"test_storage_testcase{number}.json")["Checked-off"].tolist(),
+                             ["No", "No", "No", "Yes"])
+        self.assertEqual(wal.list_log_files("test_storage_overview.json"), [])
+
+    def test_reentrant_lock(self):
+        # test: locks are reentrant within a thread
+        with storage.backend.lock("test_storage_overview.json"):
+            with storage.backend.lock("test_storage_overview.json"):
+                codec.write_overview("test_storage_overview.json",
+                                     codec.read_overview("test_storage_overview.json"))
+        self.assertTrue(codec.read_overview("test_storage_overview.json").empty)
+
+
+if __name__ == '__main__':
+    unittest.main()
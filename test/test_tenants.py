@@ -0,0 +1,90 @@
+import os
+import shutil
+import unittest
+from habittracker import display
+from habittracker import habits
+from habittracker import scheduler
+from habittracker import tenants
+from habittracker import tombstones
+
+
+class TestTenants(unittest.TestCase):
+
+    def setUp(self) -> None:
+        habits.list_habit_instances = []
+        habits.auto_update_scheduler = scheduler.AutoUpdateScheduler()
+        self.directory_documents = os.path.join(os.getcwd(), "test_tenants_docs")
+        shutil.rmtree(self.directory_documents, ignore_errors=True)
+        self.path_registry = tenants.registry_file(self.directory_documents)
+
+    def tearDown(self) -> None:
+        tombstones.wait_for_compaction()
+        tenants.current_tenant = None
+        shutil.rmtree(self.directory_documents, ignore_errors=True)
+
+    def test_select_tenant(self):
+        environment_tenant = os.environ.pop(tenants.ENVIRONMENT_TENANT, None)
+        try:
+            # test: single user by default, name of the tenant from config.txt
+            self.assertIsNone(tenants.select_tenant({}))
+            self.assertIsNone(tenants.select_tenant({"Tenant": "off"}))
+            self.assertEqual(tenants.select_tenant({"Tenant": "alice"}), "alice")
+            # test: names that aren't valid directory names are rejected
+            with self.assertRaises(ValueError):
+                tenants.select_tenant({"Tenant": "../bob"})
+            # test: environment variable overrides config.txt
+            os.environ[tenants.ENVIRONMENT_TENANT] = "carol"
+            self.assertEqual(tenants.select_tenant({"Tenant": "alice"}), "carol")
+        finally:
+            os.environ.pop(tenants.ENVIRONMENT_TENANT, None)
+            if environment_tenant is not None:
+                os.environ[tenants.ENVIRONMENT_TENANT] = environment_tenant
+
+    def test_register_tenant(self):
+        path_overview, directory_habit_files = tenants.register_tenant(self.path_registry, "alice")
+
+        # test: tenant directory is sharded by the hash of its name
+        self.assertEqual(os.path.relpath(path_overview, os.path.dirname(self.path_registry)),
+                         os.path.join(*tenants.shard("alice", 2), "alice", "habits_overview.json"))
+        self.assertTrue(os.path.isdir(directory_habit_files))
+        self.assertEqual(tenants.read_registry(self.path_registry),
+                         {"alice": {"directory": tenants.tenant_directory("alice"), "habits": 0}})
+
+        # test: registering again doesn't change anything, other tenants get their own directories
+        self.assertEqual(tenants.register_tenant(self.path_registry, "alice"), (path_overview, directory_habit_files))
+        self.assertNotEqual(tenants.register_tenant(self.path_registry, "bob")[0], path_overview)
+        self.assertEqual(sorted(tenants.read_registry(self.path_registry)), ["alice", "bob"])
+
+    def test_habit_count(self):
+        path_overview, directory_habit_files = tenants.register_tenant(self.path_registry, "alice")
+        tenants.current_tenant = (self.path_registry, "alice")
+        habits.create_habit_overview(path_overview)
+
+        # test: habit files are sharded, the registry counts the habits of the tenant
+        habits.create_habit(("Testcase1", "Spec", "D"), path_overview, directory_habit_files)
+        habits.create_habit(("Testcase2", "Spec", "7d"), path_overview, directory_habit_files)
+        self.assertEqual(os.path.dirname(habits.list_habit_instances[0].file),
+                         os.path.join(directory_habit_files, *tenants.shard("testcase1.json")))
+        self.assertTrue(os.path.exists(habits.list_habit_instances[0].file))
+        self.assertEqual(tenants.habit_count(), 2)
+
+        habits.remove_habits(habits.list_habit_instances[:1], path_overview)
+        self.assertEqual(tenants.habit_count(), 1)
+        tenants.update_habit_count(number_of_habits=0)
+        self.assertEqual(tenants.habit_count(), 0)
+
+        # test: the main menu offers the analysis as soon as a habit file of the tenant has been written
+        self.assertIn("Analyze my habits", display.check_available_functions(habits.list_habit_instances))
+        os.remove(habits.list_habit_instances[0].file)
+        self.assertNotIn("Analyze my habits", display.check_available_functions(habits.list_habit_instances))
+
+    def test_single_user(self):
+        # test: without tenant the habit files are kept in the directory of habit files, nothing is counted
+        self.assertEqual(tenants.habit_file("docs\\habits", "Read books"), "docs\\habits\\read_books.json")
+        self.assertIsNone(tenants.habit_count())
+        tenants.update_habit_count(1)
+        self.assertFalse(os.path.exists(self.path_registry))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import unittest
+from datetime import datetime, timedelta
+import pytz
+from habittracker import codec
+from habittracker import habits
+from habittracker import rollups
+from habittracker import tombstones
+
+
+class TestTombstones(unittest.TestCase):
+
+    def setUp(self) -> None:
+        habits.list_habit_instances = []
+        self.list_of_test_files = ["test_tombstones_overview.json",
+                                   "test_tombstones_overview.tombstones",
+                                   "test_tombstones_testcase1.json",
+                                   "test_tombstones_testcase2.json",
+                                   "test_tombstones_testcase3.json"]
+        self.tearDown()
+        habits.create_habit_overview("test_tombstones_overview.json")
+        created = datetime.now(pytz.utc) - timedelta(3)
+        self.habit1 = habits.Habit("Testcase1", "DT1", "D", "test_tombstones_testcase1.json", created)
+        self.habit2 = habits.Habit("Testcase2", "! DEMO ! DATA !", "D", "test_tombstones_testcase2.json", created)
+        self.habit3 = habits.Habit("Testcase3", "! DEMO ! DATA !", "7d", "test_tombstones_testcase3.json", created)
+        for habit in habits.list_habit_instances:
+            habit.add_to_overview("test_tombstones_overview.json")
+        rollups.get_rollups(self.habit2)
+
+    def tearDown(self) -> None:
+        tombstones.wait_for_compaction()
+        for file in self.list_of_test_files:
+            rollups.remove_rollups(file)
+            if os.path.exists(file):
+                os.remove(file)
+
+    def test_tombstone_and_compact(self):
+        # tombstone written directly, compaction run synchronously
+        tombstones.add_tombstones("test_tombstones_overview.json", [("Testcase2", "test_tombstones_testcase2.json")])
+
+        # test: deleted habit is skipped on read, overview and habit file are unchanged until the compaction
+        df_overview = habits.read_habit_overview("test_tombstones_overview.json")
+        self.assertEqual(df_overview["Name"].tolist(), ["Testcase1", "Testcase3"])
+        self.assertEqual(len(codec.read_overview("test_tombstones_overview.json")), 3)
+        self.assertTrue(tombstones.is_tombstoned("test_tombstones_overview.json", "test_tombstones_testcase2.json"))
+
+        # test: compaction rewrites the overview and removes the orphaned files
+        status = tombstones.compact("test_tombstones_overview.json")
+        self.assertEqual(status, "Compaction: 1 deleted habits, 1 habit files removed.")
+        self.assertEqual(codec.read_overview("test_tombstones_overview.json")["Name"].tolist(),
+                         ["Testcase1", "Testcase3"])
+        self.assertFalse(os.path.exists("test_tombstones_testcase2.json"))
+        self.assertFalse(os.path.exists(rollups.rollup_file("test_tombstones_testcase2.json")))
+        self.assertEqual(tombstones.read_tombstones("test_tombstones_overview.json"), [])
+        self.assertEqual(tombstones.compact("test_tombstones_overview.json"), "Compaction: nothing to do.")
+
+    def test_remove_demo_habits(self):
+        # test: all demo habits are deleted at once, the other habits are kept
+        status = habits.remove_demo_habits("test_tombstones_overview.json")
+        self.assertEqual(status, "Demo data of 2 habits successfully deleted")
+        self.assertEqual(habits.list_habit_instances, [self.habit1])
+        self.assertEqual(habits.read_habit_overview("test_tombstones_overview.json")["Name"].tolist(), ["Testcase1"])
+
+        # test: background compaction removes the files of the demo habits
+        tombstones.wait_for_compaction()
+        self.assertFalse(os.path.exists("test_tombstones_testcase2.json"))
+        self.assertFalse(os.path.exists("test_tombstones_testcase3.json"))
+        self.assertTrue(os.path.exists("test_tombstones_testcase1.json"))
+        self.assertEqual(habits.remove_demo_habits("test_tombstones_overview.json"), "No demo data existing")
+
+    def test_torn_tombstone(self):
+        tombstones.add_tombstones("test_tombstones_overview.json", [("Testcase1", "test_tombstones_testcase1.json")])
+        with open("test_tombstones_overview.tombstones", "a") as file:
+            file.write('{"Name":"Testcase3","File Dir')
+
+        # test: incomplete last record is ignored
+        self.assertEqual(tombstones.read_tombstones("test_tombstones_overview.json"),
+                         [("Testcase1", "test_tombstones_testcase1.json")])
+
+        # test: habit file used by an existing habit is protected from the compaction
+        tombstones.compact("test_tombstones_overview.json", ["test_tombstones_testcase1.json"])
+        self.assertTrue(os.path.exists("test_tombstones_testcase1.json"))
+        self.assertEqual(codec.read_overview("test_tombstones_overview.json")["Name"].tolist(),
+                         ["Testcase2", "Testcase3"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import os
+import sys
+import unittest
+import subprocess
+from datetime import datetime, timedelta
+import pytz
+from habittracker import codec
+from habittracker import habits
+from habittracker import history
+from habittracker import periods
+from habittracker import rollups
+from habittracker import tombstones
+from habittracker import wal
+
+
+class TestWriteAheadLog(unittest.TestCase):
+
+    def setUp(self) -> None:
+        habits.list_habit_instances = []
+        self.list_of_test_files = ["test_wal_overview.json",
+                                   wal.log_file("test_wal_overview.json"),
+                                   "test_wal_overview.wal",
+                                   "test_wal_overview.tombstones",
+                                   "test_wal_testcase1.json",
+                                   "test_wal_testcase2.json"]
+        self.tearDown()
+        habits.create_habit_overview("test_wal_overview.json")
+        habits.write_ahead_log = wal.WriteAheadLog("test_wal_overview.json")
+
+    def tearDown(self) -> None:
+        habits.write_ahead_log = None
+        history.dict_unsaved_histories.clear()
+        for file in self.list_of_test_files:
+            rollups.remove_rollups(file)
+            if os.path.exists(file):
+                os.remove(file)
+
+    def test_log_and_checkpoint(self):
+        created = datetime.now(pytz.utc) - timedelta(3)
+        habit1 = habits.Habit("Testcase1", "DT1", "D", "test_wal_testcase1.json", created)
+        habit1.add_to_overview("test_wal_overview.json")
+        habit1.auto_update_file()
+        habit1.check_off_habit()
+
+        # test: mutations are logged, habit file and overview are not written yet
+        with open(wal.log_file("test_wal_overview.json"), "r") as file:
+            list_records = wal.decode_records(file.read())
+        self.assertEqual([record["op"] for record in list_records], ["create", "append", "append"])
+        self.assertTrue(codec.read_overview("test_wal_overview.json").empty)
+        self.assertEqual(len(history.load_history("test_wal_testcase1.json", "D")), 4)
+        self.assertEqual(habits.write_ahead_log.number_committed, 3)
+
+        # test: checkpoint folds the log into habit file and overview
+        status = habits.write_ahead_log.checkpoint()
+        self.assertEqual(status, "Checkpoint: 1 habit files saved.")
+        self.assertFalse(os.path.exists(wal.log_file("test_wal_overview.json")))
+        self.assertEqual(history.dict_unsaved_histories, {})
+        self.assertEqual(codec.read_overview("test_wal_overview.json")["Name"].tolist(), ["Testcase1"])
+        self.assertEqual(history.read_habit_file("test_wal_testcase1.json")["Checked-off"].tolist(),
+                         ["No", "No", "No", "Yes"])
+
+    def test_group_commit(self):
+        created = datetime.now(pytz.utc) - timedelta(1)
+        habit1 = habits.Habit("Testcase1", "DT1", "D", "test_wal_testcase1.json", created)
+        habit2 = habits.Habit("Testcase2", "DT2", "D", "test_wal_testcase2.json", created)
+        # test: records of a batch are written together at the end of the batch
+        with habits.write_ahead_log.batch():
+            habit1.check_off_habit()
+            habit2.check_off_habit()
+            self.assertFalse(os.path.exists(wal.log_file("test_wal_overview.json")))
+            self.assertEqual(len(habits.write_ahead_log.queue), 2)
+        self.assertEqual(habits.write_ahead_log.queue, [])
+        self.assertEqual(habits.write_ahead_log.number_committed, 2)
+
+    def test_recover(self):
+        created = datetime.now(pytz.utc) - timedelta(1)
+        habit1 = habits.Habit("Testcase1", "DT1", "D", "test_wal_testcase1.json", created)
+        habit1.add_to_overview("test_wal_overview.json")
+        habit1.check_off_habit()
+        # simulated crash: unsaved histories are lost, last record torn
+        history.dict_unsaved_histories.clear()
+        with open(wal.log_file("test_wal_overview.json"), "a") as file:
+            file.write('0000abcd {"op":"remove","na')
+
+        # test: complete records are replayed (idempotent), the torn record is ignored
+        log = wal.WriteAheadLog("test_wal_overview.json")
+        self.assertEqual(log.recover(), "Recovered 2 logged mutations.")
+        self.assertEqual(history.read_habit_file("test_wal_testcase1.json")["Checked-off"].tolist(), ["Yes"])
+        self.assertEqual(codec.read_overview("test_wal_overview.json")["Name"].tolist(), ["Testcase1"])
+        self.assertIsNone(log.recover())
+
+        # test: removal is logged and applied with the next checkpoint
+        habit1.remove_habit("test_wal_overview.json")
+        tombstones.wait_for_compaction()
+        self.assertFalse(os.path.exists("test_wal_testcase1.json"))
+        habits.write_ahead_log.checkpoint()
+        self.assertTrue(codec.read_overview("test_wal_overview.json").empty)
+
+    @unittest.skipIf(os.name != "posix", "running processes are only detected on POSIX systems")
+    def test_logs_of_other_processes(self):
+        created = datetime.now(pytz.utc) - timedelta(1)
+        habit1 = habits.Habit("Testcase1", "DT1", "D", "test_wal_testcase1.json", created)
+        habit1.add_to_overview("test_wal_overview.json")
+        habit1.check_off_habit()
+        history.dict_unsaved_histories.clear()
+        # log left over by a process that has ended (crash) and the log of a running process
+        process = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True)
+        pid_ended = int(process.stdout)
+        os.replace(wal.log_file("test_wal_overview.json"), wal.log_file("test_wal_overview.json", pid_ended))
+        with open(wal.log_file("test_wal_overview.json", os.getppid()), "w") as file:
+            file.write(wal.encode_record({"op": "remove", "name": "Testcase1", "file": "test_wal_testcase1.json"}))
+        self.list_of_test_files += [wal.log_file("test_wal_overview.json", pid) for pid in [pid_ended, os.getppid()]]
+
+        # test: every process has its own log, only logs of processes that aren't running anymore are replayed
+        self.assertEqual(sorted(pid for _, pid in wal.list_log_files("test_wal_overview.json")),
+                         sorted([pid_ended, os.getppid()]))
+        self.assertEqual(habits.write_ahead_log.recover(), "Recovered 2 logged mutations.")
+        self.assertEqual(history.read_habit_file("test_wal_testcase1.json")["Checked-off"].tolist(), ["Yes"])
+        self.assertEqual([pid for _, pid in wal.list_log_files("test_wal_overview.json")], [os.getppid()])
+        self.assertEqual(codec.read_overview("test_wal_overview.json")["Name"].tolist(), ["Testcase1"])
+
+    def test_merge_rows(self):
+        today = datetime.now(pytz.utc)
+        day_today = periods.to_day(today)
+        # periods written by another process: all missed (auto-updated after the end of the running period)
+        rows_other = [[day, 0, None] for day in range(day_today - 3, day_today + 1)]
+        # periods logged by this process meanwhile: check-off of the running period and one period later
+        rows_logged = [[day_today, 1, history.to_milliseconds(today)], [day_today + 1, 0, None]]
+        for habit_file_format in ["json", "bits", "sparse", "binary", "segmented"]:
+            if os.path.exists("test_wal_testcase1.json"):
+                os.remove("test_wal_testcase1.json")
+            history.create_history("D", habit_file_format, day_today - 3).write("test_wal_testcase1.json")
+            wal.merge_rows("test_wal_testcase1.json", "D", rows_other)
+
+            # test: periods of the habit file are kept, the check-off of the log wins over a missed period
+            history_habit = wal.merge_rows("test_wal_testcase1.json", "D", rows_logged)
+            self.assertEqual(history.detect_format("test_wal_testcase1.json"), habit_file_format)
+            self.assertEqual(history_habit.checked_off().tolist()[:4], [False, False, False, True])
+            self.assertEqual(history.read_habit_file("test_wal_testcase1.json")["Checked-off"].tolist()[:4],
+                             ["No", "No", "No", "Yes"], habit_file_format)
@@ -0,0 +1,116 @@
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+import pytz
+from habittracker import codec
+from habittracker import habits
+from habittracker import rollups
+from habittracker import scheduler
+from habittracker import segments
+from habittracker import storage
+from habittracker import tombstones
+from habittracker import watcher
+
+
+class TestWatcher(unittest.TestCase):
+
+    def setUp(self) -> None:
+        habits.list_habit_instances = []
+        habits.auto_update_scheduler = scheduler.AutoUpdateScheduler()
+        self.path_overview = "test_watcher_overview.json"
+        self.list_of_test_files = [self.path_overview,
+                                   "test_watcher_overview.tombstones",
+                                   "test_watcher_testcase1.json",
+                                   "test_watcher_testcase2.json",
+                                   "test_watcher_testcase3.json"]
+        for file in self.list_of_test_files:
+            if os.path.exists(file):
+                os.remove(file)
+        habits.create_habit_overview(self.path_overview)
+        self.habit1 = habits.Habit("Testcase1", "WT1", "D", "test_watcher_testcase1.json",
+                                   datetime.now(pytz.utc) - timedelta(5))
+        self.habit1.add_to_overview(self.path_overview)
+        self.habit1.auto_update_file()
+        self.habit2 = habits.Habit("Testcase2", "WT2", "D", "test_watcher_testcase2.json")
+        self.habit2.add_to_overview(self.path_overview)
+        self.habit_watcher = None
+
+    def tearDown(self) -> None:
+        if self.habit_watcher is not None:
+            self.habit_watcher.close()
+        tombstones.wait_for_compaction()
+        for file in self.list_of_test_files:
+            rollups.remove_rollups(file)
+            if os.path.exists(file):
+                os.remove(file)
+
+    def edit_habit_file(self):
+        # another program replaces the habit data of habit 2 (e.g. edited by hand)
+        with open(self.habit1.file) as file:
+            content = file.read()
+        with open(self.habit2.file, "w") as file:
+            file.write(content)
+
+    def check_invalidation(self):
+        self.assertEqual(len(self.habit2.get_history_index()), 0)
+
+        # test: own writes aren't regarded as changes
+        self.assertEqual(self.habit1.check_off_habit(), "Successfully checked-off your habit!")
+        history_index1 = self.habit1.get_history_index()
+        self.assertEqual(self.habit_watcher.check(), [])
+
+        # test: only the cached state of the changed habit is dropped, it's read from the changed file again
+        self.edit_habit_file()
+        self.assertEqual(self.habit_watcher.check(), [self.habit2])
+        self.assertIs(self.habit1.history_index, history_index1)
+        self.assertEqual(len(self.habit2.get_history_index()), len(history_index1))
+        self.assertEqual(self.habit_watcher.check(), [])
+
+    def test_polling(self):
+        self.habit_watcher = watcher.HabitWatcher(self.path_overview, watcher.PollingWatcher(interval=0))
+        self.check_invalidation()
+
+    @unittest.skipIf(not sys.platform.startswith("linux"), "inotify is only available on Linux")
+    def test_inotify(self):
+        self.habit_watcher = watcher.HabitWatcher(self.path_overview, watcher.InotifyWatcher())
+        self.check_invalidation()
+
+    def test_reload_overview(self):
+        self.habit_watcher = watcher.HabitWatcher(self.path_overview, watcher.PollingWatcher(interval=0))
+
+        # another program removes habit 2, adds habit 3 and renames habit 1 in the habit overview
+        df_habit_overview = habits.read_habit_overview(self.path_overview)
+        df_habit_overview = df_habit_overview[df_habit_overview["Name"] != "Testcase2"]
+        df_habit_overview.loc[df_habit_overview["Name"] == "Testcase1", "Name"] = "Testcase1 renamed"
+        df_habit_overview = df_habit_overview.append({"Name": "Testcase3", "Specification": "WT3", "Periodicity": "7d",
+                                                      "Created on": datetime.now(pytz.utc),
+                                                      "File Directory": "test_watcher_testcase3.json"},
+                                                     ignore_index=True)
+        codec.write_overview(self.path_overview, df_habit_overview)
+        storage.backend.dict_written.pop(os.path.abspath(self.path_overview))
+
+        # test: habits in memory follow the habit overview
+        list_changed = self.habit_watcher.check()
+        self.assertEqual(len(list_changed), 3)
+        self.assertEqual([habit.name for habit in habits.list_habit_instances], ["Testcase1 renamed", "Testcase3"])
+        self.assertTrue(os.path.exists("test_watcher_testcase3.json"))
+        self.assertIn(habits.list_habit_instances[1], habits.auto_update_scheduler.dict_sequences)
+        self.assertNotIn(self.habit2, habits.auto_update_scheduler.dict_sequences)
+
+    def test_invalidate_habit(self):
+        # test: archive segments of other habits stay cached
+        segments.dict_archive_cache["test_watcher_testcase1_2020.json.gz"] = None
+        segments.dict_archive_cache["test_watcher_testcase10_2020.json.gz"] = None
+        try:
+            self.habit1.get_history_index()
+            watcher.invalidate_habit(self.habit1)
+            self.assertIsNone(self.habit1.history_index)
+            self.assertNotIn("test_watcher_testcase1_2020.json.gz", segments.dict_archive_cache)
+            self.assertIn("test_watcher_testcase10_2020.json.gz", segments.dict_archive_cache)
+        finally:
+            segments.dict_archive_cache.pop("test_watcher_testcase10_2020.json.gz", None)
+
+
+if __name__ == '__main__':
+    unittest.main()